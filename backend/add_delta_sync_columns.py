@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Add what the delta export needs to existing databases: updated_at on todos
+and service_history, the deletion_log table and the updated_at indexes.
+Run this from the backend directory with the virtual environment activated.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Tables that gain updated_at; existing rows start from their created_at
+UPDATED_AT_TABLES = ["todos", "service_history"]
+
+# (index name, table, column list) - keep in sync with __table_args__ in app/models.py
+INDEXES = [
+    ("ix_cars_user_updated", "cars", "user_id, updated_at"),
+    ("ix_todos_user_updated", "todos", "user_id, updated_at"),
+    ("ix_service_intervals_user_updated", "service_intervals", "user_id, updated_at"),
+    ("ix_service_history_user_updated", "service_history", "user_id, updated_at"),
+    ("ix_deletion_log_user_deleted", "deletion_log", "user_id, deleted_at"),
+]
+
+def add_delta_sync_columns():
+    """Add the updated_at columns, deletion_log table and indexes if missing."""
+    db_path = Path("car_collection.db")
+
+    if not db_path.exists():
+        print("Error: car_collection.db not found in current directory")
+        print("Please run this script from the backend directory")
+        return False
+
+    conn = sqlite3.connect(str(db_path))
+    cursor = conn.cursor()
+
+    try:
+        for table in UPDATED_AT_TABLES:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [column[1] for column in cursor.fetchall()]
+            if "updated_at" in columns:
+                print(f"{table}.updated_at already exists")
+                continue
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME")
+            cursor.execute(f"UPDATE {table} SET updated_at = created_at")
+            print(f"✓ Added updated_at to {table}")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS deletion_log (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users (id),
+                table_name VARCHAR NOT NULL,
+                record_id INTEGER NOT NULL,
+                deleted_at DATETIME
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_deletion_log_id ON deletion_log (id)")
+        print("✓ deletion_log table is present")
+
+        for index_name, table, columns in INDEXES:
+            cursor.execute("PRAGMA index_list({})".format(table))
+            existing = [row[1] for row in cursor.fetchall()]
+
+            if index_name in existing:
+                print(f"Index '{index_name}' already exists on {table}.")
+                continue
+
+            cursor.execute(f"CREATE INDEX {index_name} ON {table} ({columns})")
+            print(f"✓ Created index '{index_name}' on {table} ({columns})")
+
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Delta Export Migration")
+    print("======================")
+
+    if add_delta_sync_columns():
+        print("\n✅ Migration completed successfully!")
+        sys.exit(0)
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
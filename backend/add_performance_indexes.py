@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Add composite indexes on the tenant-scoped foreign keys for existing databases,
+and lowercase the research template keys so the cache lookup matches them.
+Run this from the backend directory with the virtual environment activated.
+Re-run it after entering templates by hand.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+from app.research_cache import NORMALIZE_TEMPLATE_KEYS_SQL
+
+# (index name, table, column list) - keep in sync with __table_args__ in app/models.py
+INDEXES = [
+    ("ix_cars_user_group", "cars", "user_id, group_name"),
+    ("ix_todos_user_car", "todos", "user_id, car_id"),
+    ("ix_service_intervals_user_car_active", "service_intervals", "user_id, car_id, is_active"),
+    ("ix_service_history_car_user_date", "service_history", "car_id, user_id, performed_date DESC"),
+    ("ix_service_history_user_id", "service_history", "user_id"),
+    ("ix_service_interval_templates_lookup", "service_interval_templates",
+     "make, model, engine_type, year_start, year_end"),
+]
+
+def add_performance_indexes():
+    """Create any missing composite indexes."""
+    db_path = Path("car_collection.db")
+
+    if not db_path.exists():
+        print("Database not found. Please run init_db.py first.")
+        return False
+
+    conn = sqlite3.connect(str(db_path))
+    cursor = conn.cursor()
+
+    try:
+        for index_name, table, columns in INDEXES:
+            # Check if index already exists
+            cursor.execute("PRAGMA index_list({})".format(table))
+            existing = [row[1] for row in cursor.fetchall()]
+
+            if index_name in existing:
+                print(f"Index '{index_name}' already exists on {table}.")
+                continue
+
+            cursor.execute(f"CREATE INDEX {index_name} ON {table} ({columns})")
+            print(f"✓ Created index '{index_name}' on {table} ({columns})")
+
+        cursor.execute(NORMALIZE_TEMPLATE_KEYS_SQL)
+        print(f"✓ Normalized {cursor.rowcount} service interval template keys")
+
+        # Refresh planner statistics so the new indexes are picked up
+        cursor.execute("ANALYZE")
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"Error updating database: {e}")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    if add_performance_indexes():
+        print("\n✅ Indexes are up to date!")
+        sys.exit(0)
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Add the car filter/sort indexes and the full-text search index to existing
+databases, indexing the cars, service history and todos already there.
+Run this from the backend directory with the virtual environment activated.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+from app.search import SEARCH_TABLE, SQLITE_SEARCH_BACKFILL, SQLITE_SEARCH_TABLE_DDL, SQLITE_SEARCH_TRIGGER_DDL
+
+# (index name, table, column list) - keep in sync with __table_args__ in app/models.py
+INDEXES = [
+    ("ix_cars_user_make", "cars", "user_id, make, id"),
+    ("ix_cars_user_year", "cars", "user_id, year, id"),
+]
+
+def add_search_index():
+    """Create the missing indexes, FTS5 table and triggers."""
+    db_path = Path("car_collection.db")
+
+    if not db_path.exists():
+        print("Error: car_collection.db not found in current directory")
+        print("Please run this script from the backend directory")
+        return False
+
+    conn = sqlite3.connect(str(db_path))
+    cursor = conn.cursor()
+
+    try:
+        for index_name, table, columns in INDEXES:
+            cursor.execute("PRAGMA index_list({})".format(table))
+            existing = [row[1] for row in cursor.fetchall()]
+
+            if index_name in existing:
+                print(f"Index '{index_name}' already exists on {table}.")
+                continue
+
+            cursor.execute(f"CREATE INDEX {index_name} ON {table} ({columns})")
+            print(f"✓ Created index '{index_name}' on {table} ({columns})")
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,))
+        if cursor.fetchone():
+            print(f"{SEARCH_TABLE} already exists")
+        else:
+            cursor.execute(SQLITE_SEARCH_TABLE_DDL)
+            for statement in SQLITE_SEARCH_BACKFILL:
+                cursor.execute(statement)
+            print(f"✓ Created {SEARCH_TABLE} and indexed existing records")
+
+        for statement in SQLITE_SEARCH_TRIGGER_DDL:
+            cursor.execute(statement)
+        print("✓ Search triggers are present")
+
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Search Index Migration")
+    print("======================")
+
+    if add_search_index():
+        print("\n✅ Migration completed successfully!")
+        sys.exit(0)
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
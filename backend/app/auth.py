@@ -3,18 +3,26 @@ Authentication utilities for the Car Collection application.
 Handles password hashing, JWT token generation/validation, and user authentication.
 """
 
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, UTC
 from typing import Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 
 from .database import get_db
-from .models import User
+from .models import PrincipalInvalidation, User
 from .schemas import TokenData
 from .config import settings
+from .metrics import REGISTRY
 
 # Configuration from environment
 SECRET_KEY = settings.secret_key
@@ -22,18 +30,200 @@ ALGORITHM = settings.jwt_algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.jwt_expiration_hours * 60
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 
 # Security scheme
 security = HTTPBearer()
 
+AUTH_CACHE_LOOKUPS = REGISTRY.counter(
+    "auth_principal_cache_lookups_total",
+    "Authenticated user cache lookups by result (hit or miss)",
+    ["result"]
+)
+AUTH_LATENCY = REGISTRY.histogram(
+    "auth_resolve_seconds",
+    "Time to resolve the current user from a bearer token",
+    ["result"]
+)
+
+
+class PrincipalCache:
+    """
+    TTL/LRU cache of authenticated users keyed by token subject (username).
+
+    Entries are detached snapshots of the User row, so a cache hit resolves the
+    current user without querying the users table. Each worker process has its
+    own cache: anything that changes a user's credentials, flags or profile
+    calls ``broadcast``, which drops the local entry and logs the username in
+    ``principal_invalidations``. Every worker reads that log in ``sync`` at
+    most once per ``sync_seconds``, so the other workers drop theirs within
+    that interval rather than at TTL expiry.
+    """
+
+    # How long after its created_at an invalidation may still commit; rows are
+    # re-read for this long so a slow commit is never missed
+    SYNC_GRACE = timedelta(seconds=5)
+
+    def __init__(self, max_entries: int, ttl_seconds: int, sync_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sync_seconds = sync_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sync = 0.0
+        self._synced_through = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, subject: str) -> Optional[User]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at < time.monotonic():
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return snapshot
+
+    def put(self, subject: str, user: User) -> None:
+        if not self.enabled:
+            return
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *subjects: str) -> None:
+        """Drop the entries in this process only."""
+        with self._lock:
+            for subject in subjects:
+                self._entries.pop(subject, None)
+
+    def broadcast(self, db: Session, *subjects: str) -> None:
+        """Drop the entries in every worker; call after committing the user change."""
+        self.invalidate(*subjects)
+        if not self.enabled:
+            return
+        now = datetime.now(UTC)
+        # Every entry cached before an invalidation has expired a TTL later
+        db.query(PrincipalInvalidation).filter(
+            PrincipalInvalidation.created_at < now - timedelta(seconds=self.ttl_seconds) - self.SYNC_GRACE
+        ).delete(synchronize_session=False)
+        db.add_all(PrincipalInvalidation(username=subject, created_at=now) for subject in set(subjects))
+        db.commit()
+
+    def sync(self, db: Session) -> None:
+        """Drop entries invalidated by other workers since the last sync."""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_sync:
+                return
+            self._next_sync = now + self.sync_seconds
+            since = self._synced_through
+            self._synced_through = datetime.now(UTC)
+        if since is None:
+            # Nothing is cached before the first sync
+            return
+        subjects = db.scalars(
+            select(PrincipalInvalidation.username)
+            .where(PrincipalInvalidation.created_at >= since - self.SYNC_GRACE)
+            .distinct()
+        ).all()
+        self.invalidate(*subjects)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._next_sync = 0.0
+            self._synced_through = None
+
+
+principal_cache = PrincipalCache(
+    settings.auth_cache_max_entries,
+    settings.auth_cache_ttl_seconds,
+    settings.auth_cache_sync_seconds
+)
+
+BCRYPT_QUEUE_DEPTH = REGISTRY.gauge(
+    "password_hash_queue_depth",
+    "bcrypt operations queued or running in the hashing pool"
+)
+BCRYPT_REJECTED = REGISTRY.counter(
+    "password_hash_rejected_total",
+    "bcrypt operations rejected because the hashing pool was saturated"
+)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing pool is saturated and the caller should retry later"""
+    pass
+
+
+class PasswordHasher:
+    """
+    Bounded pool for bcrypt hashing and verification.
+
+    Each bcrypt call burns ~250ms of CPU. Running them on a small dedicated
+    pool caps how many cores a login storm can take from the rest of the
+    worker, and the pending-slot semaphore applies backpressure: a caller
+    that finds every slot taken gets ``PasswordHashingBusy`` at once. The
+    callers are sync endpoints on the shared request threadpool, so waiting
+    for a slot would let a login storm hold every one of those threads.
+    bcrypt releases the GIL while hashing, so threads run it in parallel
+    without the fork and pickling costs of a process pool.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int, max_pending: int):
+        self.context = context
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            BCRYPT_REJECTED.inc()
+            raise PasswordHashingBusy("Password hashing is busy, please retry")
+        BCRYPT_QUEUE_DEPTH.inc()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            BCRYPT_QUEUE_DEPTH.dec()
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(self.context.hash, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(self.context.verify, plain_password, hashed_password)
+
+    def verify_and_update(self, plain_password: str, hashed_password: str):
+        """Verify, returning (valid, new_hash) where new_hash is set if the cost factor changed."""
+        return self._run(self.context.verify_and_update, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(
+    pwd_context,
+    max_workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
@@ -63,10 +253,14 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     user = db.query(User).filter(User.username == username).first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         return None
     if not user.is_active:
         return None
+    if new_hash:
+        # Cost factor changed since this hash was made; saved with the login update
+        user.hashed_password = new_hash
     return user
 
 def get_current_user(
@@ -80,13 +274,29 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    started = time.perf_counter()
     token_data = verify_token(credentials.credentials)
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
-        raise credentials_exception
+    principal_cache.sync(db)
+    cached = principal_cache.get(token_data.username)
+    if cached is not None:
+        # Reuse the instance if this session already has it, otherwise attach
+        # the snapshot without emitting a SELECT
+        user = db.identity_map.get(identity_key(User, cached.id))
+        if user is None:
+            user = db.merge(cached, load=False)
+        result = "hit"
+    else:
+        user = db.query(User).filter(User.username == token_data.username).first()
+        if user is None:
+            raise credentials_exception
+        principal_cache.put(token_data.username, user)
+        result = "miss"
+    
+    AUTH_CACHE_LOOKUPS.inc(result=result)
+    AUTH_LATENCY.observe(time.perf_counter() - started, result=result)
     
     if not user.is_active:
         raise HTTPException(
@@ -114,7 +324,26 @@ def get_current_admin_user(current_user: User = Depends(get_current_user)) -> Us
         )
     return current_user
 
+def get_metrics_reader(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    db: Session = Depends(get_db)
+) -> None:
+    """Allow the configured metrics token or an admin user's JWT."""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if settings.metrics_token and secrets.compare_digest(
+            credentials.credentials.encode("utf-8"), settings.metrics_token.encode("utf-8")):
+        return
+    get_current_admin_user(get_current_user(credentials, db))
+
 def update_last_login(db: Session, user: User) -> None:
     """Update the user's last login timestamp."""
     user.last_login = datetime.now(UTC)
-    db.commit() 
\ No newline at end of file
+    db.commit()
+    # Only the login time (or a rehash of the same password) changed, which
+    # other workers' snapshots can go on without
+    principal_cache.invalidate(user.username) 
\ No newline at end of file
@@ -9,11 +9,59 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./car_collection.db"
+    # Connection pool (ignored for SQLite)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds before a connection is replaced
+    db_pool_pre_ping: bool = True
+    # SQLite connection pragmas (ignored for other databases)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456  # bytes (256 MB)
+    sqlite_cache_size: int = -65536  # negative values are KiB (64 MB)
+    
+    # Instrumentation and metrics
+    # Log requests whose total database time reaches this many milliseconds (0 disables)
+    slow_query_log_ms: float = 500.0
+    # Send each request's database time in a Server-Timing header (visible to any client)
+    server_timing: bool = False
+    # Directory where gunicorn workers share metrics snapshots (empty keeps them per process)
+    metrics_multiproc_dir: str = ""
+    metrics_snapshot_interval_seconds: float = 5.0
+    # Bearer token a scraper can use for /metrics; admins can always read it
+    metrics_token: str = ""
     
     # Security
     secret_key: str = "your-secret-key-here-change-in-production"
     jwt_algorithm: str = "HS256"
     jwt_expiration_hours: int = 4
+    # Authenticated user cache (0 seconds disables it)
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_entries: int = 1024
+    # How often each worker checks for users invalidated by the other workers
+    auth_cache_sync_seconds: float = 1.0
+    # Research results cached as service interval templates
+    research_cache_ttl_hours: int = 24 * 30
+    # Research sources are queried concurrently, each with its own timeout and circuit breaker
+    research_source_timeout_seconds: float = 10.0
+    research_breaker_failure_threshold: int = 3
+    research_breaker_reset_seconds: float = 60.0
+    research_batch_concurrency: int = 8  # unique vehicles researched at once by the batch endpoint
+    # Shared HTTP client used by research sources
+    http_pool_limit: int = 100  # total open connections per worker
+    http_pool_limit_per_host: int = 10
+    http_dns_cache_seconds: int = 300
+    http_keepalive_seconds: float = 30.0
+    http_timeout_seconds: float = 30.0
+    # Password hashing
+    bcrypt_rounds: int = 12  # changing this rehashes passwords on next login
+    password_hash_workers: int = 2  # concurrent bcrypt operations per worker process
+    # Queued operations before rejecting with 503. Every running or queued
+    # operation holds one of the 40 threads that serve sync endpoints, so
+    # workers + pending must stay well below that
+    password_hash_max_pending: int = 6
     
     # CORS
     cors_origins: List[str] = ["http://localhost:3000"]
@@ -1,7 +1,9 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, insert, literal, select
+from sqlalchemy.orm import Session, selectinload
 from . import models, schemas
 from datetime import datetime, UTC
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from .pagination import DEFAULT_PAGE_SIZE, paginate
 
 # User CRUD operations
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
@@ -13,8 +15,9 @@ def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+              skip: int = 0) -> Tuple[List[models.User], Optional[str]]:
+    return paginate(db.query(models.User), models.User.id, cursor, limit, skip=skip)
 
 def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     from .auth import get_password_hash
@@ -49,6 +52,7 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> O
         return None
     
     update_data = user_update.model_dump(exclude_unset=True)
+    old_username = db_user.username
     
     # Handle password separately - need to hash it
     if "password" in update_data and update_data["password"]:
@@ -62,16 +66,35 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> O
     
     db.commit()
     db.refresh(db_user)
+    
+    # Cached principals must not outlive a change to credentials or flags
+    from .auth import principal_cache
+    principal_cache.broadcast(db, old_username, db_user.username)
     return db_user
 
 def delete_user(db: Session, user_id: int) -> bool:
     db_user = get_user(db, user_id)
     if not db_user:
         return False
+    username = db_user.username
     db.delete(db_user)
     db.commit()
+    
+    from .auth import principal_cache
+    principal_cache.broadcast(db, username)
     return True
 
+# Deletion log - every delete of a user's records leaves tombstones for the delta export
+def log_deletions(db: Session, model, user_id: int, *criteria) -> None:
+    """Record tombstones for the user's ``model`` rows matching ``criteria``; call before deleting them."""
+    db.execute(insert(models.DeletionLog).from_select(
+        ["user_id", "table_name", "record_id", "deleted_at"],
+        select(
+            literal(user_id), literal(model.__tablename__), model.id,
+            literal(datetime.now(UTC), DateTime)
+        ).where(model.user_id == user_id, *criteria)
+    ))
+
 # Car CRUD operations (Updated for multi-tenancy)
 def get_car(db: Session, car_id: int, user_id: int) -> Optional[models.Car]:
     return db.query(models.Car).filter(
@@ -79,10 +102,28 @@ def get_car(db: Session, car_id: int, user_id: int) -> Optional[models.Car]:
         models.Car.user_id == user_id
     ).first()
 
-def get_cars(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[models.Car]:
-    return db.query(models.Car).filter(
+# Sort keys accepted by get_cars; each is served by a (user_id, key) index
+CAR_SORT_COLUMNS = {
+    "id": None,
+    "year": models.Car.year,
+    "make": models.Car.make,
+}
+
+def get_cars(db: Session, user_id: int, cursor: Optional[str] = None,
+             limit: int = DEFAULT_PAGE_SIZE, make: Optional[str] = None, model: Optional[str] = None,
+             group_name: Optional[str] = None, vin: Optional[str] = None, year: Optional[int] = None,
+             sort: str = "id", descending: bool = False, skip: int = 0) -> Tuple[List[models.Car], Optional[str]]:
+    """Return a page of the user's cars, optionally filtered by exact field values and sorted."""
+    query = db.query(models.Car).options(selectinload(models.Car.todos)).filter(
         models.Car.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    )
+    for column, value in ((models.Car.make, make), (models.Car.model, model),
+                          (models.Car.group_name, group_name), (models.Car.vin, vin), (models.Car.year, year)):
+        if value is not None:
+            query = query.filter(column == value)
+    # CarOut includes each car's todos; load them for the whole page at once
+    return paginate(query, models.Car.id, cursor, limit,
+                    sort_column=CAR_SORT_COLUMNS[sort], descending=descending, skip=skip)
 
 def create_car(db: Session, car: schemas.CarCreate, user_id: int) -> models.Car:
     db_car = models.Car(**car.model_dump(), user_id=user_id)
@@ -105,6 +146,10 @@ def delete_car(db: Session, car_id: int, user_id: int) -> bool:
     db_car = get_car(db, car_id, user_id)
     if not db_car:
         return False
+    # The car's children go with it
+    for child in (models.ServiceHistory, models.ServiceInterval, models.ToDo):
+        log_deletions(db, child, user_id, child.car_id == car_id)
+    log_deletions(db, models.Car, user_id, models.Car.id == car_id)
     db.delete(db_car)
     db.commit()
     return True
@@ -123,11 +168,12 @@ def get_user_car_groups(db: Session, user_id: int) -> List[str]:
     return sorted(groups)
 
 # ToDo CRUD operations (Updated for multi-tenancy)
-def get_todos_for_car(db: Session, car_id: int, user_id: int) -> List[models.ToDo]:
-    return db.query(models.ToDo).filter(
+def get_todos_for_car(db: Session, car_id: int, user_id: int, cursor: Optional[str] = None,
+                      limit: Optional[int] = None) -> Tuple[List[models.ToDo], Optional[str]]:
+    return paginate(db.query(models.ToDo).filter(
         models.ToDo.car_id == car_id,
         models.ToDo.user_id == user_id
-    ).all()
+    ), models.ToDo.id, cursor, limit)
 
 def get_todo(db: Session, todo_id: int, user_id: int) -> Optional[models.ToDo]:
     return db.query(models.ToDo).filter(
@@ -158,6 +204,7 @@ def delete_todo(db: Session, todo_id: int, user_id: int) -> bool:
     db_todo = get_todo(db, todo_id, user_id)
     if not db_todo:
         return False
+    log_deletions(db, models.ToDo, user_id, models.ToDo.id == todo_id)
     db.delete(db_todo)
     db.commit()
     return True
@@ -170,10 +217,34 @@ def create_service_interval(db: Session, interval: schemas.ServiceIntervalCreate
     db.refresh(db_interval)
     return db_interval
 
+def delete_service_interval(db: Session, interval_id: int, user_id: int) -> bool:
+    db_interval = db.query(models.ServiceInterval).filter(
+        models.ServiceInterval.id == interval_id,
+        models.ServiceInterval.user_id == user_id
+    ).first()
+    if not db_interval:
+        return False
+    log_deletions(db, models.ServiceInterval, user_id, models.ServiceInterval.id == interval_id)
+    db.delete(db_interval)
+    db.commit()
+    return True
+
 # Service History CRUD operations
 def create_service_history(db: Session, service: schemas.ServiceHistoryCreate, user_id: int) -> models.ServiceHistory:
     db_service = models.ServiceHistory(**service.model_dump(), user_id=user_id)
     db.add(db_service)
     db.commit()
     db.refresh(db_service)
-    return db_service 
\ No newline at end of file
+    return db_service
+
+def delete_service_history(db: Session, service_id: int, user_id: int) -> bool:
+    db_service = db.query(models.ServiceHistory).filter(
+        models.ServiceHistory.id == service_id,
+        models.ServiceHistory.user_id == user_id
+    ).first()
+    if not db_service:
+        return False
+    log_deletions(db, models.ServiceHistory, user_id, models.ServiceHistory.id == service_id)
+    db.delete(db_service)
+    db.commit()
+    return True
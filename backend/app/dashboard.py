@@ -0,0 +1,109 @@
+"""
+Collection dashboard
+
+Builds the per-car summary rows for the dashboard from grouped aggregate
+queries - one for the cars with their todo and service history totals and
+one for the service schedule - instead of fetching each car's todos,
+intervals and history separately.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Numeric, case, cast, func
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .service_schedule import evaluate_schedule_row, get_interval_schedule_rows, urgency_sort_key
+
+
+def get_car_summary_rows(db: Session, user_id: int, now: datetime):
+    """Fetch each car with its open todo count, last service date and year-to-date spend"""
+    open_todos = db.query(
+        models.ToDo.car_id.label("car_id"),
+        func.count(models.ToDo.id).label("open_todos")
+    ).filter(
+        models.ToDo.user_id == user_id,
+        models.ToDo.status == "open"
+    ).group_by(models.ToDo.car_id).subquery()
+
+    year_start = datetime(now.year, 1, 1)
+    history = db.query(
+        models.ServiceHistory.car_id.label("car_id"),
+        func.max(models.ServiceHistory.performed_date).label("last_service_date"),
+        func.sum(case(
+            (models.ServiceHistory.performed_date >= year_start, models.ServiceHistory.cost),
+            else_=0
+        )).label("ytd_spend")
+    ).filter(
+        models.ServiceHistory.user_id == user_id
+    ).group_by(models.ServiceHistory.car_id).subquery()
+
+    return db.query(
+        models.Car.id,
+        models.Car.year,
+        models.Car.make,
+        models.Car.model,
+        models.Car.mileage,
+        models.Car.group_name,
+        func.coalesce(open_todos.c.open_todos, 0).label("open_todos"),
+        history.c.last_service_date,
+        # SQLite sums the costs as floats; casting back gives exact cents
+        cast(func.coalesce(history.c.ytd_spend, 0), Numeric(10, 2)).label("ytd_spend")
+    ).outerjoin(
+        open_todos, open_todos.c.car_id == models.Car.id
+    ).outerjoin(
+        history, history.c.car_id == models.Car.id
+    ).filter(
+        models.Car.user_id == user_id
+    ).order_by(models.Car.id).all()
+
+
+def get_dashboard(db: Session, user_id: int, now: Optional[datetime] = None) -> schemas.DashboardOut:
+    """Summarise every car in the user's collection in two queries"""
+    now = now or datetime.now()
+
+    schedules = defaultdict(list)
+    for row in get_interval_schedule_rows(db, user_id):
+        schedule = evaluate_schedule_row(row, now)
+        schedules[schedule.interval.car_id].append(schedule)
+
+    cars = []
+    for row in get_car_summary_rows(db, user_id, now):
+        car_schedules = schedules.get(row.id, [])
+        car = schemas.DashboardCar(
+            id=row.id,
+            year=row.year,
+            make=row.make,
+            model=row.model,
+            mileage=row.mileage,
+            group_name=row.group_name,
+            open_todos=row.open_todos,
+            last_service_date=row.last_service_date,
+            ytd_spend=row.ytd_spend,
+            overdue_services=sum(1 for s in car_schedules if s.status == "overdue"),
+            due_soon_services=sum(1 for s in car_schedules if s.status == "due_soon")
+        )
+        if car_schedules:
+            next_service = min(car_schedules, key=urgency_sort_key)
+            car.next_service = schemas.DashboardNextService(
+                interval_id=next_service.interval.id,
+                service_item=next_service.interval.service_item,
+                priority=next_service.interval.priority,
+                status=next_service.status,
+                progress_percent=next_service.progress_percent,
+                next_due_date=next_service.next_due_date,
+                next_due_mileage=next_service.next_due_mileage,
+                miles_remaining=next_service.miles_remaining,
+                days_remaining=next_service.days_remaining
+            )
+        cars.append(car)
+
+    return schemas.DashboardOut(
+        cars=cars,
+        open_todos=sum(car.open_todos for car in cars),
+        overdue_services=sum(car.overdue_services for car in cars),
+        ytd_spend=sum((car.ytd_spend for car in cars), Decimal("0"))
+    )
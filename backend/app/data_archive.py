@@ -0,0 +1,243 @@
+"""
+Table-per-file export archives for bulk data consumers.
+
+An archive is a zip holding a ``manifest.json`` and one file per table -
+cars, todos, service_intervals and service_history - either as gzip
+compressed NDJSON or, when pyarrow is installed, as Parquet. Rows are read
+and written in batches (one Parquet row group per batch), so memory use does
+not grow with the size of the collection. ``import_archive`` reads the same
+layout back through the batched import writer.
+"""
+
+import gzip
+import json
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+from typing import BinaryIO, Dict, Iterator, List
+
+from fastapi import HTTPException
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .data_export import APP_VERSION
+from .data_import import IMPORT_BATCH_SIZE, BackupFormatError, BatchedImportWriter, _validate
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet support is optional
+    pyarrow = None
+
+ARCHIVE_FORMATS = ("ndjson", "parquet")
+
+# Rows per read batch and per Parquet row group
+ARCHIVE_BATCH_SIZE = 5000
+
+# Archives and Parquet tables are assembled in memory up to this size, then on disk
+ARCHIVE_SPOOL_SIZE = 16 * 1024 * 1024
+
+# Tables in the order they are written and imported; cars come first so
+# children can be attached to the new car ids
+ARCHIVE_TABLES = (
+    ("cars", models.Car),
+    ("service_intervals", models.ServiceInterval),
+    ("service_history", models.ServiceHistory),
+    ("todos", models.ToDo),
+)
+
+_IMPORT_SCHEMAS = {
+    "cars": (schemas.CarCreate, "car"),
+    "service_intervals": (schemas.ServiceIntervalBase, "service interval"),
+    "service_history": (schemas.ServiceHistoryBase, "service"),
+    "todos": (schemas.ToDoBase, "todo"),
+}
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+
+def _file_name(table: str, fmt: str) -> str:
+    return f"{table}.parquet" if fmt == "parquet" else f"{table}.ndjson.gz"
+
+
+def _export_columns(model) -> list:
+    # user_id is the same on every row and meaningless to another account
+    return [column for column in model.__table__.columns if column.name != "user_id"]
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column.type, Integer):
+        return pyarrow.int64()
+    if isinstance(column.type, Numeric):
+        return pyarrow.float64()
+    if isinstance(column.type, DateTime):
+        return pyarrow.timestamp("us")
+    return pyarrow.string()
+
+
+def _batches(db: Session, model, columns, user_id: int, *criteria) -> Iterator[List[dict]]:
+    result = db.execute(
+        select(*columns).where(model.user_id == user_id, *criteria).order_by(model.id)
+        .execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+    )
+    for partition in result.mappings().partitions():
+        yield partition
+
+
+def _write_ndjson(entry: BinaryIO, batches: Iterator[List[dict]]) -> int:
+    rows = 0
+    with gzip.GzipFile(fileobj=entry, mode="wb", mtime=0) as out:
+        for batch in batches:
+            out.write("".join(
+                json.dumps({key: _json_value(value) for key, value in row.items()}) + "\n"
+                for row in batch
+            ).encode("utf-8"))
+            rows += len(batch)
+    return rows
+
+
+def _write_parquet(entry: BinaryIO, columns, batches: Iterator[List[dict]]) -> int:
+    schema = pyarrow.schema([(column.name, _arrow_type(column)) for column in columns])
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(entry, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_table(pyarrow.Table.from_pylist(
+                [{key: float(value) if isinstance(value, Decimal) else value
+                  for key, value in row.items()} for row in batch],
+                schema=schema
+            ))
+            rows += len(batch)
+    return rows
+
+
+def write_archive(db: Session, user_id: int, username: str, out: BinaryIO, fmt: str = "ndjson") -> Dict[str, int]:
+    """Write the user's tables to ``out`` as a zip archive and return the row counts."""
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format: {fmt}")
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    counts = {}
+    # The table files are compressed already, so the zip only stores them
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive:
+        for table, model in ARCHIVE_TABLES:
+            columns = _export_columns(model)
+            batches = _batches(db, model, columns, user_id)
+            with archive.open(_file_name(table, fmt), "w", force_zip64=True) as entry:
+                if fmt == "parquet":
+                    # The Parquet writer wants a file it can tell() on, which
+                    # a zip entry being written is not
+                    with tempfile.SpooledTemporaryFile(ARCHIVE_SPOOL_SIZE) as table_file:
+                        counts[table] = _write_parquet(table_file, columns, batches)
+                        table_file.seek(0)
+                        shutil.copyfileobj(table_file, entry)
+                else:
+                    counts[table] = _write_ndjson(entry, batches)
+
+        archive.writestr("manifest.json", json.dumps({
+            "format": fmt,
+            "export_date": datetime.utcnow().isoformat(),
+            "username": username,
+            "app_version": APP_VERSION,
+            "files": {table: _file_name(table, fmt) for table, _ in ARCHIVE_TABLES},
+            "record_counts": counts,
+        }, indent=2))
+    return counts
+
+
+def _read_ndjson(entry: BinaryIO) -> Iterator[dict]:
+    with gzip.GzipFile(fileobj=entry, mode="rb") as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_parquet(entry: BinaryIO) -> Iterator[dict]:
+    for batch in pyarrow.parquet.ParquetFile(entry).iter_batches(batch_size=ARCHIVE_BATCH_SIZE):
+        yield from batch.to_pylist()
+
+
+def _import_rows(writer: BatchedImportWriter, handles: Dict[int, int], table: str, rows: Iterator[dict]) -> None:
+    schema, record = _IMPORT_SCHEMAS[table]
+    for row in rows:
+        data = _validate(schema, {field: row[field] for field in schema.model_fields if field in row}, record)
+        if table == "cars":
+            handles[row.get("id")] = writer.add_car(data)
+            continue
+        # Skip children whose car wasn't in the archive
+        car_handle = handles.get(row.get("car_id"))
+        if car_handle is None:
+            continue
+        if table == "service_intervals":
+            writer.add_interval(car_handle, data)
+        elif table == "service_history":
+            writer.add_service(car_handle, data)
+        else:
+            writer.add_todo(car_handle, data)
+
+
+def import_archive(source: BinaryIO, user_id: int, db: Session,
+                   batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """
+    Import an export archive from a seekable file object in one transaction.
+
+    Rows are validated with the API schemas and written with multi-row
+    INSERTs; children whose car is not in the archive are skipped. An
+    invalid row or corrupt file rolls back the whole import.
+    """
+    writer = BatchedImportWriter(db, user_id, batch_size)
+    handles: Dict[int, int] = {}  # archive car id -> writer handle
+
+    try:
+        try:
+            archive = zipfile.ZipFile(source)
+            manifest = json.loads(archive.read("manifest.json"))
+        except (zipfile.BadZipFile, KeyError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid export archive")
+
+        fmt = manifest.get("format")
+        if fmt not in ARCHIVE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown archive format: {fmt}")
+        if fmt == "parquet" and pyarrow is None:
+            raise HTTPException(status_code=400, detail="Parquet import requires pyarrow")
+
+        with archive:
+            for table, _ in ARCHIVE_TABLES:
+                name = manifest.get("files", {}).get(table)
+                if name is None:
+                    continue
+                try:
+                    with archive.open(name) as entry:
+                        rows = _read_parquet(entry) if fmt == "parquet" else _read_ndjson(entry)
+                        _import_rows(writer, handles, table, rows)
+                except (KeyError, EOFError, OSError, json.JSONDecodeError, zipfile.BadZipFile):
+                    raise HTTPException(status_code=400, detail=f"Corrupt archive file: {name}")
+
+        writer.flush()
+        db.commit()
+    except BackupFormatError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "message": "Data imported successfully",
+        "imported": dict(writer.counts),
+    }
@@ -0,0 +1,264 @@
+"""
+Streaming XML export of user data.
+
+The backup document is written element by element with XMLGenerator and
+handed out in chunks, while the rows are read from the database in batches,
+so memory use does not grow with the size of the collection.
+"""
+
+import io
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+from xml.sax.saxutils import XMLGenerator
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+APP_VERSION = "2.4"
+
+# Rows fetched per round trip while streaming
+EXPORT_BATCH_SIZE = 500
+
+# Flush the output buffer to the client once it holds this many characters
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+class _IndentedXMLWriter:
+    """XMLGenerator wrapper that indents nested elements two spaces per level."""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self._xml = XMLGenerator(self.buffer, encoding="utf-8", short_empty_elements=True)
+        self._depth = 0
+
+    def start_document(self):
+        self._xml.startDocument()
+
+    def start(self, name: str, **attrs):
+        # startDocument already ended the XML declaration with a newline
+        if self._depth:
+            self._xml.ignorableWhitespace("\n" + "  " * self._depth)
+        self._xml.startElement(name, attrs)
+        self._depth += 1
+
+    def end(self, name: str):
+        self._depth -= 1
+        self._xml.ignorableWhitespace("\n" + "  " * self._depth)
+        self._xml.endElement(name)
+
+    def element(self, name: str, text: Optional[str]):
+        self._xml.ignorableWhitespace("\n" + "  " * self._depth)
+        self._xml.startElement(name, {})
+        if text:
+            self._xml.characters(text)
+        self._xml.endElement(name)
+
+    def end_document(self):
+        self._xml.ignorableWhitespace("\n")
+        self._xml.endDocument()
+
+    def drain(self, min_size: int = 0) -> Optional[bytes]:
+        """Return and clear the buffered output once it reaches ``min_size`` characters."""
+        if self.buffer.tell() < max(min_size, 1):
+            return None
+        data = self.buffer.getvalue().encode("utf-8")
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def count_export_records(db: Session, user_id: int, include_cars: bool = True,
+                         include_todos: bool = True, include_service_intervals: bool = True,
+                         include_service_history: bool = True) -> dict:
+    """Count the records an export will contain without loading them."""
+    def count(model):
+        return db.query(func.count(model.id)).filter(model.user_id == user_id).scalar()
+
+    return {
+        "Cars": count(models.Car) if include_cars else 0,
+        "Todos": count(models.ToDo) if include_todos else 0,
+        "ServiceIntervals": count(models.ServiceInterval) if include_service_intervals and include_cars else 0,
+        "ServiceHistory": count(models.ServiceHistory) if include_service_history and include_cars else 0,
+    }
+
+
+def _write_car(writer: _IndentedXMLWriter, car: models.Car):
+    writer.element("Make", car.make)
+    writer.element("Model", car.model)
+    writer.element("Year", str(car.year))
+    if car.vin:
+        writer.element("VIN", car.vin)
+    if car.mileage is not None:
+        writer.element("Mileage", str(car.mileage))
+    if car.license_plate:
+        writer.element("LicensePlate", car.license_plate)
+    if car.insurance_info:
+        writer.element("InsuranceInfo", car.insurance_info)
+    if car.notes:
+        writer.element("Notes", car.notes)
+    if car.group_name:
+        writer.element("GroupName", car.group_name)
+
+
+def _write_interval(writer: _IndentedXMLWriter, interval: models.ServiceInterval):
+    writer.start("Interval")
+    writer.element("ServiceItem", interval.service_item)
+    if interval.interval_miles:
+        writer.element("IntervalMiles", str(interval.interval_miles))
+    if interval.interval_months:
+        writer.element("IntervalMonths", str(interval.interval_months))
+    writer.element("Priority", interval.priority)
+    if interval.cost_estimate_low:
+        writer.element("CostEstimateLow", str(interval.cost_estimate_low))
+    if interval.cost_estimate_high:
+        writer.element("CostEstimateHigh", str(interval.cost_estimate_high))
+    if interval.notes:
+        writer.element("Notes", interval.notes)
+    if interval.source:
+        writer.element("Source", interval.source)
+    writer.end("Interval")
+
+
+def _write_service(writer: _IndentedXMLWriter, service: models.ServiceHistory):
+    writer.start("Service")
+    writer.element("ServiceItem", service.service_item)
+    writer.element("PerformedDate", service.performed_date.isoformat())
+    if service.mileage:
+        writer.element("Mileage", str(service.mileage))
+    if service.cost:
+        writer.element("Cost", str(service.cost))
+    if service.parts_cost:
+        writer.element("PartsCost", str(service.parts_cost))
+    if service.labor_cost:
+        writer.element("LaborCost", str(service.labor_cost))
+    if service.tax:
+        writer.element("Tax", str(service.tax))
+    if service.shop:
+        writer.element("Shop", service.shop)
+    if service.invoice_number:
+        writer.element("InvoiceNumber", service.invoice_number)
+    if service.notes:
+        writer.element("Notes", service.notes)
+    writer.end("Service")
+
+
+def _write_todo(writer: _IndentedXMLWriter, todo: models.ToDo):
+    writer.start("Todo")
+    writer.element("Title", todo.title)
+    if todo.description:
+        writer.element("Description", todo.description)
+    writer.element("Priority", todo.priority)
+    writer.element("Status", todo.status)
+    writer.element("CarId", str(todo.car_id))
+    if todo.due_date:
+        writer.element("DueDate", todo.due_date.isoformat())
+    writer.end("Todo")
+
+
+def stream_xml_export(db: Session, user_id: int, username: str, include_cars: bool = True,
+                      include_todos: bool = True, include_service_intervals: bool = True,
+                      include_service_history: bool = True, counts: Optional[dict] = None,
+                      chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the XML backup document in UTF-8 chunks of roughly ``chunk_size``."""
+    if counts is None:
+        counts = count_export_records(db, user_id, include_cars, include_todos,
+                                      include_service_intervals, include_service_history)
+
+    writer = _IndentedXMLWriter()
+    writer.start_document()
+    writer.start("CarCollectionBackup", version="1.0")
+
+    # Metadata
+    writer.start("Metadata")
+    writer.element("ExportDate", datetime.utcnow().isoformat())
+    writer.element("Username", username)
+    writer.element("AppVersion", APP_VERSION)
+    writer.start("ExportConfig")
+    writer.element("IncludeCars", str(include_cars))
+    writer.element("IncludeTodos", str(include_todos))
+    writer.element("IncludeServiceIntervals", str(include_service_intervals))
+    writer.element("IncludeServiceHistory", str(include_service_history))
+    writer.end("ExportConfig")
+    writer.start("RecordCounts")
+    for name in ("Cars", "Todos", "ServiceIntervals", "ServiceHistory"):
+        writer.element(name, str(counts[name]))
+    writer.end("RecordCounts")
+    writer.end("Metadata")
+
+    # Cars with their service intervals and history. Children are streamed
+    # ordered by car_id alongside the cars and merge-joined, so the whole
+    # export is three queries and one linear pass.
+    if include_cars and counts["Cars"]:
+        writer.start("Cars")
+        cars = db.query(models.Car).filter(
+            models.Car.user_id == user_id
+        ).order_by(models.Car.id).yield_per(EXPORT_BATCH_SIZE)
+        intervals = _ChildCursor(db.query(models.ServiceInterval).filter(
+            models.ServiceInterval.user_id == user_id
+        ).order_by(models.ServiceInterval.car_id, models.ServiceInterval.id).yield_per(EXPORT_BATCH_SIZE)
+            if include_service_intervals else ())
+        history = _ChildCursor(db.query(models.ServiceHistory).filter(
+            models.ServiceHistory.user_id == user_id
+        ).order_by(models.ServiceHistory.car_id, models.ServiceHistory.id).yield_per(EXPORT_BATCH_SIZE)
+            if include_service_history else ())
+
+        for car in cars:
+            writer.start("Car", id=str(car.id))
+            _write_car(writer, car)
+            _write_children(writer, "ServiceIntervals", intervals.take(car.id), _write_interval)
+            _write_children(writer, "ServiceHistory", history.take(car.id), _write_service)
+            writer.end("Car")
+            chunk = writer.drain(chunk_size)
+            if chunk:
+                yield chunk
+        writer.end("Cars")
+
+    # Todos
+    if include_todos and counts["Todos"]:
+        writer.start("Todos")
+        todos = db.query(models.ToDo).filter(
+            models.ToDo.user_id == user_id
+        ).order_by(models.ToDo.id).yield_per(EXPORT_BATCH_SIZE)
+        for todo in todos:
+            _write_todo(writer, todo)
+            chunk = writer.drain(chunk_size)
+            if chunk:
+                yield chunk
+        writer.end("Todos")
+
+    writer.end("CarCollectionBackup")
+    writer.end_document()
+    chunk = writer.drain()
+    if chunk:
+        yield chunk
+
+
+class _ChildCursor:
+    """Hands out rows ordered by car_id one car at a time, for a merge-join with cars ordered by id."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._next = next(self._rows, None)
+
+    def take(self, car_id: int) -> Iterator:
+        # Rows for cars before this one have no matching car; skip them
+        while self._next is not None and self._next.car_id < car_id:
+            self._next = next(self._rows, None)
+        while self._next is not None and self._next.car_id == car_id:
+            row = self._next
+            self._next = next(self._rows, None)
+            yield row
+
+
+def _write_children(writer: _IndentedXMLWriter, container: str, rows, write_row: Callable):
+    """Write ``rows`` inside a ``container`` element, omitting it when there are none."""
+    opened = False
+    for row in rows:
+        if not opened:
+            writer.start(container)
+            opened = True
+        write_row(writer, row)
+    if opened:
+        writer.end(container)
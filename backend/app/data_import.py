@@ -0,0 +1,260 @@
+"""
+Bulk import of XML backups.
+
+The backup is parsed incrementally; records are validated with the API
+schemas and written with multi-row INSERTs in chunks inside a single
+transaction: the import either lands completely or not at all.
+"""
+
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+# Rows per INSERT round trip
+IMPORT_BATCH_SIZE = 500
+
+
+class BackupFormatError(ValueError):
+    """Raised when a record in the backup is missing fields or has invalid values"""
+    pass
+
+
+def _text(elem: ET.Element, tag: str) -> Optional[str]:
+    child = elem.find(tag)
+    return child.text if child is not None else None
+
+
+def _validate(schema, data: dict, record: str) -> dict:
+    try:
+        return schema(**data).model_dump()
+    except ValidationError as e:
+        raise BackupFormatError(f"Invalid {record}: {e.errors()[0]['loc'][0]} {e.errors()[0]['msg']}")
+
+
+def _convert(value: Optional[str], converter, record: str, field: str):
+    if value is None:
+        return None
+    try:
+        return converter(value)
+    except ValueError:
+        raise BackupFormatError(f"Invalid {record}: {field} {value!r}")
+
+
+def parse_car(elem: ET.Element) -> Tuple[Optional[str], dict]:
+    """Return the backup's car id and the validated car fields (without child records)."""
+    mileage = _text(elem, "Mileage")
+    if mileage == "None":
+        # Older exports wrote the missing mileage of a car out as "None"
+        mileage = None
+    data = {
+        "make": _text(elem, "Make"),
+        "model": _text(elem, "Model"),
+        "year": _convert(_text(elem, "Year"), int, "car", "Year"),
+        "mileage": _convert(mileage, int, "car", "Mileage"),
+    }
+    for field, tag in (("vin", "VIN"), ("license_plate", "LicensePlate"),
+                       ("insurance_info", "InsuranceInfo"), ("notes", "Notes"), ("group_name", "GroupName")):
+        if elem.find(tag) is not None:
+            data[field] = _text(elem, tag)
+    return elem.get("id"), _validate(schemas.CarCreate, data, "car")
+
+
+def parse_interval(elem: ET.Element) -> dict:
+    data = {
+        "service_item": _text(elem, "ServiceItem"),
+        "priority": _text(elem, "Priority"),
+        "interval_miles": _convert(_text(elem, "IntervalMiles"), int, "service interval", "IntervalMiles"),
+        "interval_months": _convert(_text(elem, "IntervalMonths"), int, "service interval", "IntervalMonths"),
+        "cost_estimate_low": _convert(_text(elem, "CostEstimateLow"), float, "service interval", "CostEstimateLow"),
+        "cost_estimate_high": _convert(_text(elem, "CostEstimateHigh"), float, "service interval", "CostEstimateHigh"),
+        "notes": _text(elem, "Notes"),
+        "source": _text(elem, "Source"),
+    }
+    return _validate(schemas.ServiceIntervalBase, data, "service interval")
+
+
+def parse_service(elem: ET.Element) -> dict:
+    data = {
+        "service_item": _text(elem, "ServiceItem"),
+        "performed_date": _convert(_text(elem, "PerformedDate"), datetime.fromisoformat, "service", "PerformedDate"),
+        "mileage": _convert(_text(elem, "Mileage"), int, "service", "Mileage"),
+        "cost": _convert(_text(elem, "Cost"), float, "service", "Cost"),
+        "parts_cost": _convert(_text(elem, "PartsCost"), float, "service", "PartsCost"),
+        "labor_cost": _convert(_text(elem, "LaborCost"), float, "service", "LaborCost"),
+        "tax": _convert(_text(elem, "Tax"), float, "service", "Tax"),
+        "shop": _text(elem, "Shop"),
+        "invoice_number": _text(elem, "InvoiceNumber"),
+        "notes": _text(elem, "Notes"),
+    }
+    return _validate(schemas.ServiceHistoryBase, data, "service")
+
+
+def parse_todo(elem: ET.Element) -> Tuple[Optional[str], dict]:
+    """Return the backup's car id for the todo and its validated fields."""
+    data = {
+        "title": _text(elem, "Title"),
+        "priority": _text(elem, "Priority"),
+        "status": _text(elem, "Status"),
+        "description": _text(elem, "Description"),
+        "due_date": _convert(_text(elem, "DueDate"), datetime.fromisoformat, "todo", "DueDate"),
+    }
+    return _text(elem, "CarId"), _validate(schemas.ToDoBase, data, "todo")
+
+
+class BatchedImportWriter:
+    """
+    Buffers imported records and writes them with multi-row INSERTs.
+
+    Cars are referred to by the handle returned from ``add_car`` until they
+    are inserted; flushing inserts pending cars first (collecting their new
+    ids with RETURNING, in parameter order) and then their children. Nothing
+    is committed here - the caller owns the transaction.
+    """
+
+    def __init__(self, db: Session, user_id: int, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.car_ids: Dict[int, int] = {}  # handle -> new car id
+        self.counts = {"cars": 0, "service_intervals": 0, "service_history": 0, "todos": 0}
+        self._cars: List[Tuple[int, dict]] = []
+        self._children: Dict[type, List[Tuple[int, dict]]] = {
+            models.ServiceInterval: [], models.ServiceHistory: [], models.ToDo: []
+        }
+        self._next_handle = 0
+
+    def add_car(self, car: dict) -> int:
+        handle = self._next_handle
+        self._next_handle += 1
+        self._cars.append((handle, car))
+        self._flush_if_full(self._cars)
+        return handle
+
+    def add_interval(self, car_handle: int, interval: dict) -> None:
+        self._add_child(models.ServiceInterval, car_handle, interval)
+
+    def add_service(self, car_handle: int, service: dict) -> None:
+        self._add_child(models.ServiceHistory, car_handle, service)
+
+    def add_todo(self, car_handle: int, todo: dict) -> None:
+        self._add_child(models.ToDo, car_handle, todo)
+
+    def _add_child(self, model, car_handle: int, row: dict) -> None:
+        rows = self._children[model]
+        rows.append((car_handle, row))
+        self._flush_if_full(rows)
+
+    def _flush_if_full(self, rows) -> None:
+        if len(rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything buffered so far."""
+        if self._cars:
+            new_ids = self.db.scalars(
+                insert(models.Car).returning(models.Car.id, sort_by_parameter_order=True),
+                [{**car, "user_id": self.user_id} for _, car in self._cars]
+            ).all()
+            for (handle, _), new_id in zip(self._cars, new_ids):
+                self.car_ids[handle] = new_id
+            self.counts["cars"] += len(self._cars)
+            self._cars = []
+
+        for model, rows in self._children.items():
+            if not rows:
+                continue
+            self.db.execute(insert(model), [
+                {**row, "car_id": self.car_ids[handle], "user_id": self.user_id}
+                for handle, row in rows
+            ])
+            self.counts[model.__tablename__] += len(rows)
+            rows.clear()
+
+
+def import_backup_stream(source: BinaryIO, user_id: int, db: Session,
+                         batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """
+    Import an XML backup from a file object in one transaction.
+
+    The document is parsed incrementally with iterparse: each Car, Interval,
+    Service and Todo element is validated and handed to the batched writer
+    as soon as it is complete, then discarded, so memory use stays flat
+    however large the backup is. Records are written as they are read; a
+    malformed record (HTTPException 400), XML syntax error (ET.ParseError) or
+    write failure rolls back everything imported so far.
+    """
+    writer = BatchedImportWriter(db, user_id, batch_size)
+    handles: Dict[Optional[str], int] = {}  # backup car id -> writer handle
+    stack: List[ET.Element] = []
+    car_handle: Optional[int] = None
+    seen_metadata = False
+
+    def add_car(car_elem: ET.Element) -> int:
+        old_car_id, car = parse_car(car_elem)
+        handle = writer.add_car(car)
+        handles[old_car_id] = handle
+        return handle
+
+    try:
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                if not stack and elem.tag != "CarCollectionBackup":
+                    raise HTTPException(status_code=400, detail="Invalid backup file format")
+                # A car's own fields come before its child records, so the car
+                # can be written once its first child collection starts
+                if elem.tag in ("ServiceIntervals", "ServiceHistory") and stack[-1].tag == "Car" \
+                        and car_handle is None:
+                    car_handle = add_car(stack[-1])
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+            if elem.tag == "Metadata" and parent is not None and parent.tag == "CarCollectionBackup":
+                seen_metadata = True
+            elif elem.tag == "Interval" and car_handle is not None and parent.tag == "ServiceIntervals":
+                writer.add_interval(car_handle, parse_interval(elem))
+            elif elem.tag == "Service" and car_handle is not None and parent.tag == "ServiceHistory":
+                writer.add_service(car_handle, parse_service(elem))
+            elif elem.tag == "Car" and parent is not None and parent.tag == "Cars":
+                if car_handle is None:
+                    add_car(elem)
+                car_handle = None
+            elif elem.tag == "Todo" and parent is not None and parent.tag == "Todos":
+                old_car_id, todo = parse_todo(elem)
+                # Skip todos whose car wasn't in the backup
+                if old_car_id in handles:
+                    writer.add_todo(handles[old_car_id], todo)
+            else:
+                continue
+
+            # Drop consumed records so the parsed tree never grows
+            elem.clear()
+            if parent is not None and elem.tag != "Metadata":
+                parent.remove(elem)
+
+        if not seen_metadata:
+            raise HTTPException(status_code=400, detail="Missing metadata in backup file")
+        writer.flush()
+        db.commit()
+    except BackupFormatError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "message": "Data imported successfully",
+        "imported": {
+            "cars": writer.counts["cars"],
+            "todos": writer.counts["todos"],
+        }
+    }
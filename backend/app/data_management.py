@@ -3,163 +3,49 @@ Data management endpoints for export, import, and clearing user data.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import Response
-from sqlalchemy.orm import Session
-from typing import Dict
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Dict, Optional
+import io
+import tempfile
 import xml.etree.ElementTree as ET
 from datetime import datetime
-import xml.dom.minidom as minidom
 
-from . import models, schemas, crud
+from . import crud, models
+from .data_archive import ARCHIVE_FORMATS, ARCHIVE_SPOOL_SIZE, import_archive, parquet_available, write_archive
+from .data_delta import stream_delta
+from .data_export import count_export_records, stream_xml_export
+from .data_import import import_backup_stream
 from .database import get_db
 from .auth import get_current_active_user
+from .metrics import REGISTRY
 
 router = APIRouter()
 
+EXPORT_BYTES = REGISTRY.counter(
+    "data_export_bytes_total",
+    "Bytes sent by data exports, by format (xml, ndjson or parquet)",
+    ["format"]
+)
+IMPORT_BYTES = REGISTRY.counter(
+    "data_import_bytes_total",
+    "Bytes received by successful data imports, by format (xml or archive)",
+    ["format"]
+)
 
-def create_xml_export(user: models.User, db: Session, include_cars: bool = True, 
-                     include_todos: bool = True, include_service_intervals: bool = True,
-                     include_service_history: bool = True) -> str:
-    """Create XML export of selected user data."""
-    # Create root element
-    root = ET.Element("CarCollectionBackup", version="1.0")
-    
-    # Add metadata
-    metadata = ET.SubElement(root, "Metadata")
-    ET.SubElement(metadata, "ExportDate").text = datetime.utcnow().isoformat()
-    ET.SubElement(metadata, "Username").text = user.username
-    ET.SubElement(metadata, "AppVersion").text = "2.4"
-    
-    # Add export configuration
-    export_config = ET.SubElement(metadata, "ExportConfig")
-    ET.SubElement(export_config, "IncludeCars").text = str(include_cars)
-    ET.SubElement(export_config, "IncludeTodos").text = str(include_todos)
-    ET.SubElement(export_config, "IncludeServiceIntervals").text = str(include_service_intervals)
-    ET.SubElement(export_config, "IncludeServiceHistory").text = str(include_service_history)
-    
-    # Get data based on selections
-    cars = []
-    todos = []
-    service_intervals = []
-    service_history = []
-    
-    if include_cars:
-        cars = db.query(models.Car).filter(models.Car.user_id == user.id).all()
-    
-    if include_todos:
-        todos = db.query(models.ToDo).filter(models.ToDo.user_id == user.id).all()
-    
-    if include_service_intervals and include_cars:
-        service_intervals = db.query(models.ServiceInterval).filter(
-            models.ServiceInterval.user_id == user.id
-        ).all()
-    
-    if include_service_history and include_cars:
-        service_history = db.query(models.ServiceHistory).filter(
-            models.ServiceHistory.user_id == user.id
-        ).all()
-    
-    # Add record counts
-    counts = ET.SubElement(metadata, "RecordCounts")
-    ET.SubElement(counts, "Cars").text = str(len(cars))
-    ET.SubElement(counts, "Todos").text = str(len(todos))
-    ET.SubElement(counts, "ServiceIntervals").text = str(len(service_intervals))
-    ET.SubElement(counts, "ServiceHistory").text = str(len(service_history))
-    
-    # Export Cars (only if included)
-    if include_cars and cars:
-        cars_elem = ET.SubElement(root, "Cars")
-        for car in cars:
-            car_elem = ET.SubElement(cars_elem, "Car", id=str(car.id))
-            ET.SubElement(car_elem, "Make").text = car.make
-            ET.SubElement(car_elem, "Model").text = car.model
-            ET.SubElement(car_elem, "Year").text = str(car.year)
-            if car.vin:
-                ET.SubElement(car_elem, "VIN").text = car.vin
-            ET.SubElement(car_elem, "Mileage").text = str(car.mileage)
-            if car.license_plate:
-                ET.SubElement(car_elem, "LicensePlate").text = car.license_plate
-            if car.insurance_info:
-                ET.SubElement(car_elem, "InsuranceInfo").text = car.insurance_info
-            if car.notes:
-                ET.SubElement(car_elem, "Notes").text = car.notes
-            if car.group_name:
-                ET.SubElement(car_elem, "GroupName").text = car.group_name
-            
-            # Export service intervals for this car (if included)
-            if include_service_intervals:
-                car_intervals = [si for si in service_intervals if si.car_id == car.id]
-                if car_intervals:
-                    intervals_elem = ET.SubElement(car_elem, "ServiceIntervals")
-                    for interval in car_intervals:
-                        interval_elem = ET.SubElement(intervals_elem, "Interval")
-                        ET.SubElement(interval_elem, "ServiceItem").text = interval.service_item
-                        if interval.interval_miles:
-                            ET.SubElement(interval_elem, "IntervalMiles").text = str(interval.interval_miles)
-                        if interval.interval_months:
-                            ET.SubElement(interval_elem, "IntervalMonths").text = str(interval.interval_months)
-                        ET.SubElement(interval_elem, "Priority").text = interval.priority
-                        if interval.cost_estimate_low:
-                            ET.SubElement(interval_elem, "CostEstimateLow").text = str(interval.cost_estimate_low)
-                        if interval.cost_estimate_high:
-                            ET.SubElement(interval_elem, "CostEstimateHigh").text = str(interval.cost_estimate_high)
-                        if interval.notes:
-                            ET.SubElement(interval_elem, "Notes").text = interval.notes
-                        if interval.source:
-                            ET.SubElement(interval_elem, "Source").text = interval.source
-            
-            # Export service history for this car (if included)
-            if include_service_history:
-                car_history = [sh for sh in service_history if sh.car_id == car.id]
-                if car_history:
-                    history_elem = ET.SubElement(car_elem, "ServiceHistory")
-                    for service in car_history:
-                        service_elem = ET.SubElement(history_elem, "Service")
-                        ET.SubElement(service_elem, "ServiceItem").text = service.service_item
-                        ET.SubElement(service_elem, "PerformedDate").text = service.performed_date.isoformat()
-                        if service.mileage:
-                            ET.SubElement(service_elem, "Mileage").text = str(service.mileage)
-                        if service.cost:
-                            ET.SubElement(service_elem, "Cost").text = str(service.cost)
-                        if service.parts_cost:
-                            ET.SubElement(service_elem, "PartsCost").text = str(service.parts_cost)
-                        if service.labor_cost:
-                            ET.SubElement(service_elem, "LaborCost").text = str(service.labor_cost)
-                        if service.tax:
-                            ET.SubElement(service_elem, "Tax").text = str(service.tax)
-                        if service.shop:
-                            ET.SubElement(service_elem, "Shop").text = service.shop
-                        if service.invoice_number:
-                            ET.SubElement(service_elem, "InvoiceNumber").text = service.invoice_number
-                        if service.notes:
-                            ET.SubElement(service_elem, "Notes").text = service.notes
-    
-    # Export Todos (only if included)
-    if include_todos and todos:
-        todos_elem = ET.SubElement(root, "Todos")
-        for todo in todos:
-            todo_elem = ET.SubElement(todos_elem, "Todo")
-            ET.SubElement(todo_elem, "Title").text = todo.title
-            if todo.description:
-                ET.SubElement(todo_elem, "Description").text = todo.description
-            ET.SubElement(todo_elem, "Priority").text = todo.priority
-            ET.SubElement(todo_elem, "Status").text = todo.status
-            ET.SubElement(todo_elem, "CarId").text = str(todo.car_id)
-            if todo.due_date:
-                ET.SubElement(todo_elem, "DueDate").text = todo.due_date.isoformat()
-    
-    # Convert to pretty-printed XML string
-    xml_str = ET.tostring(root, encoding='unicode')
-    dom = minidom.parseString(xml_str)
-    pretty_xml = dom.toprettyxml(indent="  ")
-    
-    # Remove extra blank lines
-    lines = [line for line in pretty_xml.split('\n') if line.strip()]
-    return '\n'.join(lines)
+
+def _upload_size(file: UploadFile) -> int:
+    upload = file.file
+    position = upload.tell()
+    upload.seek(0, io.SEEK_END)
+    size = upload.tell()
+    upload.seek(position)
+    return size
 
 
 @router.post("/data/export")
-async def export_data(
+def export_data(
     include_cars: bool = True,
     include_todos: bool = True,
     include_service_intervals: bool = True,
@@ -167,15 +53,15 @@ async def export_data(
     current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Export selected user data as XML."""
+    """Export selected user data as XML, streamed as it is written."""
     try:
-        xml_content = create_xml_export(
-            current_user, db,
+        options = dict(
             include_cars=include_cars,
             include_todos=include_todos,
             include_service_intervals=include_service_intervals,
             include_service_history=include_service_history
         )
+        counts = count_export_records(db, current_user.id, **options)
         
         # Generate filename that indicates what's included
         data_types = []
@@ -186,26 +72,107 @@ async def export_data(
         
         filename_suffix = "_".join(data_types) if data_types else "empty"
         filename = f"car_collection_{filename_suffix}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xml"
-        
-        return Response(
-            content=xml_content,
-            media_type="application/xml",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    
+    # The body is produced after this handler returns, so it reads through its
+    # own session rather than the request-scoped one
+    session_factory = sessionmaker(bind=db.get_bind())
+    user_id, username = current_user.id, current_user.username
+    
+    def body():
+        export_db = session_factory()
+        try:
+            for chunk in stream_xml_export(export_db, user_id, username, counts=counts, **options):
+                EXPORT_BYTES.inc(len(chunk), format="xml")
+                yield chunk
+        finally:
+            export_db.close()
+    
+    return StreamingResponse(
+        body(),
+        media_type="application/xml",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
+
+
+@router.post("/data/export/archive")
+def export_archive(
+    format: str = "ndjson",
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Export every table as gzip NDJSON or Parquet files in a zip archive."""
+    if format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(ARCHIVE_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export is not available on this server")
+    
+    # A zip's directory comes last, so the archive is assembled in a spooled
+    # file and then streamed out
+    archive = tempfile.SpooledTemporaryFile(ARCHIVE_SPOOL_SIZE)
+    try:
+        write_archive(db, current_user.id, current_user.username, archive, format)
+        archive.seek(0)
+    except Exception as e:
+        archive.close()
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    
+    def body():
+        with archive:
+            while chunk := archive.read(64 * 1024):
+                EXPORT_BYTES.inc(len(chunk), format=format)
+                yield chunk
+    
+    filename = f"car_collection_{format}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        body(),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
+
+
+@router.get("/data/export/delta")
+def export_data_delta(
+    since: Optional[datetime] = None,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Export rows created or changed after the ``since`` watermark, plus deletions.
+
+    Pass the returned ``watermark`` as ``since`` on the next call; without
+    ``since`` everything is returned. Recent changes and deletions repeat
+    in the next delta, so apply them by table and id.
+    """
+    # Streamed after the handler returns, so it reads through its own session
+    session_factory = sessionmaker(bind=db.get_bind())
+    user_id = current_user.id
+
+    def body():
+        delta_db = session_factory()
+        try:
+            yield from stream_delta(delta_db, user_id, since)
+        finally:
+            delta_db.close()
+
+    return StreamingResponse(body(), media_type="application/json")
 
 
 @router.delete("/data/clear-all")
-async def clear_all_data(
+def clear_all_data(
     current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Clear all user data (cars, todos, service history, etc.)."""
     try:
         # Delete in correct order to respect foreign keys
+        for model in (models.ServiceHistory, models.ServiceInterval, models.ToDo, models.Car):
+            crud.log_deletions(db, model, current_user.id)
         db.query(models.ServiceHistory).filter_by(user_id=current_user.id).delete()
         db.query(models.ServiceInterval).filter_by(user_id=current_user.id).delete()
         db.query(models.ToDo).filter_by(user_id=current_user.id).delete()
@@ -219,6 +186,11 @@ async def clear_all_data(
         raise HTTPException(status_code=500, detail=f"Failed to clear data: {str(e)}")
 
 
+def import_xml_backup(content: bytes, user_id: int, db: Session) -> Dict:
+    """Parse an XML backup held in memory and write its records for the given user."""
+    return import_backup_stream(io.BytesIO(content), user_id, db)
+
+
 @router.post("/data/import")
 async def import_data(
     file: UploadFile = File(...),
@@ -227,147 +199,34 @@ async def import_data(
 ):
     """Import data from XML backup file."""
     try:
-        # Read and parse XML file
-        content = await file.read()
-        root = ET.fromstring(content.decode('utf-8'))
-        
-        # Validate XML structure
-        if root.tag != "CarCollectionBackup":
-            raise HTTPException(status_code=400, detail="Invalid backup file format")
-        
-        # Extract metadata
-        metadata = root.find("Metadata")
-        if metadata is None:
-            raise HTTPException(status_code=400, detail="Missing metadata in backup file")
-        
-        # Keep track of ID mappings (old ID -> new ID)
-        car_id_map = {}
-        
-        # Import Cars
-        cars_elem = root.find("Cars")
-        if cars_elem is not None:
-            for car_elem in cars_elem.findall("Car"):
-                old_car_id = car_elem.get("id")
-                
-                # Create car
-                car_data = {
-                    "make": car_elem.find("Make").text,
-                    "model": car_elem.find("Model").text,
-                    "year": int(car_elem.find("Year").text),
-                    "mileage": int(car_elem.find("Mileage").text),
-                }
-                
-                # Optional fields
-                if car_elem.find("VIN") is not None:
-                    car_data["vin"] = car_elem.find("VIN").text
-                if car_elem.find("LicensePlate") is not None:
-                    car_data["license_plate"] = car_elem.find("LicensePlate").text
-                if car_elem.find("InsuranceInfo") is not None:
-                    car_data["insurance_info"] = car_elem.find("InsuranceInfo").text
-                if car_elem.find("Notes") is not None:
-                    car_data["notes"] = car_elem.find("Notes").text
-                if car_elem.find("GroupName") is not None:
-                    car_data["group_name"] = car_elem.find("GroupName").text
-                
-                # Create car in database
-                car_create = schemas.CarCreate(**car_data)
-                new_car = crud.create_car(db, car_create, current_user.id)
-                car_id_map[old_car_id] = new_car.id
-                
-                # Import service intervals for this car
-                intervals_elem = car_elem.find("ServiceIntervals")
-                if intervals_elem is not None:
-                    for interval_elem in intervals_elem.findall("Interval"):
-                        interval_data = {
-                            "car_id": new_car.id,
-                            "service_item": interval_elem.find("ServiceItem").text,
-                            "priority": interval_elem.find("Priority").text,
-                        }
-                        
-                        if interval_elem.find("IntervalMiles") is not None:
-                            interval_data["interval_miles"] = int(interval_elem.find("IntervalMiles").text)
-                        if interval_elem.find("IntervalMonths") is not None:
-                            interval_data["interval_months"] = int(interval_elem.find("IntervalMonths").text)
-                        if interval_elem.find("CostEstimateLow") is not None:
-                            interval_data["cost_estimate_low"] = float(interval_elem.find("CostEstimateLow").text)
-                        if interval_elem.find("CostEstimateHigh") is not None:
-                            interval_data["cost_estimate_high"] = float(interval_elem.find("CostEstimateHigh").text)
-                        if interval_elem.find("Notes") is not None:
-                            interval_data["notes"] = interval_elem.find("Notes").text
-                        if interval_elem.find("Source") is not None:
-                            interval_data["source"] = interval_elem.find("Source").text
-                        
-                        interval_create = schemas.ServiceIntervalCreate(**interval_data)
-                        crud.create_service_interval(db, interval_create, current_user.id)
-                
-                # Import service history for this car
-                history_elem = car_elem.find("ServiceHistory")
-                if history_elem is not None:
-                    for service_elem in history_elem.findall("Service"):
-                        service_data = {
-                            "car_id": new_car.id,
-                            "service_item": service_elem.find("ServiceItem").text,
-                            "performed_date": datetime.fromisoformat(service_elem.find("PerformedDate").text),
-                        }
-                        
-                        if service_elem.find("Mileage") is not None:
-                            service_data["mileage"] = int(service_elem.find("Mileage").text)
-                        if service_elem.find("Cost") is not None:
-                            service_data["cost"] = float(service_elem.find("Cost").text)
-                        if service_elem.find("PartsCost") is not None:
-                            service_data["parts_cost"] = float(service_elem.find("PartsCost").text)
-                        if service_elem.find("LaborCost") is not None:
-                            service_data["labor_cost"] = float(service_elem.find("LaborCost").text)
-                        if service_elem.find("Tax") is not None:
-                            service_data["tax"] = float(service_elem.find("Tax").text)
-                        if service_elem.find("Shop") is not None:
-                            service_data["shop"] = service_elem.find("Shop").text
-                        if service_elem.find("InvoiceNumber") is not None:
-                            service_data["invoice_number"] = service_elem.find("InvoiceNumber").text
-                        if service_elem.find("Notes") is not None:
-                            service_data["notes"] = service_elem.find("Notes").text
-                        
-                        service_create = schemas.ServiceHistoryCreate(**service_data)
-                        crud.create_service_history(db, service_create, current_user.id)
-        
-        # Import Todos
-        todos_elem = root.find("Todos")
-        if todos_elem is not None:
-            for todo_elem in todos_elem.findall("Todo"):
-                old_car_id = todo_elem.find("CarId").text
-                
-                # Skip if car wasn't imported
-                if old_car_id not in car_id_map:
-                    continue
-                
-                todo_data = {
-                    "car_id": car_id_map[old_car_id],
-                    "title": todo_elem.find("Title").text,
-                    "priority": todo_elem.find("Priority").text,
-                    "status": todo_elem.find("Status").text,
-                }
-                
-                if todo_elem.find("Description") is not None:
-                    todo_data["description"] = todo_elem.find("Description").text
-                if todo_elem.find("DueDate") is not None:
-                    todo_data["due_date"] = datetime.fromisoformat(todo_elem.find("DueDate").text)
-                
-                todo_create = schemas.ToDoCreate(**todo_data)
-                crud.create_todo(db, todo_create, current_user.id)
-        
-        db.commit()
-        
-        # Return summary
-        return {
-            "message": "Data imported successfully",
-            "imported": {
-                "cars": len(car_id_map),
-                "todos": len(todos_elem.findall("Todo")) if todos_elem is not None else 0,
-            }
-        }
+        # Parse straight from the spooled upload rather than reading it into
+        # memory; parsing and database writes are blocking, so keep them off
+        # the event loop
+        result = await run_in_threadpool(import_backup_stream, file.file, current_user.id, db)
+        IMPORT_BYTES.inc(_upload_size(file), format="xml")
+        return result
         
+    except HTTPException:
+        raise
     except ET.ParseError as e:
         raise HTTPException(status_code=400, detail=f"Invalid XML format: {str(e)}")
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+
+
+@router.post("/data/import/archive")
+async def import_archive_data(
+    file: UploadFile = File(...),
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Import data from a zip archive created by /data/export/archive."""
+    try:
+        result = await run_in_threadpool(import_archive, file.file, current_user.id, db)
+        IMPORT_BYTES.inc(_upload_size(file), format="archive")
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
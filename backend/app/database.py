@@ -1,11 +1,83 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
+
+from .config import settings
+from .metrics import REGISTRY
+
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./car_collection.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """
+    Tune a new SQLite connection for concurrent use by several workers.
+
+    WAL lets readers proceed while a writer is active, busy_timeout makes
+    writers wait for the lock instead of failing with "database is locked",
+    and synchronous=NORMAL is durable under WAL while avoiding an fsync on
+    every commit.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+    finally:
+        cursor.close()
+
+
+DB_POOL_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_seconds",
+    "Time to obtain a connection from the pool, including waiting for a free one"
 )
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout takes"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+def create_db_engine(database_url: str = SQLALCHEMY_DATABASE_URL):
+    """
+    Create the SQLAlchemy engine for the configured database.
+
+    SQLite stays the development default, is shared across threads and has
+    its pragmas applied on every new connection.
+    Server databases (PostgreSQL) get a real connection pool whose size,
+    overflow, timeout, recycle and pre-ping behaviour come from settings.
+    """
+    url = make_url(database_url)
+
+    if url.get_backend_name() == "sqlite":
+        # In-memory databases keep SQLAlchemy's single-connection pool
+        pool_options = {} if url.database in (None, "", ":memory:") else {"poolclass": TimedQueuePool}
+        sqlite_engine = create_engine(database_url, connect_args={"check_same_thread": False}, **pool_options)
+        event.listen(sqlite_engine, "connect", apply_sqlite_pragmas)
+        return sqlite_engine
+
+    return create_engine(
+        database_url,
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -15,4 +87,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -0,0 +1,72 @@
+"""
+Shared HTTP Client
+
+One aiohttp ClientSession per worker process, opened and closed with the
+application lifespan. Research sources borrow it instead of owning sessions,
+so connections (and their TLS handshakes and DNS lookups) are pooled and
+reused across requests.
+"""
+
+import logging
+from typing import Optional
+
+import aiohttp
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class HTTPClientRegistry:
+    """Owns the shared ClientSession and its connection pool"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=settings.http_pool_limit,
+            limit_per_host=settings.http_pool_limit_per_host,
+            ttl_dns_cache=settings.http_dns_cache_seconds,
+            keepalive_timeout=settings.http_keepalive_seconds
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=settings.http_timeout_seconds),
+            headers={'User-Agent': USER_AGENT}
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None and not self._session.closed
+
+    async def start(self) -> None:
+        """Open the shared session (called on application startup)"""
+        if not self.is_open:
+            self._session = self._create_session()
+            logger.info("Opened shared HTTP client session")
+
+    async def close(self) -> None:
+        """Close the shared session and its pooled connections (called on shutdown)"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            logger.info("Closed shared HTTP client session")
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Borrow the shared session. Callers must not close it.
+
+        Outside the application (scripts, tests) the session is opened on
+        first use; close() it when done.
+        """
+        # start() doesn't yield before assigning, so concurrent callers share one session
+        if not self.is_open:
+            await self.start()
+        return self._session
+
+
+# Global registry used by the application
+http_client = HTTPClientRegistry()
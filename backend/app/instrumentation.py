@@ -0,0 +1,182 @@
+"""
+Per-request instrumentation.
+
+Cursor execution hooks on every engine add each statement's duration to the
+stats of the request being served, tracked in a context variable so
+concurrent requests never mix. The middleware reports the totals as a
+``Server-Timing`` header when ``settings.server_timing`` is on, and logs
+requests whose database time crosses ``settings.slow_query_log_ms`` along
+with their slowest statement.
+
+RequestMetricsMiddleware records request latency per route template and the
+number of requests in flight in the metrics registry.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text kept for the slow-query log
+MAX_STATEMENT_LENGTH = 500
+
+_WHITESPACE = re.compile(r"\s+")
+
+HTTP_REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Request latency by method, route template and response status",
+    ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight",
+    "Requests currently being served"
+)
+
+
+@dataclass
+class QueryStats:
+    """SQL statements executed while serving one request"""
+    count: int = 0
+    total_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_seconds * 1000:.1f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_seconds * 1000:.1f}"
+        )
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect the statements executed inside the block, e.g. for a background job"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+def install_query_hooks(target=Engine) -> None:
+    """Time statements on ``target`` - every engine by default. Safe to call more than once."""
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+def _shorten(statement: str) -> str:
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        statement = statement[:MAX_STATEMENT_LENGTH] + "..."
+    return statement
+
+
+class QueryInstrumentationMiddleware:
+    """ASGI middleware giving each HTTP request its own QueryStats"""
+
+    def __init__(self, app, server_timing: Optional[bool] = None, slow_query_log_ms: Optional[float] = None):
+        self.app = app
+        self.server_timing = server_timing  # None follows settings.server_timing
+        self.slow_query_log_ms = settings.slow_query_log_ms if slow_query_log_ms is None else slow_query_log_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        server_timing = settings.server_timing if self.server_timing is None else self.server_timing
+
+        async def send_with_timing(message):
+            # Streamed bodies keep querying after this point; the header
+            # covers the work done before the response started
+            if message["type"] == "http.response.start" and server_timing:
+                message["headers"] = [
+                    *message.get("headers", []), (b"server-timing", stats.server_timing().encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            if self.slow_query_log_ms and stats.total_seconds * 1000 >= self.slow_query_log_ms:
+                logger.warning(
+                    f"Slow database time for {scope['method']} {scope['path']}: "
+                    f"{stats.count} queries in {stats.total_seconds * 1000:.1f} ms, "
+                    f"slowest {stats.slowest_seconds * 1000:.1f} ms: {_shorten(stats.slowest_statement or '')}"
+                )
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500  # unless the app gets as far as starting a response
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Label by template rather than path so ids don't explode the series count
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_LATENCY.observe(
+                time.perf_counter() - started, method=scope["method"], route=route, status=str(status_code)
+            )
@@ -2,7 +2,7 @@
 User invitation system API endpoints.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timedelta, UTC
 from typing import List, Optional
 import secrets
@@ -88,12 +88,18 @@ def list_invitations(
     include_used: bool = False
 ):
     """List all invitations (admin only)."""
-    query = db.query(UserInvitation)
+    # Both usernames are read for every row, so load them in the same query
+    query = db.query(UserInvitation).options(
+        joinedload(UserInvitation.invited_by),
+        joinedload(UserInvitation.used_by)
+    )
     
     if not include_used:
         query = query.filter(UserInvitation.used == False)
     
     invitations = query.order_by(UserInvitation.created_at.desc()).all()
+    # expires_at comes back from the database as naive UTC
+    now = datetime.now(UTC).replace(tzinfo=None)
     
     return [{
         "id": inv.id,
@@ -105,7 +111,7 @@ def list_invitations(
         "used_by": inv.used_by.username if inv.used_by else None,
         "expires_at": inv.expires_at.isoformat(),
         "created_at": inv.created_at.isoformat(),
-        "is_expired": inv.expires_at < datetime.now(UTC)
+        "is_expired": inv.expires_at < now
     } for inv in invitations]
 
 
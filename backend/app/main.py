@@ -1,23 +1,44 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from . import models, schemas, crud, database
 from .database import SessionLocal, engine, get_db
 from .auth import (
     authenticate_user, create_access_token, get_current_active_user,
-    get_current_admin_user, update_last_login, verify_password
+    get_current_admin_user, get_metrics_reader, update_last_login, verify_password, principal_cache,
+    PasswordHashingBusy
 )
 from .service_api import router as service_router
 from .data_management import router as data_router
 from .invitation_api import router as invitation_router
 from .config import settings
-from typing import List
+from .dashboard import get_dashboard
+from .http_client import http_client
+from .instrumentation import QueryInstrumentationMiddleware, RequestMetricsMiddleware, install_query_hooks
+from .metrics import CONTENT_TYPE, configure_multiprocess, render_metrics
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, set_next_cursor
+from .search import MAX_SEARCH_RESULTS, search
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
 from datetime import timedelta, datetime, UTC
 
 models.Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown"""
+    await http_client.start()
+    if shared_metrics is not None:
+        shared_metrics.start()
+    yield
+    if shared_metrics is not None:
+        shared_metrics.stop()
+    await http_client.close()
+
 app = FastAPI(
     title="Car Collection API",
+    lifespan=lifespan,
     docs_url="/api/docs" if settings.debug else None,
     redoc_url="/api/redoc" if settings.debug else None
 )
@@ -29,6 +50,13 @@ app.include_router(data_router)
 # Include invitation routes
 app.include_router(invitation_router)
 
+# Count and time the SQL each request runs; Server-Timing header when enabled
+install_query_hooks()
+app.add_middleware(QueryInstrumentationMiddleware)
+# Per-route latency and in-flight requests, shared across workers when configured
+shared_metrics = configure_multiprocess(settings.metrics_multiproc_dir, settings.metrics_snapshot_interval_seconds)
+app.add_middleware(RequestMetricsMiddleware)
+
 # Configure CORS based on environment
 app.add_middleware(
     CORSMiddleware,
@@ -36,10 +64,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
 
 # get_db function is now imported from database.py
 
+@app.exception_handler(PasswordHashingBusy)
+def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    """Shed load when the bcrypt pool is saturated instead of starving other endpoints."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(get_metrics_reader)])
+def metrics():
+    """Expose application metrics in the Prometheus text format (metrics token or admin only)."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 # Authentication Endpoints
 @app.post("/auth/login", response_model=schemas.Token)
 def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
@@ -127,12 +170,16 @@ def create_user_by_admin(
 
 @app.get("/admin/users/", response_model=List[schemas.UserOut])
 def read_users(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0),
     db: Session = Depends(get_db),
     current_admin: models.User = Depends(get_current_admin_user)
 ):
-    return crud.get_users(db, skip=skip, limit=limit)
+    users, next_cursor = crud.get_users(db, cursor=cursor, limit=limit, skip=skip)
+    set_next_cursor(response, next_cursor)
+    return users
 
 @app.put("/admin/users/{user_id}", response_model=schemas.UserOut)
 def update_user(
@@ -177,6 +224,7 @@ def change_password(
     current_user.updated_at = datetime.now(UTC)
     db.commit()
     db.refresh(current_user)
+    principal_cache.broadcast(db, current_user.username)
     
     return current_user
 
@@ -191,12 +239,27 @@ def create_car(
 
 @app.get("/cars/", response_model=List[schemas.CarOut])
 def read_cars(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0),
+    make: Optional[str] = None,
+    model: Optional[str] = None,
+    group_name: Optional[str] = None,
+    vin: Optional[str] = None,
+    year: Optional[int] = None,
+    sort: Literal["id", "year", "make"] = "id",
+    order: Literal["asc", "desc"] = "asc",
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    return crud.get_cars(db, current_user.id, skip=skip, limit=limit)
+    """List cars, filtered by exact make, model, group, VIN or year; cursors only continue the same sort"""
+    cars, next_cursor = crud.get_cars(
+        db, current_user.id, cursor=cursor, limit=limit, make=make, model=model,
+        group_name=group_name, vin=vin, year=year, sort=sort, descending=order == "desc", skip=skip
+    )
+    set_next_cursor(response, next_cursor)
+    return cars
 
 @app.get("/cars/{car_id}", response_model=schemas.CarOut)
 def read_car(
@@ -240,18 +303,44 @@ def get_car_groups(
     """Get all unique group names for the current user's cars"""
     return crud.get_user_car_groups(db, current_user.id)
 
+# Dashboard
+@app.get("/dashboard", response_model=schemas.DashboardOut)
+def read_dashboard(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Per-car summary of open todos, next due service, last service and year-to-date spend"""
+    return get_dashboard(db, current_user.id)
+
+# Search
+@app.get("/search", response_model=List[schemas.SearchResult])
+def search_collection(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_RESULTS),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Full-text search over car notes, service history and todos, best matches first"""
+    return search(db, current_user.id, q, limit=limit)
+
 # ToDo Endpoints (Updated for multi-tenancy)
 @app.get("/cars/{car_id}/todos/", response_model=List[schemas.ToDoOut])
 def read_todos_for_car(
     car_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
+    """List a car's todos; all of them unless a limit is given"""
     # Verify the car belongs to the user
     car = crud.get_car(db, car_id, current_user.id)
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
-    return crud.get_todos_for_car(db, car_id, current_user.id)
+    todos, next_cursor = crud.get_todos_for_car(db, car_id, current_user.id, cursor=cursor, limit=limit)
+    set_next_cursor(response, next_cursor)
+    return todos
 
 @app.post("/cars/{car_id}/todos/", response_model=schemas.ToDoOut, status_code=status.HTTP_201_CREATED)
 def create_todo(
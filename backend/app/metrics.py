@@ -0,0 +1,380 @@
+"""
+In-process metrics registry.
+
+Counters, gauges and histograms are kept in memory and rendered in the
+Prometheus text exposition format by the /metrics endpoint.
+
+Under gunicorn each worker process has its own registry. With a
+multiprocess directory configured, every worker writes a JSON snapshot of
+its registry to ``metrics_<pid>_<start>.json`` there on a timer and when it
+exits, and /metrics merges all of them: counters and histograms are summed
+over every snapshot, gauges over the workers that are still alive. The
+start time in the name keeps a reused pid from overwriting an exited
+worker's totals. The directory must be emptied when the server (not a
+worker) starts.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow exports
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    escaped = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    """Base class holding the name, help text and label names of a metric"""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, LabelKey, float]]:
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        """JSON-serialisable copy of the metric's definition and values"""
+        with self._lock:
+            values = [[[list(pair) for pair in labels], value] for labels, value in self._values.items()]
+        return {"type": self.type_name, "help": self.documentation,
+                "labelnames": list(self.labelnames), "values": values}
+
+    def merge(self, values: list) -> None:
+        """Add the values of another process's snapshot to this metric"""
+        with self._lock:
+            for labels, value in values:
+                key = tuple(tuple(pair) for pair in labels)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (by convention named ``*_total``)"""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, labels, value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, labels, value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0.0
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets[:-1])
+        return data
+
+    def merge(self, values: list) -> None:
+        with self._lock:
+            for labels, state in values:
+                key = tuple(tuple(pair) for pair in labels)
+                current = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+                for index, value in enumerate(state):
+                    current[index] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        for labels, state in items:
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets, state):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", labels + (("le", _format_value(bound)),), cumulative
+            yield f"{self.name}_sum", labels, state[-2]
+            yield f"{self.name}_count", labels, state[-1]
+
+
+class MetricsRegistry:
+    """Collection of named metrics; registering the same name twice returns the original"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, metric_class):
+                    raise ValueError(f"Metric {name} is already registered as {existing.type_name}")
+                return existing
+            metric = metric_class(name, documentation, labelnames, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            metrics = list(self._metrics.items())
+        return {name: metric.snapshot() for name, metric in metrics}
+
+
+_METRIC_TYPES = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, dict]]) -> MetricsRegistry:
+    """Build a registry holding the sum of several registry snapshots"""
+    merged = MetricsRegistry()
+    for snapshot in snapshots:
+        for name, data in snapshot.items():
+            options = {"buckets": data["buckets"]} if data["type"] == "histogram" else {}
+            metric = merged._register(_METRIC_TYPES[data["type"]], name, data["help"], data["labelnames"], **options)
+            metric.merge(data["values"])
+    return merged
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MultiprocessMetrics:
+    """
+    Shares a registry with the other worker processes through snapshot files.
+
+    ``start`` runs a thread that writes this process's snapshot every
+    ``interval`` seconds, so observations reach /metrics even when the
+    worker goes idle; ``stop`` (also run at exit) writes a final one.
+    ``render`` writes this process's snapshot and returns the merged metrics
+    of every process. A snapshot that hasn't been rewritten for a few
+    intervals belongs to a worker that is gone.
+    """
+
+    # Snapshots older than this many intervals count as exited workers
+    STALE_INTERVALS = 3
+
+    def __init__(self, registry: MetricsRegistry, directory: str, interval: float = 5.0):
+        self.registry = registry
+        self.directory = Path(directory)
+        self.interval = interval
+        self._write_lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._started = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> Path:
+        # Evaluated on each write: gunicorn forks workers after import
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._started = time.time_ns() // 1_000_000
+        return self.directory / f"metrics_{self._pid}_{self._started}.json"
+
+    def write(self) -> None:
+        with self._write_lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.path
+            temporary = path.with_suffix(".tmp")
+            temporary.write_text(json.dumps(self.registry.snapshot()))
+            # Readers only ever see complete snapshots
+            os.replace(temporary, path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass  # try again on the next tick
+
+    def start(self) -> None:
+        """Start writing snapshots in the background; call in each worker after the fork."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Stop the background writer and write a final snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.write()
+        except OSError:
+            pass
+
+    def read_snapshots(self) -> List[Dict[str, dict]]:
+        snapshots = []
+        stale_before = time.time() - self.STALE_INTERVALS * self.interval
+        for path in sorted(self.directory.glob("metrics_*.json")):
+            try:
+                snapshot = json.loads(path.read_text())
+                pid = int(path.stem.split("_")[1])
+                written = path.stat().st_mtime
+            except (OSError, ValueError, IndexError):
+                continue  # removed or replaced while listing
+            if written < stale_before or not _pid_alive(pid):
+                # An exited worker's counts still happened; its gauges no longer hold
+                snapshot = {name: data for name, data in snapshot.items() if data["type"] != "gauge"}
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        self.write()
+        return merge_snapshots(self.read_snapshots()).render()
+
+
+# Global registry used by the application
+REGISTRY = MetricsRegistry()
+
+# Set up by the application when a multiprocess directory is configured
+multiprocess: Optional[MultiprocessMetrics] = None
+
+
+def configure_multiprocess(directory: str, interval: float = 5.0) -> Optional[MultiprocessMetrics]:
+    """Share REGISTRY through ``directory``; an empty directory keeps metrics per process."""
+    global multiprocess
+    multiprocess = MultiprocessMetrics(REGISTRY, directory, interval) if directory else None
+    return multiprocess
+
+
+def render_metrics() -> str:
+    """Metrics for /metrics: merged across workers when multiprocess mode is on"""
+    if multiprocess is not None:
+        return multiprocess.render()
+    return REGISTRY.render()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Numeric, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, UTC
 from .database import Base
@@ -21,6 +21,7 @@ class User(Base):
     todos = relationship("ToDo", back_populates="user", cascade="all, delete-orphan")
     service_intervals = relationship("ServiceInterval", cascade="all, delete-orphan")
     service_history = relationship("ServiceHistory", cascade="all, delete-orphan")
+    deletion_log = relationship("DeletionLog", cascade="all, delete-orphan")
 
 class Car(Base):
     __tablename__ = "cars"
@@ -38,6 +39,13 @@ class Car(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
+    __table_args__ = (
+        Index("ix_cars_user_group", "user_id", "group_name"),
+        Index("ix_cars_user_updated", "user_id", "updated_at"),
+        Index("ix_cars_user_make", "user_id", "make", "id"),
+        Index("ix_cars_user_year", "user_id", "year", "id"),
+    )
+
     # Relationships
     user = relationship("User", back_populates="cars")
     todos = relationship("ToDo", back_populates="car", cascade="all, delete-orphan")
@@ -55,8 +63,14 @@ class ToDo(Base):
     priority = Column(String, default="medium")  # low, medium, high
     due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
     resolved_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        Index("ix_todos_user_car", "user_id", "car_id"),
+        Index("ix_todos_user_updated", "user_id", "updated_at"),
+    )
+
     # Relationships
     user = relationship("User", back_populates="todos")
     car = relationship("Car", back_populates="todos")
@@ -78,6 +92,11 @@ class ServiceInterval(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
+    __table_args__ = (
+        Index("ix_service_intervals_user_car_active", "user_id", "car_id", "is_active"),
+        Index("ix_service_intervals_user_updated", "user_id", "updated_at"),
+    )
+
     # Relationships
     user = relationship("User", overlaps="service_intervals")
     car = relationship("Car", overlaps="service_intervals")
@@ -100,6 +119,13 @@ class ServiceHistory(Base):
     next_due_date = Column(DateTime, nullable=True)
     next_due_mileage = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        Index("ix_service_history_car_user_date", "car_id", "user_id", performed_date.desc()),
+        Index("ix_service_history_user_id", "user_id"),
+        Index("ix_service_history_user_updated", "user_id", "updated_at"),
+    )
 
     # Relationships
     user = relationship("User", overlaps="service_history")
@@ -108,7 +134,7 @@ class ServiceHistory(Base):
 class ServiceIntervalTemplate(Base):
     __tablename__ = "service_interval_templates"
     id = Column(Integer, primary_key=True, index=True)
-    make = Column(String, nullable=False)
+    make = Column(String, nullable=False)  # make, model and engine_type are stored lowercase
     model = Column(String, nullable=False)
     year_start = Column(Integer, nullable=True)
     year_end = Column(Integer, nullable=True)
@@ -125,6 +151,10 @@ class ServiceIntervalTemplate(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
+    __table_args__ = (
+        Index("ix_service_interval_templates_lookup", "make", "model", "engine_type", "year_start", "year_end"),
+    )
+
 class ServiceResearchLog(Base):
     __tablename__ = "service_research_log"
     id = Column(Integer, primary_key=True, index=True)
@@ -139,6 +169,28 @@ class ServiceResearchLog(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
 
 
+class DeletionLog(Base):
+    """Tombstones for deleted records, read by the delta export"""
+    __tablename__ = "deletion_log"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    table_name = Column(String, nullable=False)  # cars, todos, service_intervals, service_history
+    record_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        Index("ix_deletion_log_user_deleted", "user_id", "deleted_at"),
+    )
+
+
+class PrincipalInvalidation(Base):
+    """Usernames whose cached principals other workers must drop, read by PrincipalCache.sync"""
+    __tablename__ = "principal_invalidations"
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String, nullable=False)  # no foreign key: deleted users are logged too
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC), index=True)
+
+
 class UserInvitation(Base):
     __tablename__ = "user_invitations"
     id = Column(Integer, primary_key=True, index=True)
@@ -0,0 +1,110 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered by ``(sort_key, id)`` and each page starts strictly after
+the last row of the previous one, so fetching page 500 costs the same index
+seek as page 1 and rows inserted meanwhile never shift or repeat a page.
+Cursors are opaque URL-safe base64 strings that also record the ordering
+they were made for, so one can't be replayed against another sort; the
+next one is returned in the ``X-Next-Cursor`` response header and is absent
+on the last page.
+
+Pagination is opt-in where a list used to be unbounded: without a ``limit``
+those endpoints still return every row. Endpoints that took ``skip`` keep
+accepting it as an offset for older clients.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import Query
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def ordering(id_column, sort_column=None, descending: bool = False) -> str:
+    """
+    Name a page ordering, e.g. ``Car.year desc``; cursors only continue
+    the ordering they name.
+    """
+    column = id_column if sort_column is None else sort_column
+    return f"{column} {'desc' if descending else 'asc'}"
+
+
+def encode_cursor(order: str, sort_value: Any, row_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        key = {"dt": sort_value.isoformat()}
+    else:
+        key = {"v": sort_value}
+    payload = json.dumps([order, key, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, order: str) -> Tuple[Any, int]:
+    """
+    Return the ``(sort_value, id)`` a cursor points after. Cursors that are
+    malformed or were made for a different ordering are a 400.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order, key, row_id = json.loads(payload)
+        if cursor_order != order:
+            raise ValueError(cursor_order)
+        sort_value = datetime.fromisoformat(key["dt"]) if "dt" in key else key["v"]
+        if not isinstance(row_id, int):
+            raise ValueError(row_id)
+        return sort_value, row_id
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query: Query, id_column, cursor: Optional[str] = None, limit: Optional[int] = DEFAULT_PAGE_SIZE,
+             sort_column=None, descending: bool = False, skip: int = 0) -> Tuple[List, Optional[str]]:
+    """
+    Return one page of ``query`` and the cursor for the next page, or None on the last page.
+
+    Rows are ordered by ``(sort_column, id_column)`` - or just ``id_column``
+    when there is no sort column - ascending or descending. The sort column
+    must not be nullable. A ``limit`` of None returns every remaining row;
+    ``skip`` offsets the page for clients that predate cursors.
+    """
+    keys = [id_column] if sort_column is None else [sort_column, id_column]
+    order = ordering(id_column, sort_column, descending)
+
+    if cursor is not None:
+        sort_value, row_id = decode_cursor(cursor, order)
+        if sort_column is None:
+            position, after = id_column, literal(row_id, id_column.type)
+        else:
+            # Row-value comparison, which both SQLite and PostgreSQL serve from a (sort_key, id) index
+            position = tuple_(sort_column, id_column)
+            after = tuple_(literal(sort_value, sort_column.type), literal(row_id, id_column.type))
+        query = query.filter(position < after if descending else position > after)
+
+    query = query.order_by(*(key.desc() if descending else key.asc() for key in keys))
+    if skip:
+        query = query.offset(skip)
+    if limit is None:
+        return query.all(), None
+    # One extra row tells whether there is a next page
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    row_id = getattr(last, id_column.key)
+    sort_value = row_id if sort_column is None else getattr(last, sort_column.key)
+    return rows, encode_cursor(order, sort_value, row_id)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,218 @@
+"""
+Service Research Cache
+
+Research results are stored as ServiceIntervalTemplate rows keyed by make,
+model, model year range and engine type. A fresh template answers a research
+request with a single indexed read; a stale one is still served while a
+background task re-runs the research and replaces it.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+from typing import Callable, List, Optional, Set, Tuple
+
+from fastapi import BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .service_research import ServiceInterval, research_service_intervals
+
+logger = logging.getLogger(__name__)
+
+TemplateKey = Tuple[str, str, int, Optional[str]]
+
+# Lookups compare the key columns as stored, so rows written before keys
+# were normalized (or entered by hand) must be brought to template_key form
+NORMALIZE_TEMPLATE_KEYS_SQL = (
+    "UPDATE service_interval_templates SET make = lower(trim(make)), model = lower(trim(model)), "
+    "engine_type = nullif(lower(trim(engine_type)), '')"
+)
+
+# Keys with a background refresh in flight, so a burst of stale hits refreshes once
+_refreshing: Set[TemplateKey] = set()
+
+
+@dataclass
+class CachedResearch:
+    """Research result read back from the template table"""
+    intervals: List[ServiceInterval]
+    sources_used: List[str]
+    confidence_score: int
+    researched_at: datetime
+    is_stale: bool
+
+
+def template_key(make: str, model: str, year: int, engine_type: Optional[str] = None) -> TemplateKey:
+    """Normalize a vehicle description; templates are stored with lowercase make/model/engine"""
+    engine = engine_type.strip().lower() if engine_type and engine_type.strip() else None
+    return (make.strip().lower(), model.strip().lower(), year, engine)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they were written as UTC
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+def _year_span(year_range: Tuple[Optional[int], Optional[int]]) -> float:
+    year_start, year_end = year_range
+    if year_start is None or year_end is None:
+        return float("inf")
+    return year_end - year_start
+
+
+def _pick_template_set(templates: List[models.ServiceIntervalTemplate]) -> List[models.ServiceIntervalTemplate]:
+    """
+    Keep the templates of a single year range: the narrowest that matched.
+
+    An exact-year set written by store_research (span 0) wins over
+    hand-entered ranges, and open-ended ranges come last. Ties go to the
+    range entered first. Sets are never merged, so a stale range can't
+    duplicate intervals or hold back the freshness of a newer result.
+    """
+    sets = {}
+    for template in templates:
+        sets.setdefault((template.year_start, template.year_end), []).append(template)
+    return min(sets.values(), key=lambda rows: (_year_span((rows[0].year_start, rows[0].year_end)), rows[0].id))
+
+
+def get_cached_research(
+    db: Session,
+    make: str,
+    model: str,
+    year: int,
+    engine_type: Optional[str] = None,
+    now: Optional[datetime] = None
+) -> Optional[CachedResearch]:
+    """Return the stored research for a vehicle, or None if it has never been researched"""
+    make_key, model_key, year, engine_key = template_key(make, model, year, engine_type)
+    templates = db.query(models.ServiceIntervalTemplate).filter(
+        models.ServiceIntervalTemplate.make == make_key,
+        models.ServiceIntervalTemplate.model == model_key,
+        models.ServiceIntervalTemplate.engine_type.is_(engine_key) if engine_key is None
+        else models.ServiceIntervalTemplate.engine_type == engine_key,
+        or_(models.ServiceIntervalTemplate.year_start.is_(None),
+            models.ServiceIntervalTemplate.year_start <= year),
+        or_(models.ServiceIntervalTemplate.year_end.is_(None),
+            models.ServiceIntervalTemplate.year_end >= year)
+    ).order_by(models.ServiceIntervalTemplate.id).all()
+
+    if not templates:
+        return None
+    templates = _pick_template_set(templates)
+
+    intervals = [
+        ServiceInterval(
+            service_item=template.service_item,
+            interval_miles=template.interval_miles,
+            interval_months=template.interval_months,
+            priority=template.priority,
+            cost_estimate_low=float(template.cost_estimate_low) if template.cost_estimate_low is not None else None,
+            cost_estimate_high=float(template.cost_estimate_high) if template.cost_estimate_high is not None else None,
+            source=template.source or "unknown",
+            confidence_score=template.confidence_score,
+            notes=template.notes
+        )
+        for template in templates
+    ]
+    researched_at = min(_as_utc(template.updated_at) for template in templates)
+    now = now or datetime.now(UTC)
+    ttl = timedelta(hours=settings.research_cache_ttl_hours)
+
+    return CachedResearch(
+        intervals=intervals,
+        sources_used=sorted({interval.source for interval in intervals}),
+        confidence_score=int(sum(interval.confidence_score for interval in intervals) / len(intervals)),
+        researched_at=researched_at,
+        is_stale=now - researched_at > ttl
+    )
+
+
+def store_research(
+    db: Session,
+    make: str,
+    model: str,
+    year: int,
+    engine_type: Optional[str],
+    intervals: List[ServiceInterval],
+    commit: bool = True
+) -> None:
+    """Replace the template for this exact vehicle with a fresh research result"""
+    make_key, model_key, year, engine_key = template_key(make, model, year, engine_type)
+    db.query(models.ServiceIntervalTemplate).filter(
+        models.ServiceIntervalTemplate.make == make_key,
+        models.ServiceIntervalTemplate.model == model_key,
+        models.ServiceIntervalTemplate.year_start == year,
+        models.ServiceIntervalTemplate.year_end == year,
+        models.ServiceIntervalTemplate.engine_type.is_(engine_key) if engine_key is None
+        else models.ServiceIntervalTemplate.engine_type == engine_key
+    ).delete(synchronize_session=False)
+
+    researched_at = datetime.now(UTC)
+    db.add_all([
+        models.ServiceIntervalTemplate(
+            make=make_key,
+            model=model_key,
+            year_start=year,
+            year_end=year,
+            engine_type=engine_key,
+            service_item=interval.service_item,
+            interval_miles=interval.interval_miles,
+            interval_months=interval.interval_months,
+            priority=interval.priority,
+            cost_estimate_low=interval.cost_estimate_low,
+            cost_estimate_high=interval.cost_estimate_high,
+            source=interval.source,
+            confidence_score=interval.confidence_score,
+            notes=interval.notes,
+            created_at=researched_at,
+            updated_at=researched_at
+        )
+        for interval in intervals
+    ])
+    if commit:
+        db.commit()
+
+
+async def refresh_research(
+    session_factory: Callable[[], Session],
+    make: str,
+    model: str,
+    year: int,
+    engine_type: Optional[str] = None
+) -> None:
+    """Re-run research for a stale template and store the result"""
+    key = template_key(make, model, year, engine_type)
+    try:
+        intervals, _, _, _ = await research_service_intervals(make, model, year, engine_type)
+        if not intervals:
+            return
+        db = session_factory()
+        try:
+            await run_in_threadpool(store_research, db, make, model, year, engine_type, intervals)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"Background research refresh failed for {year} {make} {model}: {e}")
+    finally:
+        _refreshing.discard(key)
+
+
+def schedule_refresh(
+    background_tasks: BackgroundTasks,
+    session_factory: Callable[[], Session],
+    make: str,
+    model: str,
+    year: int,
+    engine_type: Optional[str] = None
+) -> bool:
+    """Queue a refresh after the response is sent, unless one is already running"""
+    key = template_key(make, model, year, engine_type)
+    if key in _refreshing:
+        return False
+    _refreshing.add(key)
+    background_tasks.add_task(refresh_research, session_factory, make, model, year, engine_type)
+    return True
@@ -0,0 +1,146 @@
+"""
+Research Source Fan-out
+
+Queries every research source concurrently, each under its own timeout and
+circuit breaker, so one slow or failing source costs at most its own budget
+and never hides the results of the others.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from .config import settings
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RESEARCH_SOURCE_REQUESTS = REGISTRY.counter(
+    "research_source_requests_total",
+    "Research source queries by source and outcome (ok, empty, timeout, error or skipped)",
+    ["source", "status"]
+)
+RESEARCH_SOURCE_LATENCY = REGISTRY.histogram(
+    "research_source_duration_seconds",
+    "Time spent querying a research source, including failures",
+    ["source"]
+)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a source after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls are skipped for ``reset_timeout`` seconds. The next call is a
+    trial: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        if self.opened_at is None:
+            return False
+        return time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        return not self.is_open
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+# One breaker per source name, shared by every request in this process
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(source_name: str) -> CircuitBreaker:
+    breaker = _breakers.get(source_name)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            settings.research_breaker_failure_threshold,
+            settings.research_breaker_reset_seconds
+        )
+        _breakers[source_name] = breaker
+    return breaker
+
+
+def reset_breakers() -> None:
+    _breakers.clear()
+
+
+@dataclass
+class SourceResult:
+    """Outcome of querying one source"""
+    name: str
+    status: str  # "ok", "empty", "timeout", "error" or "skipped"
+    intervals: List[Any] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+async def _query_source(source, call: Callable[[Any], Awaitable[List[Any]]]) -> SourceResult:
+    breaker = get_breaker(source.name)
+    if not breaker.allow():
+        logger.warning(f"Skipping {source.name}: circuit open after repeated failures")
+        return SourceResult(source.name, "skipped", error="circuit open after repeated failures")
+
+    timeout = getattr(source, "timeout", None) or settings.research_source_timeout_seconds
+    started = time.perf_counter()
+    try:
+        logger.info(f"Researching from {source.name}")
+        intervals = await asyncio.wait_for(call(source), timeout)
+    except asyncio.TimeoutError:
+        breaker.record_failure()
+        logger.error(f"Source {source.name} timed out after {timeout}s")
+        return SourceResult(source.name, "timeout", error=f"timed out after {timeout}s",
+                            elapsed=time.perf_counter() - started)
+    except Exception as e:
+        breaker.record_failure()
+        logger.error(f"Error with source {source.name}: {e}")
+        return SourceResult(source.name, "error", error=str(e), elapsed=time.perf_counter() - started)
+
+    breaker.record_success()
+    elapsed = time.perf_counter() - started
+    if intervals:
+        logger.info(f"Found {len(intervals)} intervals from {source.name}")
+        return SourceResult(source.name, "ok", list(intervals), elapsed=elapsed)
+    logger.info(f"No intervals found from {source.name}")
+    return SourceResult(source.name, "empty", elapsed=elapsed)
+
+
+async def query_sources(sources: Sequence[Any], call: Callable[[Any], Awaitable[List[Any]]]) -> List[SourceResult]:
+    """
+    Run ``call(source)`` for every source concurrently.
+
+    Results come back in source order; failures are reported in the result
+    instead of raised, so callers always get the partial results.
+    """
+    results = list(await asyncio.gather(*(_query_source(source, call) for source in sources)))
+    for result in results:
+        RESEARCH_SOURCE_REQUESTS.inc(source=result.name, status=result.status)
+        if result.status != "skipped":
+            RESEARCH_SOURCE_LATENCY.observe(result.elapsed, source=result.name)
+    return results
+
+
+def source_errors(results: Sequence[SourceResult]) -> Dict[str, str]:
+    """Map each source that failed, timed out or was skipped to the reason"""
+    return {
+        result.name: f"{result.status}: {result.error}"
+        for result in results
+        if result.status in ("timeout", "error", "skipped")
+    }
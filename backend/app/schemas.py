@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from decimal import Decimal
 
@@ -121,6 +121,14 @@ class CarOut(CarBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class SearchResult(BaseModel):
+    type: str  # car, service_history or todo
+    id: int
+    car_id: int
+    title: str
+    snippet: Optional[str] = None  # matched text with the terms in [brackets]
+    date: Optional[datetime] = None  # performed date of service history entries
+
 # Service Interval Schemas
 class ServiceIntervalBase(BaseModel):
     service_item: str
@@ -155,6 +163,48 @@ class ServiceIntervalOut(ServiceIntervalBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ServiceIntervalDue(ServiceIntervalOut):
+    status: str  # due_soon or overdue
+    progress_percent: int
+    last_performed_date: Optional[datetime] = None
+    last_performed_mileage: Optional[int] = None
+    next_due_date: Optional[datetime] = None
+    next_due_mileage: Optional[int] = None
+    miles_remaining: Optional[int] = None
+    days_remaining: Optional[int] = None
+
+# Dashboard Schemas
+class DashboardNextService(BaseModel):
+    interval_id: int
+    service_item: str
+    priority: Optional[str] = None
+    status: str  # ok, due_soon or overdue
+    progress_percent: int
+    next_due_date: Optional[datetime] = None
+    next_due_mileage: Optional[int] = None
+    miles_remaining: Optional[int] = None
+    days_remaining: Optional[int] = None
+
+class DashboardCar(BaseModel):
+    id: int
+    year: int
+    make: str
+    model: str
+    mileage: Optional[int] = None
+    group_name: Optional[str] = None
+    open_todos: int = 0
+    last_service_date: Optional[datetime] = None
+    ytd_spend: Decimal = Decimal("0")
+    overdue_services: int = 0
+    due_soon_services: int = 0
+    next_service: Optional[DashboardNextService] = None  # most urgent active interval
+
+class DashboardOut(BaseModel):
+    cars: List[DashboardCar]
+    open_todos: int
+    overdue_services: int
+    ytd_spend: Decimal
+
 # Service History Schemas
 class ServiceHistoryBase(BaseModel):
     service_item: str
@@ -220,6 +270,17 @@ class ServiceResearchResponse(BaseModel):
     total_intervals_found: int
     research_date: datetime
 
+class ServiceResearchBatchRequest(BaseModel):
+    car_ids: Optional[List[int]] = Field(None, min_length=1, max_length=500)
+    group_name: Optional[str] = None
+    engine_type: Optional[str] = None
+
+class ServiceResearchBatchResponse(BaseModel):
+    results: List[ServiceResearchResponse]
+    failed: Dict[int, str] = {}  # car_id -> error
+    unique_vehicles: int
+    researched: int  # unique vehicles researched now; the rest came from the template cache
+
 class ServiceIntervalBulkCreate(BaseModel):
     car_id: int
     intervals: List[ServiceIntervalCreate] 
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""
+Full-text search over a user's cars, service history and todos.
+
+SQLite keeps one FTS5 table, ``search_index``, with a row per searchable
+record. Triggers on the source tables keep it current whichever code path
+writes them (the API, bulk imports, deletes), and each record's FTS rowid
+encodes its table and id so updates and deletes are rowid lookups.
+PostgreSQL needs no extra table: each source table gets a GIN index on the
+same ``to_tsvector`` expression the search query uses.
+
+Every search term is matched as a prefix and all terms must appear. SQLite
+builds without FTS5 fall back to a LIKE scan.
+"""
+
+import logging
+import re
+from functools import reduce
+from typing import Dict, List
+
+import sqlalchemy.dialects.postgresql  # noqa: F401 - registers the full-text function types
+from sqlalchemy import Index, event, func, literal, literal_column, or_, select, text, union_all
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "search_index"
+
+MAX_SEARCH_RESULTS = 200
+
+# (result type, model, code in the FTS rowid, searchable columns)
+SEARCH_SOURCES = (
+    ("car", models.Car, 1, ("make", "model", "notes")),
+    ("service_history", models.ServiceHistory, 2, ("service_item", "shop", "invoice_number", "notes")),
+    ("todo", models.ToDo, 3, ("title", "description")),
+)
+# FTS rowid = record id * ROWID_STRIDE + source code
+ROWID_STRIDE = 4
+
+_TERM = re.compile(r"\w+")
+
+
+def search_terms(query: str) -> List[str]:
+    """Split a user query into words, dropping FTS operators and punctuation"""
+    return _TERM.findall(query.lower())
+
+
+# SQLite: FTS5 table and the triggers that maintain it
+
+def _sqlite_body(row: str, columns) -> str:
+    return " || ' ' || ".join(f"coalesce({row}.{column}, '')" for column in columns)
+
+
+def _sqlite_trigger_ddl() -> List[str]:
+    statements = []
+    for _, model, code, columns in SEARCH_SOURCES:
+        table = model.__tablename__
+        car_id = "id" if model is models.Car else "car_id"
+
+        def insert_row(row):
+            return (f"INSERT INTO {SEARCH_TABLE} (rowid, body, user_id, car_id) VALUES "
+                    f"({row}.id * {ROWID_STRIDE} + {code}, {_sqlite_body(row, columns)}, {row}.user_id, {row}.{car_id});")
+
+        delete_row = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * {ROWID_STRIDE} + {code};"
+        watched = ", ".join(dict.fromkeys(("user_id", car_id, *columns)))
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} "
+            f"BEGIN {insert_row('new')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {watched} ON {table} "
+            f"BEGIN {delete_row} {insert_row('new')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} "
+            f"BEGIN {delete_row} END",
+        ]
+    return statements
+
+
+SQLITE_SEARCH_TABLE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "body, user_id UNINDEXED, car_id UNINDEXED, tokenize = 'porter unicode61')"
+)
+SQLITE_SEARCH_TRIGGER_DDL = _sqlite_trigger_ddl()
+# Index the rows that existed before the search table did
+SQLITE_SEARCH_BACKFILL = [
+    f"INSERT INTO {SEARCH_TABLE} (rowid, body, user_id, car_id) "
+    f"SELECT id * {ROWID_STRIDE} + {code}, {_sqlite_body(model.__tablename__, columns)}, user_id, "
+    f"{'id' if model is models.Car else 'car_id'} FROM {model.__tablename__}"
+    for _, model, code, columns in SEARCH_SOURCES
+]
+
+
+def _sqlite_search_table_exists(connection) -> bool:
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+    ).first() is not None
+
+
+def create_sqlite_search_index(connection) -> bool:
+    """Create the FTS5 table and triggers, indexing existing rows; False if FTS5 is unavailable."""
+    if _sqlite_search_table_exists(connection):
+        for statement in SQLITE_SEARCH_TRIGGER_DDL:
+            connection.exec_driver_sql(statement)
+        return True
+    try:
+        connection.exec_driver_sql(SQLITE_SEARCH_TABLE_DDL)
+    except OperationalError as e:
+        logger.warning(f"Full-text search index not created, searches will scan: {e}")
+        return False
+    for statement in SQLITE_SEARCH_TRIGGER_DDL + SQLITE_SEARCH_BACKFILL:
+        connection.exec_driver_sql(statement)
+    return True
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_sqlite_search_index(connection)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _before_drop(target, connection, **kw):
+    # The triggers go with their tables; the FTS table isn't part of the metadata
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+# PostgreSQL: GIN indexes on the tsvector expression
+
+_SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+
+def _pg_text(model, columns):
+    # Literals rather than bind parameters, so the query's expression is
+    # identical to the indexed one and the planner can use the index
+    parts = [func.coalesce(getattr(model, column), literal_column("''")) for column in columns]
+    return reduce(lambda left, right: left.op("||")(literal_column("' '")).op("||")(right), parts)
+
+
+def _pg_document(model, columns):
+    return func.to_tsvector(_SEARCH_CONFIG, _pg_text(model, columns))
+
+
+for _, _model, _, _columns in SEARCH_SOURCES:
+    _model.__table__.append_constraint(Index(
+        f"ix_{_model.__tablename__}_search", _pg_document(_model, _columns), postgresql_using="gin"
+    ).ddl_if(dialect="postgresql"))
+
+
+# Queries
+
+def _sqlite_matches(db: Session, user_id: int, terms: List[str], limit: int) -> List[Dict]:
+    match = " ".join(f'"{term}"*' for term in terms)
+    rows = db.execute(text(
+        f"SELECT rowid, snippet({SEARCH_TABLE}, 0, '[', ']', '...', 12) AS snippet FROM {SEARCH_TABLE} "
+        f"WHERE {SEARCH_TABLE} MATCH :match AND user_id = :user_id ORDER BY rank LIMIT :limit"
+    ), {"match": match, "user_id": user_id, "limit": limit}).all()
+    kinds = {code: kind for kind, _, code, _ in SEARCH_SOURCES}
+    return [
+        {"type": kinds[row.rowid % ROWID_STRIDE], "id": row.rowid // ROWID_STRIDE, "snippet": row.snippet}
+        for row in rows
+    ]
+
+
+def _pg_matches(db: Session, user_id: int, terms: List[str], limit: int) -> List[Dict]:
+    query = func.to_tsquery(_SEARCH_CONFIG, literal(" & ".join(f"{term}:*" for term in terms)))
+    selects = []
+    for kind, model, _, columns in SEARCH_SOURCES:
+        document = _pg_document(model, columns)
+        selects.append(select(
+            literal(kind).label("type"),
+            model.id.label("id"),
+            func.ts_rank(document, query).label("rank"),
+            func.ts_headline(
+                _SEARCH_CONFIG, _pg_text(model, columns), query, "StartSel=[, StopSel=], MaxWords=12, MinWords=4"
+            ).label("snippet"),
+        ).where(model.user_id == user_id, document.op("@@")(query)))
+    matches = union_all(*selects).subquery()
+    rows = db.execute(select(matches).order_by(matches.c.rank.desc()).limit(limit)).all()
+    return [{"type": row.type, "id": row.id, "snippet": row.snippet} for row in rows]
+
+
+def _like_matches(db: Session, user_id: int, terms: List[str], limit: int) -> List[Dict]:
+    matches = []
+    for kind, model, _, columns in SEARCH_SOURCES:
+        conditions = [
+            or_(*(getattr(model, column).ilike(f"%{term}%") for column in columns)) for term in terms
+        ]
+        for (record_id,) in db.query(model.id).filter(model.user_id == user_id, *conditions) \
+                .order_by(model.id.desc()).limit(limit - len(matches)):
+            matches.append({"type": kind, "id": record_id, "snippet": None})
+        if len(matches) >= limit:
+            break
+    return matches
+
+
+def _title(kind: str, record) -> str:
+    if kind == "car":
+        return f"{record.year} {record.make} {record.model}"
+    if kind == "service_history":
+        return record.service_item
+    return record.title
+
+
+def search(db: Session, user_id: int, query: str, limit: int = 50) -> List[Dict]:
+    """Return the user's records matching every word of ``query``, best matches first."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        matches = _pg_matches(db, user_id, terms, limit)
+    elif dialect == "sqlite" and _sqlite_search_table_exists(db.connection()):
+        matches = _sqlite_matches(db, user_id, terms, limit)
+    else:
+        matches = _like_matches(db, user_id, terms, limit)
+
+    # One query per result type for the fields shown alongside each match
+    records = {}
+    for kind, model, _, _ in SEARCH_SOURCES:
+        ids = [match["id"] for match in matches if match["type"] == kind]
+        if ids:
+            for record in db.query(model).filter(model.user_id == user_id, model.id.in_(ids)):
+                records[kind, record.id] = record
+
+    results = []
+    for match in matches:
+        record = records.get((match["type"], match["id"]))
+        if record is None:
+            continue
+        results.append({
+            **match,
+            "car_id": record.id if match["type"] == "car" else record.car_id,
+            "title": _title(match["type"], record),
+            "date": getattr(record, "performed_date", None),
+        })
+    return results
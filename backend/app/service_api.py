@@ -5,34 +5,82 @@ This module provides API endpoints for managing service intervals and
 performing service research.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy import func
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, UTC
+import asyncio
 import json
 
-from . import models, schemas, crud
+from . import models, schemas, crud, research_cache
+from .config import settings
 from .database import get_db
 from .auth import get_current_active_user
+from .pagination import MAX_PAGE_SIZE, paginate, set_next_cursor
 from .service_research import research_service_intervals
+from .service_schedule import DUE_SOON_PERCENT, get_due_intervals
 
 router = APIRouter()
 
+# Handlers that don't await anything are plain ``def`` so FastAPI runs them in
+# its threadpool; async handlers must push their database work there too.
+
+def _save_research_log(db: Session, research_log: models.ServiceResearchLog) -> None:
+    db.add(research_log)
+    db.commit()
+
+def _research_log(make: str, model: str, year: int, sources_used: List[str], intervals_found: int,
+                  confidence_score: int, errors: Optional[Dict[str, str]]) -> models.ServiceResearchLog:
+    return models.ServiceResearchLog(
+        make=make,
+        model=model,
+        year=year,
+        sources_checked=json.dumps(sources_used),
+        intervals_found=intervals_found,
+        success_rate=confidence_score * 10.0,  # Convert to percentage
+        errors=json.dumps(errors) if errors else None  # Sources that failed, timed out or were skipped
+    )
+
+def _research_response(car_id: int, make: str, model: str, year: int, intervals, sources_used: List[str],
+                       research_date: datetime) -> schemas.ServiceResearchResponse:
+    return schemas.ServiceResearchResponse(
+        car_id=car_id,
+        make=make,
+        model=model,
+        year=year,
+        suggested_intervals=[
+            schemas.ServiceResearchResult(
+                service_item=interval.service_item,
+                interval_miles=interval.interval_miles,
+                interval_months=interval.interval_months,
+                priority=interval.priority,
+                cost_estimate_low=interval.cost_estimate_low,
+                cost_estimate_high=interval.cost_estimate_high,
+                source=interval.source,
+                confidence_score=interval.confidence_score,
+                notes=interval.notes
+            )
+            for interval in intervals
+        ],
+        sources_checked=sources_used,
+        total_intervals_found=len(intervals),
+        research_date=research_date
+    )
+
 @router.post("/cars/{car_id}/research-intervals", response_model=schemas.ServiceResearchResponse)
 async def research_car_intervals(
     car_id: int,
+    background_tasks: BackgroundTasks,
     engine_type: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Research service intervals for a specific car"""
+    """Research service intervals for a specific car, answering from the template cache when possible"""
     
-    # Get the car and verify ownership
-    car = db.query(models.Car).filter(
-        models.Car.id == car_id,
-        models.Car.user_id == current_user.id
-    ).first()
+    # Database work runs in the threadpool so it never blocks the event loop
+    car = await run_in_threadpool(crud.get_car, db, car_id, current_user.id)
     
     if not car:
         raise HTTPException(
@@ -40,73 +88,182 @@ async def research_car_intervals(
             detail="Car not found"
         )
     
+    # Copy the fields we need; the commit below expires the ORM instance
+    make, model, year = car.make, car.model, car.year
+    
     try:
-        # Perform research
-        intervals, sources_used, confidence_score = await research_service_intervals(
-            car.make, car.model, car.year, engine_type
+        cached = await run_in_threadpool(
+            research_cache.get_cached_research, db, make, model, year, engine_type
         )
         
-        # Convert to response format
-        suggested_intervals = [
-            schemas.ServiceResearchResult(
-                service_item=interval.service_item,
-                interval_miles=interval.interval_miles,
-                interval_months=interval.interval_months,
-                priority=interval.priority,
-                cost_estimate_low=interval.cost_estimate_low,
-                cost_estimate_high=interval.cost_estimate_high,
-                source=interval.source,
-                confidence_score=interval.confidence_score,
-                notes=interval.notes
+        if cached:
+            intervals, sources_used = cached.intervals, cached.sources_used
+            research_date = cached.researched_at
+            if cached.is_stale:
+                # Serve the stale result now; the refresh uses its own session after the response
+                research_cache.schedule_refresh(
+                    background_tasks, sessionmaker(bind=db.get_bind()), make, model, year, engine_type
+                )
+        else:
+            # Perform research
+            intervals, sources_used, confidence_score, errors = await research_service_intervals(
+                make, model, year, engine_type
             )
-            for interval in intervals
-        ]
+            research_date = datetime.now()
+            if intervals:
+                await run_in_threadpool(
+                    research_cache.store_research, db, make, model, year, engine_type, intervals
+                )
         
-        # Log the research attempt
-        research_log = models.ServiceResearchLog(
-            make=car.make,
-            model=car.model,
-            year=car.year,
-            sources_checked=json.dumps(sources_used),
-            intervals_found=len(intervals),
-            success_rate=confidence_score * 10.0,  # Convert to percentage
-            errors=None
-        )
-        db.add(research_log)
-        db.commit()
+        # Log the research attempt (cache hits didn't research anything)
+        if not cached:
+            research_log = _research_log(
+                make, model, year, sources_used, len(intervals), confidence_score, errors
+            )
+            await run_in_threadpool(_save_research_log, db, research_log)
         
-        return schemas.ServiceResearchResponse(
-            car_id=car_id,
-            make=car.make,
-            model=car.model,
-            year=car.year,
-            suggested_intervals=suggested_intervals,
-            sources_checked=sources_used,
-            total_intervals_found=len(intervals),
-            research_date=datetime.now()
-        )
+        # Convert to response format
+        return _research_response(car_id, make, model, year, intervals, sources_used, research_date)
         
     except Exception as e:
         # Log error
         research_log = models.ServiceResearchLog(
-            make=car.make,
-            model=car.model,
-            year=car.year,
+            make=make,
+            model=model,
+            year=year,
             sources_checked=json.dumps(["error"]),
             intervals_found=0,
             success_rate=0.0,
             errors=json.dumps({"error": str(e)})
         )
-        db.add(research_log)
-        db.commit()
+        await run_in_threadpool(_save_research_log, db, research_log)
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Research failed: {str(e)}"
         )
 
+def _load_research_cars(db: Session, user_id: int, car_ids: Optional[List[int]],
+                        group_name: Optional[str]) -> List[Tuple[int, str, str, int]]:
+    query = db.query(models.Car.id, models.Car.make, models.Car.model, models.Car.year).filter(
+        models.Car.user_id == user_id
+    )
+    if car_ids is not None:
+        query = query.filter(models.Car.id.in_(car_ids))
+    else:
+        query = query.filter(models.Car.group_name == group_name)
+    return [tuple(row) for row in query.order_by(models.Car.id)]
+
+def _lookup_cached_research(db: Session, vehicles: Dict, engine_type: Optional[str]) -> Dict:
+    cached = {}
+    for key, (make, model, year) in vehicles.items():
+        result = research_cache.get_cached_research(db, make, model, year, engine_type)
+        if result:
+            cached[key] = result
+    return cached
+
+def _save_batch_research(db: Session, vehicles: Dict, researched: Dict, logs: List[models.ServiceResearchLog],
+                         engine_type: Optional[str]) -> None:
+    """Store every new template and research log in one transaction"""
+    for key, (intervals, _, _, _) in researched.items():
+        if intervals:
+            make, model, year = vehicles[key]
+            research_cache.store_research(db, make, model, year, engine_type, intervals, commit=False)
+    db.add_all(logs)
+    db.commit()
+
+@router.post("/research-intervals/batch", response_model=schemas.ServiceResearchBatchResponse)
+async def research_intervals_batch(
+    request: schemas.ServiceResearchBatchRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Research service intervals for several cars (by ID or group) at once.
+
+    Cars with the same make/model/year are researched once; unique vehicles
+    missing from the template cache are researched concurrently.
+    """
+    if (request.car_ids is None) == (request.group_name is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either car_ids or group_name"
+        )
+    
+    engine_type = request.engine_type
+    cars = await run_in_threadpool(
+        _load_research_cars, db, current_user.id, request.car_ids, request.group_name
+    )
+    
+    if request.car_ids is not None:
+        missing = sorted(set(request.car_ids) - {car_id for car_id, _, _, _ in cars})
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Cars not found: {missing}"
+            )
+    
+    # One entry per unique vehicle, researched with the first car's spelling
+    vehicles = {}
+    for _, make, model, year in cars:
+        vehicles.setdefault(research_cache.template_key(make, model, year, engine_type), (make, model, year))
+    
+    cached = await run_in_threadpool(_lookup_cached_research, db, vehicles, engine_type)
+    session_factory = sessionmaker(bind=db.get_bind())
+    for key, result in cached.items():
+        if result.is_stale:
+            research_cache.schedule_refresh(background_tasks, session_factory, *vehicles[key], engine_type)
+    
+    to_research = [key for key in vehicles if key not in cached]
+    limit = asyncio.Semaphore(settings.research_batch_concurrency)
+    
+    async def research(key):
+        async with limit:
+            return await research_service_intervals(*vehicles[key], engine_type)
+    
+    outcomes = await asyncio.gather(*(research(key) for key in to_research), return_exceptions=True)
+    researched_at = datetime.now()
+    
+    researched, failures, logs = {}, {}, []
+    for key, outcome in zip(to_research, outcomes):
+        make, model, year = vehicles[key]
+        if isinstance(outcome, Exception):
+            failures[key] = f"Research failed: {outcome}"
+            logs.append(_research_log(make, model, year, ["error"], 0, 0, {"error": str(outcome)}))
+            continue
+        intervals, sources_used, confidence_score, errors = outcome
+        researched[key] = outcome
+        logs.append(_research_log(make, model, year, sources_used, len(intervals), confidence_score, errors))
+    
+    if logs:
+        await run_in_threadpool(_save_batch_research, db, vehicles, researched, logs, engine_type)
+    
+    results, failed = [], {}
+    for car_id, make, model, year in cars:
+        key = research_cache.template_key(make, model, year, engine_type)
+        if key in failures:
+            failed[car_id] = failures[key]
+        elif key in cached:
+            hit = cached[key]
+            results.append(_research_response(
+                car_id, make, model, year, hit.intervals, hit.sources_used, hit.researched_at
+            ))
+        else:
+            intervals, sources_used, _, _ = researched[key]
+            results.append(_research_response(
+                car_id, make, model, year, intervals, sources_used, researched_at
+            ))
+    
+    return schemas.ServiceResearchBatchResponse(
+        results=results,
+        failed=failed,
+        unique_vehicles=len(vehicles),
+        researched=len(researched)
+    )
+
 @router.post("/cars/{car_id}/service-intervals", response_model=schemas.ServiceIntervalOut, status_code=status.HTTP_201_CREATED)
-async def create_service_interval(
+def create_service_interval(
     car_id: int,
     interval: schemas.ServiceIntervalCreate,
     db: Session = Depends(get_db),
@@ -143,7 +300,7 @@ async def create_service_interval(
         existing_interval.cost_estimate_high = interval.cost_estimate_high
         existing_interval.notes = interval.notes or existing_interval.notes
         existing_interval.source = interval.source or existing_interval.source
-        existing_interval.updated_at = datetime.now()
+        existing_interval.updated_at = datetime.now(UTC)
         
         db.commit()
         db.refresh(existing_interval)
@@ -171,7 +328,7 @@ async def create_service_interval(
         return db_interval
 
 @router.post("/cars/{car_id}/service-intervals/bulk", response_model=List[schemas.ServiceIntervalOut])
-async def create_service_intervals_bulk(
+def create_service_intervals_bulk(
     car_id: int,
     intervals: List[schemas.ServiceIntervalCreate],
     db: Session = Depends(get_db),
@@ -217,7 +374,7 @@ async def create_service_intervals_bulk(
             existing_interval.cost_estimate_high = interval_data.cost_estimate_high
             existing_interval.notes = interval_data.notes or existing_interval.notes
             existing_interval.source = interval_data.source or existing_interval.source
-            existing_interval.updated_at = datetime.now()
+            existing_interval.updated_at = datetime.now(UTC)
             processed_intervals.append(existing_interval)
         else:
             # Create new interval
@@ -246,7 +403,7 @@ async def create_service_intervals_bulk(
     return processed_intervals
 
 @router.get("/cars/{car_id}/service-intervals", response_model=List[schemas.ServiceIntervalOut])
-async def get_car_service_intervals(
+def get_car_service_intervals(
     car_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
@@ -274,7 +431,7 @@ async def get_car_service_intervals(
     return intervals
 
 @router.put("/service-intervals/{interval_id}", response_model=schemas.ServiceIntervalOut)
-async def update_service_interval(
+def update_service_interval(
     interval_id: int,
     interval_update: schemas.ServiceIntervalUpdate,
     db: Session = Depends(get_db),
@@ -299,7 +456,7 @@ async def update_service_interval(
     for field, value in update_data.items():
         setattr(interval, field, value)
     
-    interval.updated_at = datetime.now()
+    interval.updated_at = datetime.now(UTC)
     
     db.commit()
     db.refresh(interval)
@@ -307,32 +464,23 @@ async def update_service_interval(
     return interval
 
 @router.delete("/service-intervals/{interval_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_service_interval(
+def delete_service_interval(
     interval_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Delete a service interval"""
     
-    # Get the interval and verify ownership
-    interval = db.query(models.ServiceInterval).filter(
-        models.ServiceInterval.id == interval_id,
-        models.ServiceInterval.user_id == current_user.id
-    ).first()
-    
-    if not interval:
+    if not crud.delete_service_interval(db, interval_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Service interval not found"
         )
     
-    db.delete(interval)
-    db.commit()
-    
     return {"message": "Service interval deleted successfully"}
 
 @router.post("/cars/{car_id}/service-history", response_model=schemas.ServiceHistoryOut, status_code=status.HTTP_201_CREATED)
-async def create_service_history(
+def create_service_history(
     car_id: int,
     service_data: schemas.ServiceHistoryCreate,
     db: Session = Depends(get_db),
@@ -377,12 +525,22 @@ async def create_service_history(
     return db_service
 
 @router.get("/cars/{car_id}/service-history", response_model=List[schemas.ServiceHistoryOut])
-async def get_car_service_history(
+def get_car_service_history(
     car_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    service_item: Optional[str] = None,
+    shop: Optional[str] = None,
+    performed_after: Optional[datetime] = None,
+    performed_before: Optional[datetime] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Get service history for a car"""
+    """
+    Get service history for a car, optionally filtered by exact service item or shop and by date.
+    Returns every entry unless a limit is given.
+    """
     
     # Verify car ownership
     car = db.query(models.Car).filter(
@@ -396,15 +554,32 @@ async def get_car_service_history(
             detail="Car not found"
         )
     
-    history = db.query(models.ServiceHistory).filter(
+    query = db.query(models.ServiceHistory).filter(
         models.ServiceHistory.car_id == car_id,
         models.ServiceHistory.user_id == current_user.id
-    ).order_by(models.ServiceHistory.performed_date.desc()).all()
+    )
+    if service_item is not None:
+        query = query.filter(models.ServiceHistory.service_item == service_item)
+    if shop is not None:
+        query = query.filter(models.ServiceHistory.shop == shop)
+    # Date bounds narrow the (car_id, user_id, performed_date) index range
+    if performed_after is not None:
+        query = query.filter(models.ServiceHistory.performed_date >= performed_after)
+    if performed_before is not None:
+        query = query.filter(models.ServiceHistory.performed_date < performed_before)
+
+    # Most recent first
+    history, next_cursor = paginate(
+        query,
+        models.ServiceHistory.id, cursor, limit,
+        sort_column=models.ServiceHistory.performed_date, descending=True
+    )
+    set_next_cursor(response, next_cursor)
     
     return history
 
 @router.put("/service-history/{service_id}", response_model=schemas.ServiceHistoryOut)
-async def update_service_history(
+def update_service_history(
     service_id: int,
     service_update: schemas.ServiceHistoryUpdate,
     db: Session = Depends(get_db),
@@ -435,42 +610,45 @@ async def update_service_history(
     return service
 
 @router.delete("/service-history/{service_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_service_history(
+def delete_service_history(
     service_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Delete a service history entry"""
     
-    # Get the service history entry and verify ownership
-    service = db.query(models.ServiceHistory).filter(
-        models.ServiceHistory.id == service_id,
-        models.ServiceHistory.user_id == current_user.id
-    ).first()
-    
-    if not service:
+    if not crud.delete_service_history(db, service_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Service history entry not found"
         )
     
-    db.delete(service)
-    db.commit()
-    
     return {"message": "Service history entry deleted successfully"}
 
-@router.get("/service-intervals/due", response_model=List[schemas.ServiceIntervalOut])
-async def get_due_service_intervals(
+@router.get("/service-intervals/due", response_model=List[schemas.ServiceIntervalDue])
+def get_due_service_intervals(
+    car_id: Optional[int] = None,
+    due_soon_percent: int = Query(DUE_SOON_PERCENT, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Get all service intervals that are due or overdue for the user"""
+    """Get service intervals that are due soon or overdue, most urgent first"""
     
-    # This would need more complex logic to calculate due dates
-    # For now, just return all active intervals
-    intervals = db.query(models.ServiceInterval).filter(
-        models.ServiceInterval.user_id == current_user.id,
-        models.ServiceInterval.is_active == True
-    ).all()
+    schedules = get_due_intervals(
+        db, current_user.id, car_id=car_id, due_soon_percent=due_soon_percent
+    )
     
-    return intervals
\ No newline at end of file
+    return [
+        schemas.ServiceIntervalDue(
+            **schemas.ServiceIntervalOut.model_validate(schedule.interval).model_dump(),
+            status=schedule.status,
+            progress_percent=schedule.progress_percent,
+            last_performed_date=schedule.last_performed_date,
+            last_performed_mileage=schedule.last_performed_mileage,
+            next_due_date=schedule.next_due_date,
+            next_due_mileage=schedule.next_due_mileage,
+            miles_remaining=schedule.miles_remaining,
+            days_remaining=schedule.days_remaining
+        )
+        for schedule in schedules
+    ]
@@ -9,18 +9,23 @@ import aiohttp
 import asyncio
 import json
 import re
-from typing import List, Dict, Optional, Tuple
+from bisect import bisect_right
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 from bs4 import BeautifulSoup
 import logging
 from urllib.parse import quote
 
+from .research_sources import query_sources, source_errors
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(frozen=True)
 class ServiceInterval:
-    """Represents a service interval recommendation"""
+    """Represents a service interval recommendation (immutable, shared by the catalog)"""
     service_item: str
     interval_miles: Optional[int] = None
     interval_months: Optional[int] = None
@@ -35,10 +40,88 @@ class ServiceResearchError(Exception):
     """Custom exception for service research errors"""
     pass
 
+# Catalog key: (make group, model family, year band, engine class)
+CatalogKey = Tuple[str, str, int, str]
+
+# Makes that share a maintenance schedule; anything else gets the generic one
+MAKE_GROUPS = {
+    'toyota': 'toyota', 'lexus': 'toyota',
+    'honda': 'honda', 'acura': 'honda',
+    'ford': 'ford',
+    'chevrolet': 'gm', 'gmc': 'gm', 'buick': 'gm', 'cadillac': 'gm',
+    'bmw': 'bmw', 'mini': 'bmw',
+    'mercedes-benz': 'mercedes', 'mercedes': 'mercedes',
+    'volkswagen': 'vw', 'vw': 'vw', 'audi': 'vw', 'porsche': 'vw',
+    'nissan': 'nissan', 'infiniti': 'nissan',
+    'mazda': 'mazda',
+    'subaru': 'subaru',
+}
+GENERIC_MAKE_GROUP = 'generic'
+
+# Model families that change a make group's schedule, with a model name that
+# falls in each family. Groups not listed use a single 'all' family.
+MODEL_FAMILIES = {
+    'toyota': {'hybrid': 'Prius', 'standard': ''},
+    'ford': {
+        'super_duty': 'F-250',
+        'super_duty_other': 'Super Duty',
+        'f150': 'F-150',
+        'other': '',
+    },
+}
+DEFAULT_MODEL_FAMILY = 'all'
+
+# First model year of each band; the schedules only change at these years
+YEAR_BAND_STARTS = (2008, 2010, 2018)
+
+ENGINE_CLASSES = ('gas', 'diesel')
+
+FORD_SUPER_DUTY_MODELS = ('f-250', 'f250', 'f-350', 'f350', 'super duty')
+FORD_TRUCK_MODELS = ('f-150', 'f150', 'f-250', 'f250', 'f-350', 'f350')
+
+
+def _model_family(make_group: str, model: str) -> str:
+    """Classify a model into the family that decides its schedule"""
+    model_lower = model.lower()
+    if make_group == 'toyota':
+        return 'hybrid' if 'prius' in model_lower or 'hybrid' in model_lower else 'standard'
+    if make_group == 'ford':
+        if any(sd in model_lower for sd in FORD_SUPER_DUTY_MODELS):
+            if any(truck in model_lower for truck in FORD_TRUCK_MODELS):
+                return 'super_duty'
+            return 'super_duty_other'
+        if 'f-150' in model_lower or 'f150' in model_lower:
+            return 'f150'
+        return 'other'
+    return DEFAULT_MODEL_FAMILY
+
+
+def _year_band(year: int) -> int:
+    return bisect_right(YEAR_BAND_STARTS, year)
+
+
+def _band_year(band: int) -> int:
+    """A model year inside the given band"""
+    return YEAR_BAND_STARTS[band - 1] if band else YEAR_BAND_STARTS[0] - 1
+
+
+@lru_cache(maxsize=4096)
+def catalog_key(make: str, model: str, year: int, engine_type: Optional[str] = None) -> CatalogKey:
+    """Normalize a vehicle description to its maintenance catalog key"""
+    make_group = MAKE_GROUPS.get(make.strip().lower(), GENERIC_MAKE_GROUP)
+    engine_class = 'diesel' if (engine_type or '').strip().lower() == 'diesel' else 'gas'
+    return (make_group, _model_family(make_group, model), _year_band(year), engine_class)
+
+
 class CarMaintenanceDatabase:
     """
     Comprehensive car maintenance database with manufacturer recommendations
+
+    The schedules are compiled once into ``catalog`` (see compile_catalog), so a
+    lookup is a normalization (memoized) plus a dictionary hit.
     """
+
+    catalog: Mapping[CatalogKey, Tuple[ServiceInterval, ...]] = MappingProxyType({})
     
     def __init__(self):
         self.name = "Manufacturer Database"
@@ -48,32 +131,54 @@ class CarMaintenanceDatabase:
     
     async def search_vehicle(self, make: str, model: str, year: int, engine_type: Optional[str] = None) -> List[ServiceInterval]:
         """Get maintenance schedule based on manufacturer recommendations"""
+        return list(self.lookup(make, model, year, engine_type))
+
+    def lookup(self, make: str, model: str, year: int, engine_type: Optional[str] = None) -> Tuple[ServiceInterval, ...]:
+        """Return the compiled schedule for a vehicle"""
+        return self.catalog[catalog_key(make, model, year, engine_type)]
+
+    @classmethod
+    def compile_catalog(cls) -> Mapping[CatalogKey, Tuple[ServiceInterval, ...]]:
+        """Build every schedule once, keyed by make group, model family, year band and engine"""
+        database = cls()
+        compiled = {}
+        for make_group in sorted(set(MAKE_GROUPS.values())) + [GENERIC_MAKE_GROUP]:
+            families = MODEL_FAMILIES.get(make_group, {DEFAULT_MODEL_FAMILY: ''})
+            for family, model in families.items():
+                for band in range(len(YEAR_BAND_STARTS) + 1):
+                    for engine_class in ENGINE_CLASSES:
+                        compiled[(make_group, family, band, engine_class)] = tuple(
+                            database.build_intervals(make_group, model, _band_year(band), engine_class)
+                        )
+        return MappingProxyType(compiled)
+
+    def build_intervals(self, make_group: str, model: str, year: int, engine_type: Optional[str] = None) -> List[ServiceInterval]:
+        """Assemble a schedule from the manufacturer rules (used to compile the catalog)"""
         intervals = []
         
         # Base maintenance items that apply to most vehicles
-        base_intervals = self._get_base_intervals(make, model, year)
+        base_intervals = self._get_base_intervals(make_group, model, year)
         
         # Add manufacturer-specific intervals
-        make_lower = make.lower()
-        if make_lower in ['toyota', 'lexus']:
+        if make_group == 'toyota':
             intervals.extend(self._get_toyota_intervals(model, year))
-        elif make_lower in ['honda', 'acura']:
+        elif make_group == 'honda':
             intervals.extend(self._get_honda_intervals(model, year))
-        elif make_lower == 'ford':
+        elif make_group == 'ford':
             intervals.extend(self._get_ford_intervals(model, year, engine_type))
-        elif make_lower in ['chevrolet', 'gmc', 'buick', 'cadillac']:
+        elif make_group == 'gm':
             intervals.extend(self._get_gm_intervals(model, year))
-        elif make_lower in ['bmw', 'mini']:
+        elif make_group == 'bmw':
             intervals.extend(self._get_bmw_intervals(model, year))
-        elif make_lower in ['mercedes-benz', 'mercedes']:
+        elif make_group == 'mercedes':
             intervals.extend(self._get_mercedes_intervals(model, year))
-        elif make_lower in ['volkswagen', 'vw', 'audi', 'porsche']:
+        elif make_group == 'vw':
             intervals.extend(self._get_vw_group_intervals(model, year))
-        elif make_lower in ['nissan', 'infiniti']:
+        elif make_group == 'nissan':
             intervals.extend(self._get_nissan_intervals(model, year))
-        elif make_lower in ['mazda']:
+        elif make_group == 'mazda':
             intervals.extend(self._get_mazda_intervals(model, year))
-        elif make_lower in ['subaru']:
+        elif make_group == 'subaru':
             intervals.extend(self._get_subaru_intervals(model, year))
         else:
             # For unknown makes, return comprehensive generic intervals
@@ -297,7 +402,7 @@ class CarMaintenanceDatabase:
         intervals = []
         
         # Check if it's a Super Duty (F-250, F-350) with diesel
-        is_super_duty = any(sd in model.lower() for sd in ['f-250', 'f250', 'f-350', 'f350', 'super duty'])
+        is_super_duty = any(sd in model.lower() for sd in FORD_SUPER_DUTY_MODELS)
         
         if is_super_duty and engine_type == "diesel":
             # 6.7L Power Stroke Diesel specific
@@ -387,7 +492,7 @@ class CarMaintenanceDatabase:
         ])
         
         # Transmission fluid for trucks
-        if any(truck in model.lower() for truck in ['f-150', 'f150', 'f-250', 'f250', 'f-350', 'f350']):
+        if any(truck in model.lower() for truck in FORD_TRUCK_MODELS):
             intervals.append(ServiceInterval(
                 service_item="Transmission Fluid",
                 interval_miles=150000,
@@ -610,6 +715,8 @@ class CarMaintenanceDatabase:
             )
         ]
 
+CarMaintenanceDatabase.catalog = CarMaintenanceDatabase.compile_catalog()
+
 class ServiceIntervalResearcher:
     """Main service interval research engine"""
     
@@ -618,30 +725,21 @@ class ServiceIntervalResearcher:
             CarMaintenanceDatabase()
         ]
         self.sources_used = []
+        self.source_errors = {}
         self.confidence_score = 0
     
     async def research_vehicle(self, make: str, model: str, year: int, engine_type: Optional[str] = None) -> List[ServiceInterval]:
         """Research service intervals for a specific vehicle"""
         logger.info(f"Starting research for {year} {make} {model} (engine: {engine_type or 'not specified'})")
         
-        all_intervals = []
-        self.sources_used = []
+        # Query all sources concurrently; failed or slow sources leave partial results
+        results = await query_sources(
+            self.sources, lambda source: source.search_vehicle(make, model, year, engine_type)
+        )
         
-        # Research from all sources
-        for source in self.sources:
-            try:
-                logger.info(f"Researching from {source.name}")
-                intervals = await source.search_vehicle(make, model, year, engine_type)
-                
-                if intervals:
-                    all_intervals.extend(intervals)
-                    self.sources_used.append(source.name)
-                    logger.info(f"Found {len(intervals)} intervals from {source.name}")
-                else:
-                    logger.info(f"No intervals found from {source.name}")
-                    
-            except Exception as e:
-                logger.error(f"Error with source {source.name}: {e}")
+        all_intervals = [interval for result in results for interval in result.intervals]
+        self.sources_used = [result.name for result in results if result.status == "ok"]
+        self.source_errors = source_errors(results)
         
         # Merge and deduplicate results
         merged_intervals = self._merge_intervals(all_intervals)
@@ -672,7 +770,7 @@ class ServiceIntervalResearcher:
         return int(avg_confidence)
 
 # Factory function for easy integration
-async def research_service_intervals(make: str, model: str, year: int, engine_type: Optional[str] = None) -> Tuple[List[ServiceInterval], List[str], int]:
+async def research_service_intervals(make: str, model: str, year: int, engine_type: Optional[str] = None) -> Tuple[List[ServiceInterval], List[str], int, Dict[str, str]]:
     """
     Research service intervals for a vehicle
     
@@ -683,9 +781,10 @@ async def research_service_intervals(make: str, model: str, year: int, engine_ty
         engine_type: Optional engine type (gas, diesel, hybrid, electric)
     
     Returns:
-        Tuple of (intervals, sources_used, confidence_score)
+        Tuple of (intervals, sources_used, confidence_score, source_errors) where
+        source_errors maps each failed, timed out or skipped source to the reason
     """
     researcher = ServiceIntervalResearcher()
     intervals = await researcher.research_vehicle(make, model, year, engine_type)
     
-    return intervals, researcher.sources_used, researcher.confidence_score
\ No newline at end of file
+    return intervals, researcher.sources_used, researcher.confidence_score, researcher.source_errors
\ No newline at end of file
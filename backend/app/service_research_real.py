@@ -16,6 +16,9 @@ from bs4 import BeautifulSoup
 import logging
 from urllib.parse import quote
 
+from .http_client import http_client
+from .research_sources import query_sources, source_errors
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -187,14 +190,12 @@ class DriverSideAPIScraper:
     
     def __init__(self):
         self.name = "Driver's Manual Database"
-        self.session = None
     
     async def search_vehicle(self, make: str, model: str, year: int) -> List[ServiceInterval]:
         """Get maintenance schedule from driver's manual database"""
         try:
-            # Create session if needed
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            # Borrow the application's pooled session; it outlives this request
+            session = await http_client.get_session()
             
             # In a real implementation, this would query an actual API
             # For now, return make-specific common intervals
@@ -323,11 +324,7 @@ class DriverSideAPIScraper:
                 notes="Follow Oil Life Monitor"
             )
         ]
-    
-    async def close(self):
-        """Close the session"""
-        if self.session:
-            await self.session.close()
+
 
 class ServiceIntervalResearcher:
     """Main service interval research engine with real data sources"""
@@ -338,35 +335,19 @@ class ServiceIntervalResearcher:
             DriverSideAPIScraper()
         ]
         self.sources_used = []
+        self.source_errors = {}
         self.confidence_score = 0
     
     async def research_vehicle(self, make: str, model: str, year: int) -> List[ServiceInterval]:
         """Research service intervals for a specific vehicle"""
         logger.info(f"Starting real research for {year} {make} {model}")
         
-        all_intervals = []
-        self.sources_used = []
-        
-        # Research from all sources
-        for source in self.sources:
-            try:
-                logger.info(f"Researching from {source.name}")
-                intervals = await source.search_vehicle(make, model, year)
-                
-                if intervals:
-                    all_intervals.extend(intervals)
-                    self.sources_used.append(source.name)
-                    logger.info(f"Found {len(intervals)} intervals from {source.name}")
-                else:
-                    logger.info(f"No intervals found from {source.name}")
-                    
-            except Exception as e:
-                logger.error(f"Error with source {source.name}: {e}")
+        # Query all sources concurrently; failed or slow sources leave partial results
+        results = await query_sources(self.sources, lambda source: source.search_vehicle(make, model, year))
         
-        # Close any sessions
-        for source in self.sources:
-            if hasattr(source, 'close'):
-                await source.close()
+        all_intervals = [interval for result in results for interval in result.intervals]
+        self.sources_used = [result.name for result in results if result.status == "ok"]
+        self.source_errors = source_errors(results)
         
         # Merge and deduplicate results
         merged_intervals = self._merge_intervals(all_intervals)
@@ -427,14 +408,14 @@ class ServiceIntervalResearcher:
         return int(avg_confidence)
 
 # Factory function for easy integration
-async def research_service_intervals(make: str, model: str, year: int) -> Tuple[List[ServiceInterval], List[str], int]:
+async def research_service_intervals(make: str, model: str, year: int) -> Tuple[List[ServiceInterval], List[str], int, Dict[str, str]]:
     """
     Research service intervals for a vehicle using real data sources
     
     Returns:
-        Tuple of (intervals, sources_used, confidence_score)
+        Tuple of (intervals, sources_used, confidence_score, source_errors)
     """
     researcher = ServiceIntervalResearcher()
     intervals = await researcher.research_vehicle(make, model, year)
     
-    return intervals, researcher.sources_used, researcher.confidence_score
\ No newline at end of file
+    return intervals, researcher.sources_used, researcher.confidence_score, researcher.source_errors
\ No newline at end of file
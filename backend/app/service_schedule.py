@@ -0,0 +1,183 @@
+"""
+Service Schedule Engine
+
+This module works out when each service interval is next due by joining it
+to the most recent matching service history entry and the car's current
+mileage, so callers only receive the intervals that actually need attention.
+"""
+
+import calendar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Matches the thresholds used by the frontend progress bars
+DUE_SOON_PERCENT = 75
+OVERDUE_PERCENT = 100
+
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+
+@dataclass
+class IntervalSchedule:
+    """Due status of a single service interval"""
+    interval: models.ServiceInterval
+    status: str  # "ok", "due_soon" or "overdue"
+    progress_percent: int
+    last_performed_date: Optional[datetime] = None
+    last_performed_mileage: Optional[int] = None
+    next_due_date: Optional[datetime] = None
+    next_due_mileage: Optional[int] = None
+    miles_remaining: Optional[int] = None
+    days_remaining: Optional[int] = None
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Add calendar months to a datetime, clamping to the end of the month"""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def build_interval_schedule_query(db: Session, user_id: int, car_id: Optional[int] = None):
+    """
+    Build the query joining every active interval to the car's mileage and the
+    latest matching service history entry.
+    """
+    service_key = func.lower(models.ServiceHistory.service_item)
+    latest_service = db.query(
+        models.ServiceHistory.car_id.label("car_id"),
+        service_key.label("service_key"),
+        models.ServiceHistory.performed_date.label("performed_date"),
+        models.ServiceHistory.mileage.label("mileage"),
+        models.ServiceHistory.next_due_date.label("next_due_date"),
+        models.ServiceHistory.next_due_mileage.label("next_due_mileage"),
+        func.row_number().over(
+            partition_by=(models.ServiceHistory.car_id, service_key),
+            order_by=models.ServiceHistory.performed_date.desc()
+        ).label("recency")
+    ).filter(
+        models.ServiceHistory.user_id == user_id
+    ).subquery()
+
+    query = db.query(
+        models.ServiceInterval,
+        models.Car.mileage.label("car_mileage"),
+        models.Car.year.label("car_year"),
+        latest_service.c.performed_date,
+        latest_service.c.mileage,
+        latest_service.c.next_due_date,
+        latest_service.c.next_due_mileage
+    ).join(
+        models.Car, models.Car.id == models.ServiceInterval.car_id
+    ).outerjoin(
+        latest_service, and_(
+            latest_service.c.car_id == models.ServiceInterval.car_id,
+            latest_service.c.service_key == func.lower(models.ServiceInterval.service_item),
+            latest_service.c.recency == 1
+        )
+    ).filter(
+        models.ServiceInterval.user_id == user_id,
+        models.ServiceInterval.is_active == True
+    )
+
+    if car_id is not None:
+        query = query.filter(models.ServiceInterval.car_id == car_id)
+
+    return query
+
+
+def get_interval_schedule_rows(db: Session, user_id: int, car_id: Optional[int] = None):
+    """Fetch the schedule rows for a user (optionally one car) in a single query"""
+    return build_interval_schedule_query(db, user_id, car_id).all()
+
+
+def evaluate_schedule_row(row, now: datetime, due_soon_percent: int = DUE_SOON_PERCENT) -> IntervalSchedule:
+    """Work out the next due date/mileage and progress for one schedule row"""
+    interval = row.ServiceInterval
+    car_mileage = row.car_mileage or 0
+
+    # Without any history, measure from zero miles and the start of the model year
+    baseline_date = row.performed_date or datetime(row.car_year, 1, 1)
+    baseline_mileage = row.mileage if row.performed_date is not None else 0
+
+    next_due_mileage = row.next_due_mileage
+    if next_due_mileage is None and interval.interval_miles and baseline_mileage is not None:
+        next_due_mileage = baseline_mileage + interval.interval_miles
+
+    next_due_date = row.next_due_date
+    if next_due_date is None and interval.interval_months:
+        next_due_date = add_months(baseline_date, interval.interval_months)
+
+    progress = 0.0
+    miles_remaining = None
+    days_remaining = None
+
+    if next_due_mileage is not None:
+        miles_remaining = next_due_mileage - car_mileage
+        span = next_due_mileage - (baseline_mileage or 0)
+        if span > 0:
+            progress = max(progress, (car_mileage - (baseline_mileage or 0)) / span * 100)
+        elif miles_remaining <= 0:
+            progress = max(progress, OVERDUE_PERCENT)
+
+    if next_due_date is not None:
+        days_remaining = (next_due_date - now).days
+        span = (next_due_date - baseline_date).total_seconds()
+        if span > 0:
+            progress = max(progress, (now - baseline_date).total_seconds() / span * 100)
+        elif next_due_date <= now:
+            progress = max(progress, OVERDUE_PERCENT)
+
+    if progress >= OVERDUE_PERCENT:
+        status = "overdue"
+    elif progress >= due_soon_percent:
+        status = "due_soon"
+    else:
+        status = "ok"
+
+    return IntervalSchedule(
+        interval=interval,
+        status=status,
+        progress_percent=int(round(progress)),
+        last_performed_date=row.performed_date,
+        last_performed_mileage=row.mileage,
+        next_due_date=next_due_date,
+        next_due_mileage=next_due_mileage,
+        miles_remaining=miles_remaining,
+        days_remaining=days_remaining
+    )
+
+
+def urgency_sort_key(schedule: IntervalSchedule):
+    """Overdue first, then by how far through the interval, then by priority"""
+    return (
+        0 if schedule.status == "overdue" else 1,
+        -schedule.progress_percent,
+        PRIORITY_RANK.get(schedule.interval.priority, len(PRIORITY_RANK))
+    )
+
+
+def get_due_intervals(
+    db: Session,
+    user_id: int,
+    car_id: Optional[int] = None,
+    due_soon_percent: int = DUE_SOON_PERCENT,
+    now: Optional[datetime] = None
+) -> List[IntervalSchedule]:
+    """Return only the intervals that are due soon or overdue, most urgent first"""
+    now = now or datetime.now()
+    schedules = [
+        evaluate_schedule_row(row, now, due_soon_percent)
+        for row in get_interval_schedule_rows(db, user_id, car_id)
+    ]
+    due = [schedule for schedule in schedules if schedule.status != "ok"]
+    due.sort(key=urgency_sort_key)
+    return due
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import event
+from app.auth import principal_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    """Each test module builds its own database, so cached users must not leak between tests."""
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+class QueryCounter:
+    """Records the SQL statements an engine executes inside a ``with`` block."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries():
+    """``with count_queries(engine) as queries: ...`` then assert on ``queries.count``."""
+    return QueryCounter
@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash, principal_cache, AUTH_CACHE_LOOKUPS
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_auth_cache.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    def override_get_db():
+        # A fresh session per request, like production
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    app.dependency_overrides[get_db] = override_get_db
+
+    db = TestingSessionLocal()
+    for username, is_admin in (("cacheadmin", True), ("cacheuser", False)):
+        db.add(models.User(
+            username=username,
+            email=f"{username}@example.com",
+            hashed_password=get_password_hash("testpass123"),
+            is_admin=is_admin
+        ))
+    db.commit()
+    db.close()
+
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+    Base.metadata.drop_all(bind=engine)
+
+def login(client, username):
+    response = client.post("/auth/login", json={"username": username, "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def users_queries(statements):
+    return [sql for sql in statements if "FROM users" in sql]
+
+@pytest.fixture
+def statements():
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield captured
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_cache_hit_skips_users_query(client, statements):
+    headers = login(client, "cacheuser")
+    hits_before = AUTH_CACHE_LOOKUPS.value(result="hit")
+
+    assert client.get("/cars/", headers=headers).status_code == 200
+    statements.clear()
+    assert client.get("/cars/", headers=headers).status_code == 200
+
+    assert users_queries(statements) == []
+    assert AUTH_CACHE_LOOKUPS.value(result="hit") == hits_before + 1
+
+
+def test_deactivation_invalidates_cache(client):
+    user_headers = login(client, "cacheuser")
+    admin_headers = login(client, "cacheadmin")
+    assert client.get("/auth/me", headers=user_headers).status_code == 200
+
+    users = client.get("/admin/users/", headers=admin_headers).json()
+    user_id = next(u["id"] for u in users if u["username"] == "cacheuser")
+    response = client.put(f"/admin/users/{user_id}", json={"is_active": False}, headers=admin_headers)
+    assert response.status_code == 200
+
+    response = client.get("/auth/me", headers=user_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_password_change_invalidates_cache(client):
+    headers = login(client, "cacheuser")
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert principal_cache.get("cacheuser") is not None
+
+    response = client.put(
+        "/auth/change-password",
+        json={"current_password": "testpass123", "new_password": "newpass456"},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert principal_cache.get("cacheuser") is None
+
+
+# Run in a separate interpreter, like another gunicorn worker sharing the database
+DEACTIVATE_IN_OTHER_WORKER = """
+from app import crud, schemas
+from app.database import SessionLocal
+db = SessionLocal()
+user = crud.get_user_by_username(db, "cacheuser")
+crud.update_user(db, user.id, schemas.UserUpdate(is_active=False))
+db.close()
+"""
+
+def test_deactivation_in_another_worker_invalidates_cache(client, monkeypatch):
+    monkeypatch.setattr(principal_cache, "sync_seconds", 0)
+    headers = login(client, "cacheuser")
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert principal_cache.get("cacheuser") is not None
+
+    subprocess.run(
+        [sys.executable, "-c", DEACTIVATE_IN_OTHER_WORKER],
+        env={**os.environ, "DATABASE_URL": SQLALCHEMY_DATABASE_URL},
+        check=True
+    )
+    assert principal_cache.get("cacheuser") is not None
+
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_metrics_endpoint_reports_auth_cache(client):
+    headers = login(client, "cacheuser")
+    client.get("/auth/me", headers=headers)
+    client.get("/auth/me", headers=headers)
+
+    body = client.get("/metrics", headers=login(client, "cacheadmin")).text
+    assert 'auth_principal_cache_lookups_total{result="hit"}' in body
+    assert 'auth_resolve_seconds_count{result="miss"}' in body
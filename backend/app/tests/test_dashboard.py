@@ -0,0 +1,155 @@
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+from app.dashboard import get_dashboard
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_dashboard.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+NOW = datetime(2024, 6, 1)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def test_user(test_db):
+    user = models.User(
+        username="dashuser",
+        email="dash@example.com",
+        hashed_password=get_password_hash("testpass123")
+    )
+    test_db.add(user)
+    test_db.commit()
+
+    busy = models.Car(user_id=user.id, make="BMW", model="M3", year=2015, mileage=60000)
+    idle = models.Car(user_id=user.id, make="Mazda", model="MX-5", year=1995, mileage=80000)
+    test_db.add_all([busy, idle])
+    test_db.flush()
+
+    test_db.add_all([
+        models.ToDo(user_id=user.id, car_id=busy.id, title="Fix trim", status="open"),
+        models.ToDo(user_id=user.id, car_id=busy.id, title="Detail", status="open"),
+        models.ToDo(user_id=user.id, car_id=busy.id, title="Wipers", status="resolved"),
+        # Last year's spend doesn't count towards this year
+        models.ServiceHistory(user_id=user.id, car_id=busy.id, service_item="Brakes",
+                              performed_date=datetime(2023, 11, 1), mileage=50000, cost=900),
+        models.ServiceHistory(user_id=user.id, car_id=busy.id, service_item="Oil Change",
+                              performed_date=datetime(2024, 2, 1), mileage=55000, cost=120.50),
+        models.ServiceHistory(user_id=user.id, car_id=busy.id, service_item="Tires",
+                              performed_date=datetime(2024, 3, 1), mileage=56000, cost=800),
+        # Oil is at 5000 of 7500 miles; coolant is long overdue
+        models.ServiceInterval(user_id=user.id, car_id=busy.id, service_item="Oil Change",
+                               interval_miles=7500, priority="high"),
+        models.ServiceInterval(user_id=user.id, car_id=busy.id, service_item="Coolant Flush",
+                               interval_months=24, priority="low"),
+    ])
+    test_db.commit()
+    test_db.refresh(user)
+    return user
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_user):
+    response = client.post("/auth/login", json={"username": "dashuser", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_dashboard_summarises_each_car(test_db, test_user):
+    dashboard = get_dashboard(test_db, test_user.id, now=NOW)
+    busy, idle = dashboard.cars
+
+    assert busy.open_todos == 2
+    assert busy.last_service_date == datetime(2024, 3, 1)
+    assert busy.ytd_spend == Decimal("920.50")
+    assert busy.overdue_services == 1
+    assert busy.next_service.service_item == "Coolant Flush"
+    assert busy.next_service.status == "overdue"
+
+    assert idle.open_todos == 0
+    assert idle.last_service_date is None
+    assert idle.ytd_spend == 0
+    assert idle.next_service is None
+
+    assert dashboard.open_todos == 2
+    assert dashboard.ytd_spend == Decimal("920.50")
+
+
+def test_ytd_spend_is_exact_to_the_cent(test_db):
+    # 0.10 + 0.20 is 0.30000000000000004 in binary floating point
+    user = models.User(username="centsuser", email="cents@example.com", hashed_password="x")
+    test_db.add(user)
+    test_db.flush()
+    car = models.Car(user_id=user.id, make="Fiat", model="500", year=1970)
+    test_db.add(car)
+    test_db.flush()
+    test_db.add_all([
+        models.ServiceHistory(user_id=user.id, car_id=car.id, service_item=item,
+                              performed_date=datetime(2024, 1, 15), cost=Decimal(cost))
+        for item, cost in (("Fuse", "0.10"), ("Bulb", "0.20"))
+    ])
+    test_db.commit()
+
+    dashboard = get_dashboard(test_db, user.id, now=NOW)
+    assert dashboard.cars[0].ytd_spend == Decimal("0.30")
+    assert str(dashboard.ytd_spend) == "0.30"
+
+
+def test_dashboard_endpoint(client, auth_headers):
+    response = client.get("/dashboard", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [car["model"] for car in data["cars"]] == ["M3", "MX-5"]
+    assert data["cars"][0]["open_todos"] == 2
+
+
+def test_dashboard_query_count_does_not_grow_with_cars(test_db, test_user):
+    user_id = test_user.id
+    for n in range(20):
+        car = models.Car(user_id=user_id, make="Ford", model="Mustang", year=2000 + n, mileage=1000)
+        test_db.add(car)
+        test_db.flush()
+        test_db.add(models.ToDo(user_id=user_id, car_id=car.id, title="Wash"))
+        test_db.add(models.ServiceInterval(user_id=user_id, car_id=car.id, service_item="Oil Change",
+                                           interval_miles=5000))
+    test_db.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        dashboard = get_dashboard(test_db, user_id, now=NOW)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(dashboard.cars) == 22
+    # The schedule and the grouped car totals
+    assert len(statements) == 2
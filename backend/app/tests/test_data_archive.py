@@ -0,0 +1,172 @@
+import gzip
+import io
+import json
+import zipfile
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+from app.data_archive import import_archive, parquet_available, write_archive
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_data_archive.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="function")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="function")
+def test_user(test_db):
+    user = models.User(
+        username="archiveuser",
+        email="archive@example.com",
+        hashed_password=get_password_hash("testpass123")
+    )
+    test_db.add(user)
+    test_db.commit()
+    test_db.refresh(user)
+
+    for n in range(3):
+        car = models.Car(user_id=user.id, make="Mazda", model="MX-5", year=1990 + n,
+                         mileage=10000 * n, group_name="Collector Cars")
+        test_db.add(car)
+        test_db.flush()
+        test_db.add(models.ServiceInterval(user_id=user.id, car_id=car.id, service_item="Oil Change",
+                                           interval_miles=5000, priority="high", cost_estimate_low=40))
+        for month in range(1, 5):
+            test_db.add(models.ServiceHistory(user_id=user.id, car_id=car.id, service_item="Oil Change",
+                                              performed_date=datetime(2023, month, 1), mileage=1000 * month,
+                                              cost=49.99))
+        test_db.add(models.ToDo(user_id=user.id, car_id=car.id, title=f"Wax {n}", priority="low"))
+    test_db.commit()
+    return user
+
+@pytest.fixture(scope="function")
+def other_user(test_db):
+    user = models.User(username="other", email="other@example.com", hashed_password="x")
+    test_db.add(user)
+    test_db.commit()
+    test_db.refresh(user)
+    return user
+
+@pytest.fixture(scope="function")
+def auth_headers(client, test_user):
+    response = client.post("/auth/login", json={"username": "archiveuser", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def read_table(archive: zipfile.ZipFile, name: str):
+    return [json.loads(line) for line in gzip.decompress(archive.read(name)).splitlines()]
+
+
+def test_ndjson_archive_export(client, auth_headers):
+    response = client.post("/data/export/archive", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["format"] == "ndjson"
+    assert manifest["record_counts"] == {"cars": 3, "service_intervals": 3, "service_history": 12, "todos": 3}
+
+    cars = read_table(archive, "cars.ndjson.gz")
+    assert [car["year"] for car in cars] == [1990, 1991, 1992]
+    assert "user_id" not in cars[0]
+    history = read_table(archive, "service_history.ndjson.gz")
+    assert history[0]["cost"] == 49.99
+    assert history[0]["performed_date"] == "2023-01-01T00:00:00"
+    assert {row["car_id"] for row in history} == {car["id"] for car in cars}
+
+
+def test_ndjson_archive_round_trip(test_db, test_user, other_user):
+    buffer = io.BytesIO()
+    write_archive(test_db, test_user.id, test_user.username, buffer)
+    buffer.seek(0)
+
+    result = import_archive(buffer, other_user.id, test_db)
+    assert result["imported"] == {"cars": 3, "service_intervals": 3, "service_history": 12, "todos": 3}
+
+    cars = test_db.query(models.Car).filter_by(user_id=other_user.id).order_by(models.Car.id).all()
+    assert [car.year for car in cars] == [1990, 1991, 1992]
+    for car in cars:
+        assert len(car.service_history) == 4
+        assert min(s.performed_date for s in car.service_history) == datetime(2023, 1, 1)
+        assert len(car.todos) == 1
+
+
+def test_archive_import_endpoint(client, auth_headers, test_db, test_user):
+    exported = client.post("/data/export/archive", headers=auth_headers).content
+    response = client.post(
+        "/data/import/archive", files={"file": ("backup.zip", exported, "application/zip")}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert test_db.query(models.Car).filter_by(user_id=test_user.id).count() == 6
+
+
+def test_invalid_row_rolls_back_import(test_db, other_user):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        rows = [{"id": 1, "make": "Mazda", "model": "MX-5", "year": 1990},
+                {"id": 2, "make": "Mazda", "model": "MX-5", "year": "not a year"}]
+        archive.writestr("cars.ndjson.gz", gzip.compress("\n".join(json.dumps(r) for r in rows).encode()))
+        archive.writestr("manifest.json", json.dumps({"format": "ndjson", "files": {"cars": "cars.ndjson.gz"}}))
+    buffer.seek(0)
+
+    with pytest.raises(Exception) as exc_info:
+        import_archive(buffer, other_user.id, test_db, batch_size=1)
+    assert exc_info.value.status_code == 400
+    assert test_db.query(models.Car).filter_by(user_id=other_user.id).count() == 0
+
+
+def test_corrupt_archive_rejected(client, auth_headers):
+    response = client.post(
+        "/data/import/archive", files={"file": ("backup.zip", b"not a zip", "application/zip")}, headers=auth_headers
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid export archive"
+
+
+def test_unknown_format_rejected(client, auth_headers):
+    response = client.post("/data/export/archive?format=xlsx", headers=auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.skipif(parquet_available(), reason="pyarrow is installed")
+def test_parquet_requires_pyarrow(client, auth_headers):
+    response = client.post("/data/export/archive?format=parquet", headers=auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.skipif(not parquet_available(), reason="pyarrow is not installed")
+def test_parquet_archive_round_trip(test_db, test_user, other_user):
+    buffer = io.BytesIO()
+    counts = write_archive(test_db, test_user.id, test_user.username, buffer, "parquet")
+    assert counts["service_history"] == 12
+    buffer.seek(0)
+
+    result = import_archive(buffer, other_user.id, test_db)
+    assert result["imported"]["service_history"] == 12
@@ -0,0 +1,183 @@
+import time
+import pytest
+from datetime import datetime, timedelta, UTC
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import data_delta, models
+from app.auth import get_password_hash
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_data_delta.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="function")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="function")
+def test_user(test_db):
+    user = models.User(
+        username="deltauser",
+        email="delta@example.com",
+        hashed_password=get_password_hash("testpass123")
+    )
+    test_db.add(user)
+    test_db.commit()
+    test_db.refresh(user)
+    return user
+
+@pytest.fixture(scope="function")
+def auth_headers(client, test_user):
+    response = client.post("/auth/login", json={"username": "deltauser", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="function")
+def garage(client, auth_headers):
+    car_ids = []
+    for n in range(2):
+        response = client.post("/cars/", json={"year": 2015 + n, "make": "Honda", "model": "Civic", "mileage": 50000},
+                               headers=auth_headers)
+        car_ids.append(response.json()["id"])
+    for car_id in car_ids:
+        client.post(f"/cars/{car_id}/todos/", json={"title": "Rotate tires", "car_id": car_id}, headers=auth_headers)
+        client.post(f"/api/cars/{car_id}/service-history",
+                    json={"car_id": car_id, "service_item": "Oil Change", "performed_date": "2024-01-01T00:00:00"},
+                    headers=auth_headers)
+    return car_ids
+
+
+@pytest.fixture
+def exact_watermark(monkeypatch):
+    """Drop the watermark grace so a delta only holds what changed after the last one"""
+    monkeypatch.setattr(data_delta, "WATERMARK_GRACE", timedelta(0))
+
+
+def delta(client, auth_headers, since=None):
+    params = {"since": since} if since else {}
+    response = client.get("/data/export/delta", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_delta_without_since_returns_everything(client, auth_headers, garage):
+    data = delta(client, auth_headers)
+    assert len(data["changes"]["cars"]) == 2
+    assert len(data["changes"]["todos"]) == 2
+    assert len(data["changes"]["service_history"]) == 2
+    assert data["deletions"] == []
+    assert data["watermark"]
+
+
+def test_delta_returns_only_changes_after_watermark(client, auth_headers, garage, exact_watermark):
+    watermark = delta(client, auth_headers)["watermark"]
+    assert delta(client, auth_headers, watermark)["changes"] == {
+        "cars": [], "service_intervals": [], "service_history": [], "todos": []
+    }
+
+    time.sleep(0.01)
+    client.put(f"/cars/{garage[0]}", json={"mileage": 51000}, headers=auth_headers)
+    todo_id = client.get(f"/cars/{garage[1]}/todos/", headers=auth_headers).json()[0]["id"]
+    client.put(f"/todos/{todo_id}", json={"status": "resolved"}, headers=auth_headers)
+
+    changes = delta(client, auth_headers, watermark)["changes"]
+    assert [car["id"] for car in changes["cars"]] == [garage[0]]
+    assert changes["cars"][0]["mileage"] == 51000
+    assert [todo["id"] for todo in changes["todos"]] == [todo_id]
+    assert changes["service_history"] == []
+
+
+def test_deleted_records_become_tombstones(client, auth_headers, garage, test_db, exact_watermark):
+    watermark = delta(client, auth_headers)["watermark"]
+    history_id = delta(client, auth_headers)["changes"]["service_history"][0]["id"]
+    time.sleep(0.01)
+
+    assert client.delete(f"/api/service-history/{history_id}", headers=auth_headers).status_code == 204
+    assert client.delete(f"/cars/{garage[1]}", headers=auth_headers).status_code == 204
+
+    deletions = delta(client, auth_headers, watermark)["deletions"]
+    deleted = {(d["table"], d["id"]) for d in deletions}
+    car_todo = test_db.query(models.DeletionLog).filter_by(table_name="todos").one()
+    assert ("service_history", history_id) in deleted
+    assert ("cars", garage[1]) in deleted
+    # The car's children are reported along with it
+    assert ("todos", car_todo.record_id) in deleted
+    assert len([d for d in deletions if d["table"] == "service_history"]) == 2
+
+    # Older tombstones are not repeated
+    assert delta(client, auth_headers, delta(client, auth_headers)["watermark"])["deletions"] == []
+
+
+def test_late_commit_is_in_next_delta(client, auth_headers, garage, test_db, test_user):
+    # A slow transaction stamps its row before the delta reads...
+    stamped = datetime.now(UTC).replace(tzinfo=None)
+    time.sleep(0.01)
+    data = delta(client, auth_headers)
+    assert len(data["changes"]["cars"]) == 2
+
+    # ...and commits after it
+    car = models.Car(user_id=test_user.id, make="Mazda", model="MX-5", year=1995, updated_at=stamped)
+    test_db.add(car)
+    test_db.commit()
+
+    changes = delta(client, auth_headers, data["watermark"])["changes"]
+    assert car.id in [row["id"] for row in changes["cars"]]
+
+
+def test_clear_all_records_tombstones(client, auth_headers, garage, test_db):
+    watermark = delta(client, auth_headers)["watermark"]
+    assert client.delete("/data/clear-all", headers=auth_headers).status_code == 200
+
+    deletions = delta(client, auth_headers, watermark)["deletions"]
+    assert sorted(d["id"] for d in deletions if d["table"] == "cars") == sorted(garage)
+    assert len(deletions) == 6
+
+
+def test_timezone_aware_since(client, auth_headers, garage):
+    assert delta(client, auth_headers, "2000-01-01T00:00:00+02:00")["changes"]["cars"]
+    assert delta(client, auth_headers, datetime(2999, 1, 1).isoformat() + "Z")["changes"]["cars"] == []
+
+
+@pytest.fixture
+def server_behind_utc(monkeypatch):
+    """Run the test with the process clock five hours behind UTC"""
+    monkeypatch.setenv("TZ", "Etc/GMT+5")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_interval_edits_on_non_utc_server(client, auth_headers, garage, server_behind_utc):
+    response = client.post(f"/api/cars/{garage[0]}/service-intervals",
+                           json={"car_id": garage[0], "service_item": "Coolant", "interval_months": 24},
+                           headers=auth_headers)
+    interval_id = response.json()["id"]
+    watermark = delta(client, auth_headers)["watermark"]
+    time.sleep(0.01)
+
+    response = client.put(f"/api/service-intervals/{interval_id}", json={"interval_months": 36},
+                          headers=auth_headers)
+    assert response.status_code == 200
+    changes = delta(client, auth_headers, watermark)["changes"]
+    assert [interval["id"] for interval in changes["service_intervals"]] == [interval_id]
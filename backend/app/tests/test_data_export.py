@@ -0,0 +1,156 @@
+import re
+import xml.etree.ElementTree as ET
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+from app.data_export import stream_xml_export
+from app.data_management import import_xml_backup
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_data_export.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def test_user(test_db):
+    user = models.User(
+        username="exportuser",
+        email="export@example.com",
+        hashed_password=get_password_hash("testpass123")
+    )
+    test_db.add(user)
+    test_db.commit()
+
+    for n in range(3):
+        car = models.Car(user_id=user.id, make="Mazda", model=f"MX-5 <{n}> & co", year=1990 + n,
+                         mileage=10000 * n, group_name="Collector Cars")
+        test_db.add(car)
+        test_db.flush()
+        test_db.add(models.ServiceInterval(user_id=user.id, car_id=car.id, service_item="Oil Change",
+                                           interval_miles=5000, priority="high", cost_estimate_low=40))
+        for month in range(1, 5):
+            test_db.add(models.ServiceHistory(user_id=user.id, car_id=car.id, service_item="Oil Change",
+                                              performed_date=datetime(2023, month, 1), mileage=1000 * month,
+                                              cost=49.99, shop="Joe's \"Garage\""))
+        test_db.add(models.ToDo(user_id=user.id, car_id=car.id, title=f"Wax car {n}", priority="low",
+                                status="open"))
+    test_db.commit()
+    test_db.refresh(user)
+    return user
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_user):
+    response = client.post("/auth/login", json={"username": "exportuser", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_export_endpoint_streams_valid_backup(client, auth_headers):
+    response = client.post("/data/export", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/xml")
+    assert "attachment; filename=car_collection_cars_todos_intervals_history_" in \
+        response.headers["content-disposition"]
+
+    root = ET.fromstring(response.content)
+    counts = {child.tag: int(child.text) for child in root.find("Metadata/RecordCounts")}
+    assert counts == {"Cars": 3, "Todos": 3, "ServiceIntervals": 3, "ServiceHistory": 12}
+
+    cars = root.findall("Cars/Car")
+    assert [car.find("Model").text for car in cars] == ["MX-5 <0> & co", "MX-5 <1> & co", "MX-5 <2> & co"]
+    assert len(cars[0].findall("ServiceHistory/Service")) == 4
+    assert cars[0].find("ServiceHistory/Service/Shop").text == "Joe's \"Garage\""
+    assert len(root.findall("Todos/Todo")) == 3
+
+
+def test_export_respects_selection(client, auth_headers):
+    response = client.post(
+        "/data/export", params={"include_todos": False, "include_service_history": False},
+        headers=auth_headers
+    )
+    root = ET.fromstring(response.content)
+    assert root.find("Todos") is None
+    assert root.find("Cars/Car/ServiceHistory") is None
+    assert root.find("Cars/Car/ServiceIntervals") is not None
+    assert root.find("Metadata/RecordCounts/ServiceHistory").text == "0"
+
+
+def test_stream_is_chunked_and_round_trips(test_db, test_user):
+    chunks = list(stream_xml_export(test_db, test_user.id, test_user.username, chunk_size=256))
+    assert len(chunks) > 3
+    document = b"".join(chunks)
+    assert document.startswith(b'<?xml version="1.0" encoding="utf-8"?>\n<CarCollectionBackup version="1.0">')
+    # Export dates differ between the two runs
+    without_date = lambda xml: re.sub(r"<ExportDate>.*?</ExportDate>", "", xml)
+    unchunked = b"".join(stream_xml_export(test_db, test_user.id, test_user.username))
+    assert without_date(document.decode("utf-8")) == without_date(unchunked.decode("utf-8"))
+
+    other = models.User(username="importer", email="importer@example.com", hashed_password="x")
+    test_db.add(other)
+    test_db.commit()
+    result = import_xml_backup(document, other.id, test_db)
+    assert result["imported"] == {"cars": 3, "todos": 3}
+    assert test_db.query(models.ServiceHistory).filter_by(user_id=other.id).count() == 12
+
+
+def test_car_without_mileage_round_trips(test_db):
+    owner = models.User(username="nomileage", email="nomileage@example.com", hashed_password="x")
+    restorer = models.User(username="restorer", email="restorer@example.com", hashed_password="x")
+    test_db.add_all([owner, restorer])
+    test_db.commit()
+    test_db.add_all([
+        models.Car(user_id=owner.id, make="Citroen", model="2CV", year=1960),
+        models.Car(user_id=owner.id, make="Fiat", model="Panda", year=1985, mileage=0),
+    ])
+    test_db.commit()
+
+    document = b"".join(stream_xml_export(test_db, owner.id, owner.username))
+    assert [car.find("Mileage") is None for car in ET.fromstring(document).findall("Cars/Car")] == [True, False]
+
+    result = import_xml_backup(document, restorer.id, test_db)
+    assert result["imported"]["cars"] == 2
+    restored = test_db.query(models.Car).filter_by(user_id=restorer.id).order_by(models.Car.year).all()
+    assert [car.mileage for car in restored] == [None, 0]
+
+
+def test_export_query_count_does_not_grow_with_cars(test_db, test_user):
+    user_id, username = test_user.id, test_user.username
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        list(stream_xml_export(test_db, user_id, username))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # Four counts, then cars, intervals, history and todos: one query each
+    assert len(statements) == 8
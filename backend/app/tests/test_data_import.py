@@ -0,0 +1,178 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+import io
+from app.data_import import import_backup_stream
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_data_import.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="function")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="function")
+def test_user(test_db):
+    user = models.User(
+        username="importuser",
+        email="import@example.com",
+        hashed_password=get_password_hash("testpass123")
+    )
+    test_db.add(user)
+    test_db.commit()
+    test_db.refresh(user)
+    return user
+
+@pytest.fixture(scope="function")
+def auth_headers(client, test_user):
+    response = client.post("/auth/login", json={"username": "importuser", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def backup(cars=3, services_per_car=4, bad_service=None):
+    car_xml = []
+    for n in range(cars):
+        services = "".join(
+            f"<Service><ServiceItem>Oil Change</ServiceItem>"
+            f"<PerformedDate>{bad_service if bad_service and n == cars - 1 else f'2023-01-{m % 28 + 1:02d}T00:00:00'}"
+            f"</PerformedDate><Mileage>{1000 * m}</Mileage><Cost>49.99</Cost></Service>"
+            for m in range(services_per_car)
+        )
+        car_xml.append(
+            f'<Car id="{100 + n}"><Make>Mazda</Make><Model>MX-5</Model><Year>{1990 + n}</Year>'
+            f"<Mileage>{n * 1000}</Mileage><GroupName>Collector Cars</GroupName>"
+            f"<ServiceIntervals><Interval><ServiceItem>Oil Change</ServiceItem><IntervalMiles>5000</IntervalMiles>"
+            f"<Priority>high</Priority></Interval></ServiceIntervals>"
+            f"<ServiceHistory>{services}</ServiceHistory></Car>"
+        )
+    todos = "".join(
+        f"<Todo><Title>Wax {n}</Title><Priority>low</Priority><Status>open</Status><CarId>{100 + n}</CarId></Todo>"
+        for n in range(cars)
+    ) + "<Todo><Title>Orphan</Title><Priority>low</Priority><Status>open</Status><CarId>999</CarId></Todo>"
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><CarCollectionBackup version="1.0"><Metadata/>'
+        f"<Cars>{''.join(car_xml)}</Cars><Todos>{todos}</Todos></CarCollectionBackup>"
+    ).encode("utf-8")
+
+
+def test_import_endpoint_writes_all_records(client, auth_headers, test_db, test_user):
+    response = client.post(
+        "/data/import", files={"file": ("backup.xml", backup(), "application/xml")}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["imported"] == {"cars": 3, "todos": 3}
+
+    cars = test_db.query(models.Car).filter_by(user_id=test_user.id).order_by(models.Car.year).all()
+    assert [car.year for car in cars] == [1990, 1991, 1992]
+    for car in cars:
+        assert test_db.query(models.ServiceHistory).filter_by(car_id=car.id, user_id=test_user.id).count() == 4
+        assert test_db.query(models.ServiceInterval).filter_by(car_id=car.id).one().is_active
+        assert test_db.query(models.ToDo).filter_by(car_id=car.id).one().title == f"Wax {car.year - 1990}"
+
+
+def test_import_batches_inserts_in_one_transaction(test_db, test_user):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()[:3]))
+
+    commits = []
+    event.listen(engine, "before_cursor_execute", record)
+    event.listen(test_db, "after_commit", lambda session: commits.append(1))
+    try:
+        import_backup_stream(io.BytesIO(backup(cars=40, services_per_car=25)), test_user.id, test_db, batch_size=100)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert test_db.query(models.ServiceHistory).count() == 1000
+    assert len(commits) == 1
+    # Child rows go out as multi-row INSERTs (car ids need RETURNING in
+    # parameter order, which SQLite can only do one row at a time)
+    assert statements.count("INSERT INTO service_history") == 10
+    assert statements.count("INSERT INTO todos") == 1
+
+
+def test_legacy_none_mileage_is_imported_as_missing(client, auth_headers, test_db, test_user):
+    document = backup(cars=1).replace(b"<Mileage>0</Mileage><GroupName>", b"<Mileage>None</Mileage><GroupName>")
+    response = client.post(
+        "/data/import", files={"file": ("backup.xml", document, "application/xml")}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert test_db.query(models.Car).filter_by(user_id=test_user.id).one().mileage is None
+
+
+def test_invalid_record_rejects_whole_import(client, auth_headers, test_db):
+    response = client.post(
+        "/data/import",
+        files={"file": ("backup.xml", backup(bad_service="not-a-date"), "application/xml")},
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+    assert "PerformedDate" in response.json()["detail"]
+    assert test_db.query(models.Car).count() == 0
+
+
+def test_write_failure_rolls_back(test_db, test_user):
+    # Duplicate VINs violate the unique constraint after some rows were written
+    document = backup(cars=2).replace(b"<Make>Mazda</Make>", b"<Make>Mazda</Make><VIN>SAMEVIN</VIN>")
+    with pytest.raises(Exception):
+        import_backup_stream(io.BytesIO(document), test_user.id, test_db, batch_size=1)
+    assert test_db.query(models.Car).count() == 0
+    assert test_db.query(models.ServiceHistory).count() == 0
+
+
+def test_malformed_xml_midway_rolls_back(client, auth_headers, test_db):
+    document = backup(cars=40, services_per_car=25)
+    truncated = document[:len(document) * 3 // 4]
+    response = client.post(
+        "/data/import", files={"file": ("backup.xml", truncated, "application/xml")}, headers=auth_headers
+    )
+    assert response.status_code == 400
+    assert "Invalid XML format" in response.json()["detail"]
+    assert test_db.query(models.Car).count() == 0
+
+
+def test_streaming_parser_discards_consumed_records(test_db, test_user, monkeypatch):
+    """The live tree never holds more than the record being parsed."""
+    import app.data_import as data_import
+    largest = []
+    real_iterparse = data_import.ET.iterparse
+
+    def watching_iterparse(source, events):
+        root = None
+        for event, elem in real_iterparse(source, events):
+            root = elem if root is None else root
+            if event == "end" and elem.tag == "Service":
+                largest.append(sum(1 for _ in root.iter()))
+            yield event, elem
+
+    monkeypatch.setattr(data_import.ET, "iterparse", watching_iterparse)
+    import_backup_stream(io.BytesIO(backup(cars=20, services_per_car=50)), test_user.id, test_db)
+    assert test_db.query(models.ServiceHistory).count() == 1000
+    # iterparse builds a parser buffer's worth of elements ahead of the ones
+    # yielded, but the tree stays far below the document's ~8000 elements
+    assert max(largest) < 1000
@@ -0,0 +1,40 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.http_client import HTTPClientRegistry, http_client
+from app.service_research_real import DriverSideAPIScraper
+
+
+def test_lifespan_opens_and_closes_shared_session():
+    assert not http_client.is_open
+    with TestClient(app):
+        assert http_client.is_open
+        session = http_client._session
+        connector = session.connector
+        assert connector.limit == settings.http_pool_limit
+        assert connector.limit_per_host == settings.http_pool_limit_per_host
+    assert not http_client.is_open
+    assert session.closed
+
+
+def test_sources_borrow_one_session(monkeypatch):
+    registry = HTTPClientRegistry()
+    monkeypatch.setattr("app.service_research_real.http_client", registry)
+
+    async def research_twice():
+        first, second = DriverSideAPIScraper(), DriverSideAPIScraper()
+        await asyncio.gather(
+            first.search_vehicle("Toyota", "Camry", 2018),
+            second.search_vehicle("Honda", "Civic", 2018)
+        )
+        session = registry._session
+        # Sources don't own or close the session
+        assert not hasattr(first, "session")
+        assert registry.is_open and await registry.get_session() is session
+        await registry.close()
+        return session
+
+    session = asyncio.run(research_twice())
+    assert session.closed
+    assert not registry.is_open
@@ -0,0 +1,110 @@
+import logging
+import re
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+from app.config import settings
+from app.instrumentation import QueryInstrumentationMiddleware, install_query_hooks, track_queries
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_instrumentation.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_db):
+    user = models.User(username="sqluser", email="sql@example.com", hashed_password=get_password_hash("testpass123"))
+    test_db.add(user)
+    test_db.commit()
+    test_db.add_all([models.Car(user_id=user.id, make="Saab", model="900", year=1990 + n) for n in range(3)])
+    test_db.commit()
+    response = client.post("/auth/login", json={"username": "sqluser", "password": "testpass123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_track_queries_counts_statements(test_db):
+    install_query_hooks()
+    with track_queries() as stats:
+        test_db.execute(text("SELECT 1")).all()
+        test_db.execute(text("SELECT 2")).all()
+    assert stats.count == 2
+    assert stats.total_seconds >= stats.slowest_seconds > 0
+    assert stats.slowest_statement in ("SELECT 1", "SELECT 2")
+
+    # Nothing is recorded outside a tracked block
+    test_db.execute(text("SELECT 3")).all()
+    assert stats.count == 2
+
+
+def test_server_timing_is_off_by_default(client, auth_headers):
+    response = client.get("/cars/", headers=auth_headers)
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+
+
+def test_server_timing_header(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "server_timing", True)
+    response = client.get("/cars/", headers=auth_headers)
+    assert response.status_code == 200
+    match = re.match(r'db;dur=([\d.]+);desc="(\d+) queries", db-slowest;dur=([\d.]+)',
+                     response.headers["server-timing"])
+    assert match
+    assert int(match.group(2)) >= 2  # cars, then their todos
+
+
+def make_app(test_db, **options):
+    small_app = FastAPI()
+    small_app.add_middleware(QueryInstrumentationMiddleware, **options)
+
+    @small_app.get("/slow")
+    def slow():
+        test_db.execute(text("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 20000) "
+                             "SELECT count(*) FROM n")).all()
+        return {"ok": True}
+
+    return small_app
+
+
+def test_slow_requests_are_logged(test_db, caplog):
+    install_query_hooks()
+    client = TestClient(make_app(test_db, server_timing=False, slow_query_log_ms=0.001))
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        response = client.get("/slow")
+    assert "server-timing" not in response.headers
+    assert "Slow database time for GET /slow: 1 queries" in caplog.text
+    assert "WITH RECURSIVE n(x)" in caplog.text
+
+
+def test_fast_requests_are_not_logged(test_db, caplog):
+    install_query_hooks()
+    client = TestClient(make_app(test_db, server_timing=True, slow_query_log_ms=60000))
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        response = client.get("/slow")
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert "Slow database time" not in caplog.text
@@ -0,0 +1,160 @@
+import json
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base, DB_POOL_WAIT, create_db_engine
+from app import metrics, models
+from app.auth import get_password_hash
+from app.config import settings
+from app.instrumentation import HTTP_IN_FLIGHT, HTTP_REQUEST_LATENCY
+from app.metrics import MetricsRegistry, MultiprocessMetrics, merge_snapshots
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_metrics.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_db):
+    user = models.User(username="metricsuser", email="metrics@example.com",
+                       hashed_password=get_password_hash("testpass123"))
+    test_db.add(user)
+    test_db.commit()
+    response = client.post("/auth/login", json={"username": "metricsuser", "password": "testpass123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="module")
+def admin_headers(client, test_db):
+    admin = models.User(username="metricsadmin", email="metricsadmin@example.com",
+                        hashed_password=get_password_hash("testpass123"), is_admin=True)
+    test_db.add(admin)
+    test_db.commit()
+    response = client.post("/auth/login", json={"username": "metricsadmin", "password": "testpass123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_requests_are_timed_by_route_template(client, auth_headers, admin_headers):
+    before = HTTP_REQUEST_LATENCY.count(method="GET", route="/cars/{car_id}", status="404")
+    client.get("/cars/12345", headers=auth_headers)
+    client.get("/cars/67890", headers=auth_headers)
+    assert HTTP_REQUEST_LATENCY.count(method="GET", route="/cars/{car_id}", status="404") == before + 2
+    assert HTTP_IN_FLIGHT.value() == 0
+
+    body = client.get("/metrics", headers=admin_headers).text
+    assert 'http_request_duration_seconds_count{method="GET",route="/cars/{car_id}",status="404"}' in body
+    assert "http_requests_in_flight" in body
+
+
+def test_metrics_require_admin_or_token(client, auth_headers, admin_headers, monkeypatch):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=auth_headers).status_code == 403
+    assert client.get("/metrics", headers=admin_headers).status_code == 200
+
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_unmatched_paths_share_one_series(client):
+    client.get("/no/such/path")
+    assert HTTP_REQUEST_LATENCY.count(method="GET", route="unmatched", status="404") >= 1
+
+
+def test_pool_checkout_is_timed():
+    before = DB_POOL_WAIT.count()
+    pooled = create_db_engine("sqlite:///./test_metrics_pool.db")
+    with pooled.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+    pooled.dispose()
+    os.remove("test_metrics_pool.db")
+    assert DB_POOL_WAIT.count() == before + 1
+
+
+def test_export_bytes_are_counted(client, auth_headers):
+    counter = metrics.REGISTRY.counter("data_export_bytes_total", "", ["format"])
+    before = counter.value(format="xml")
+    response = client.post("/data/export", headers=auth_headers)
+    assert counter.value(format="xml") == before + len(response.content)
+
+
+def make_registry(requests: int, in_flight: int) -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests", ["route"]).inc(requests, route="/cars/")
+    registry.gauge("in_flight", "In flight").set(in_flight)
+    registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5)
+    return registry
+
+
+def test_merge_snapshots_sums_every_metric_type():
+    merged = merge_snapshots([make_registry(3, 1).snapshot(), make_registry(4, 2).snapshot()])
+    body = merged.render()
+    assert 'requests_total{route="/cars/"} 7' in body
+    assert "in_flight 3" in body
+    assert 'latency_seconds_bucket{le="1"} 2' in body
+    assert "latency_seconds_count 2" in body
+
+
+def test_multiprocess_snapshots_are_aggregated(tmp_path):
+    # A live sibling worker (this test's parent process) and one that has exited
+    (tmp_path / f"metrics_{os.getppid()}_1.json").write_text(json.dumps(make_registry(10, 5).snapshot()))
+    (tmp_path / "metrics_999999999_1.json").write_text(json.dumps(make_registry(100, 50).snapshot()))
+
+    store = MultiprocessMetrics(make_registry(1, 1), str(tmp_path))
+    body = store.render()
+
+    assert len(list(tmp_path.glob(f"metrics_{os.getpid()}_*.json"))) == 1
+    assert 'requests_total{route="/cars/"} 111' in body
+    # Gauges of exited workers are dropped
+    assert "in_flight 6" in body
+
+
+def test_reused_pid_keeps_exited_worker_totals(tmp_path):
+    # An earlier worker that had this pid, last written long ago
+    earlier = tmp_path / f"metrics_{os.getpid()}_1.json"
+    earlier.write_text(json.dumps(make_registry(10, 5).snapshot()))
+    os.utime(earlier, (time.time() - 3600, time.time() - 3600))
+
+    body = MultiprocessMetrics(make_registry(1, 1), str(tmp_path)).render()
+    assert earlier.exists()
+    assert 'requests_total{route="/cars/"} 11' in body
+    # The pid is alive again, but the old snapshot is stale
+    assert "in_flight 1" in body
+
+
+def test_snapshots_are_written_while_idle(tmp_path):
+    registry = make_registry(1, 0)
+    store = MultiprocessMetrics(registry, str(tmp_path), interval=0.05)
+    store.start()
+    try:
+        registry.counter("requests_total", "Requests", ["route"]).inc(route="/cars/")
+        time.sleep(0.3)
+        assert 'requests_total{route="/cars/"} 2' in merge_snapshots(store.read_snapshots()).render()
+        registry.counter("requests_total", "Requests", ["route"]).inc(route="/cars/")
+    finally:
+        store.stop()
+    # Stopping writes a final snapshot
+    assert 'requests_total{route="/cars/"} 3' in merge_snapshots(store.read_snapshots()).render()
@@ -0,0 +1,147 @@
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+from app.pagination import decode_cursor, encode_cursor
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_pagination.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def test_user(test_db):
+    user = models.User(
+        username="pageuser",
+        email="page@example.com",
+        hashed_password=get_password_hash("testpass123")
+    )
+    test_db.add(user)
+    test_db.commit()
+
+    test_db.add_all([models.Car(user_id=user.id, make="Ford", model="F-150", year=2000 + n % 20)
+                     for n in range(250)])
+    test_db.commit()
+    car = test_db.query(models.Car).filter_by(user_id=user.id).first()
+    # Several services share a date, so the id tie-breaker matters
+    test_db.add_all([models.ServiceHistory(user_id=user.id, car_id=car.id, service_item=f"Service {n}",
+                                           performed_date=datetime(2020, 1 + n % 3, 1))
+                     for n in range(10)])
+    test_db.add_all([models.ToDo(user_id=user.id, car_id=car.id, title=f"Todo {n}") for n in range(5)])
+    test_db.commit()
+    test_db.refresh(user)
+    return user
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_user):
+    response = client.post("/auth/login", json={"username": "pageuser", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="module")
+def car_id(test_db, test_user):
+    return test_db.query(models.ServiceHistory).filter_by(user_id=test_user.id).first().car_id
+
+
+def fetch_all(client, url, headers, **params):
+    pages = []
+    while True:
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+        params["cursor"] = cursor
+
+
+def test_cars_default_page_size(client, auth_headers):
+    response = client.get("/cars/", headers=auth_headers)
+    assert len(response.json()) == 100
+    assert "X-Next-Cursor" in response.headers
+
+
+def test_cars_pages_cover_every_car_once(client, auth_headers):
+    pages = fetch_all(client, "/cars/", auth_headers, limit=100)
+    assert [len(page) for page in pages] == [100, 100, 50]
+    ids = [car["id"] for page in pages for car in page]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 250
+
+
+def test_delete_between_pages_does_not_shift_them(client, auth_headers, test_db, test_user):
+    first = client.get("/cars/", params={"limit": 10}, headers=auth_headers)
+    test_db.query(models.Car).filter(models.Car.id == first.json()[1]["id"]).delete()
+    test_db.commit()
+    second = client.get("/cars/", params={"limit": 10, "cursor": first.headers["X-Next-Cursor"]},
+                        headers=auth_headers)
+    assert second.json()[0]["id"] == first.json()[-1]["id"] + 1
+
+
+def test_service_history_pages_newest_first(client, auth_headers, car_id):
+    pages = fetch_all(client, f"/api/cars/{car_id}/service-history", auth_headers, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    rows = [(row["performed_date"], row["id"]) for page in pages for row in page]
+    assert rows == sorted(rows, reverse=True)
+    assert len(set(rows)) == 10
+
+
+def test_todos_paginated(client, auth_headers, car_id):
+    pages = fetch_all(client, f"/cars/{car_id}/todos/", auth_headers, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+
+def test_history_and_todos_unbounded_without_limit(client, auth_headers, car_id):
+    for url, count in ((f"/api/cars/{car_id}/service-history", 10), (f"/cars/{car_id}/todos/", 5)):
+        response = client.get(url, headers=auth_headers)
+        assert len(response.json()) == count
+        assert "X-Next-Cursor" not in response.headers
+
+
+def test_skip_still_offsets_cars(client, auth_headers):
+    everything = [car["id"] for page in fetch_all(client, "/cars/", auth_headers, limit=500) for car in page]
+    response = client.get("/cars/", params={"skip": 20, "limit": 5}, headers=auth_headers)
+    assert [car["id"] for car in response.json()] == everything[20:25]
+    assert client.get("/cars/", params={"skip": -1}, headers=auth_headers).status_code == 422
+
+
+def test_invalid_cursor_rejected(client, auth_headers):
+    response = client.get("/cars/", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_limit_is_bounded(client, auth_headers):
+    assert client.get("/cars/", params={"limit": 0}, headers=auth_headers).status_code == 422
+    assert client.get("/cars/", params={"limit": 10000}, headers=auth_headers).status_code == 422
+
+
+def test_cursor_round_trip():
+    performed = datetime(2021, 5, 4, 3, 2, 1)
+    assert decode_cursor(encode_cursor("ServiceHistory.performed_date desc", performed, 42),
+                         "ServiceHistory.performed_date desc") == (performed, 42)
+    assert decode_cursor(encode_cursor("Car.make asc", "Daily Drivers", 7), "Car.make asc") == ("Daily Drivers", 7)
@@ -0,0 +1,140 @@
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app import auth
+from app.auth import PasswordHasher, PasswordHashingBusy, create_access_token, pwd_context
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_password_hashing.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="function")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+def test_hasher_round_trip():
+    hasher = PasswordHasher(pwd_context, max_workers=1, max_pending=1)
+    hashed = hasher.hash("secret123")
+    assert hasher.verify("secret123", hashed)
+    assert not hasher.verify("wrong", hashed)
+
+
+def test_hasher_rejects_when_saturated():
+    release = threading.Event()
+    started = threading.Event()
+
+    class SlowContext:
+        def hash(self, password):
+            started.set()
+            release.wait(5)
+            return password
+
+    hasher = PasswordHasher(SlowContext(), max_workers=1, max_pending=0)
+    worker = threading.Thread(target=hasher.hash, args=("first",))
+    worker.start()
+    assert started.wait(5)
+    try:
+        with pytest.raises(PasswordHashingBusy):
+            hasher.hash("second")
+    finally:
+        release.set()
+        worker.join()
+    # The slot is released once the first call finishes
+    assert hasher.hash("third") == "third"
+
+
+def test_login_returns_503_when_hashing_busy(client, test_db, monkeypatch):
+    test_db.add(models.User(
+        username="busyuser",
+        email="busy@example.com",
+        hashed_password=pwd_context.hash("testpass123")
+    ))
+    test_db.commit()
+
+    def busy(*args):
+        raise PasswordHashingBusy("Password hashing is busy, please retry")
+    monkeypatch.setattr(auth.password_hasher, "verify_and_update", busy)
+
+    response = client.post("/auth/login", json={"username": "busyuser", "password": "testpass123"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_rehashes_outdated_cost_factor(client, test_db):
+    weak_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpass123")
+    user = models.User(username="rehashuser", email="rehash@example.com", hashed_password=weak_hash)
+    test_db.add(user)
+    test_db.commit()
+
+    response = client.post("/auth/login", json={"username": "rehashuser", "password": "testpass123"})
+    assert response.status_code == 200
+
+    test_db.refresh(user)
+    assert user.hashed_password != weak_hash
+    assert not pwd_context.needs_update(user.hashed_password)
+    assert pwd_context.verify("testpass123", user.hashed_password)
+
+
+def test_saturated_hasher_does_not_starve_other_endpoints(client, test_db, monkeypatch):
+    test_db.add(models.User(username="stormuser", email="storm@example.com", hashed_password="unused"))
+    test_db.commit()
+    release = threading.Event()
+    running = threading.Semaphore(0)
+
+    class SlowContext:
+        def verify_and_update(self, password, hashed):
+            running.release()
+            release.wait(10)
+            return False, None
+
+    monkeypatch.setattr(auth, "password_hasher", PasswordHasher(SlowContext(), max_workers=1, max_pending=1))
+
+    # More logins than the 40 request threads; all but the two slots are turned away at once
+    statuses = []
+    def login():
+        response = client.post("/auth/login", json={"username": "stormuser", "password": "x"})
+        statuses.append(response.status_code)
+
+    storm = [threading.Thread(target=login) for _ in range(45)]
+    for thread in storm:
+        thread.start()
+    try:
+        assert running.acquire(timeout=5)
+        deadline = time.monotonic() + 5
+        while len(statuses) < 43 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert statuses == [503] * 43
+
+        # One login is hashing and one queued, and other requests are served meanwhile
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'stormuser'})}"}
+        assert client.get("/cars/", headers=headers).status_code == 200
+    finally:
+        release.set()
+        for thread in storm:
+            thread.join(10)
+    assert statuses.count(401) == 2
@@ -0,0 +1,133 @@
+"""
+Upper bounds on the SQL statements each hot read endpoint issues.
+
+The bounds do not depend on how many rows are listed, so a lazy load
+creeping back into one of these paths fails here rather than showing up as
+production latency.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_query_counts.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+CARS = 30
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def admin_user(test_db):
+    admin = models.User(
+        username="countadmin",
+        email="countadmin@example.com",
+        hashed_password=get_password_hash("testpass123"),
+        is_admin=True
+    )
+    test_db.add(admin)
+    test_db.commit()
+
+    cars = [models.Car(user_id=admin.id, make="Porsche", model="911", year=1970 + n, mileage=1000 * n)
+            for n in range(CARS)]
+    test_db.add_all(cars)
+    test_db.flush()
+    for car in cars:
+        test_db.add_all([models.ToDo(user_id=admin.id, car_id=car.id, title=f"Todo {n}") for n in range(3)])
+        test_db.add_all([models.ServiceHistory(user_id=admin.id, car_id=car.id, service_item="Oil Change",
+                                               performed_date=datetime(2024, 1, 1) - timedelta(days=90 * n))
+                         for n in range(3)])
+        test_db.add(models.ServiceInterval(user_id=admin.id, car_id=car.id, service_item="Oil Change",
+                                           interval_miles=5000))
+
+    # Invitations from, and accepted by, many different users
+    for n in range(10):
+        inviter = models.User(username=f"inviter{n}", email=f"inviter{n}@example.com", hashed_password="x",
+                              is_admin=True)
+        invitee = models.User(username=f"invitee{n}", email=f"invitee{n}@example.com", hashed_password="x")
+        test_db.add_all([inviter, invitee])
+        test_db.flush()
+        test_db.add(models.UserInvitation(email=f"new{n}@example.com", token=f"token{n}",
+                                          invited_by_id=inviter.id, used=n % 2 == 0,
+                                          used_by_id=invitee.id if n % 2 == 0 else None,
+                                          expires_at=datetime(2099, 1, 1)))
+    test_db.commit()
+    test_db.refresh(admin)
+    return admin
+
+@pytest.fixture(scope="module")
+def auth_headers(client, admin_user):
+    response = client.post("/auth/login", json={"username": "countadmin", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="module")
+def car_id(test_db, admin_user):
+    return test_db.query(models.Car).filter_by(user_id=admin_user.id).first().id
+
+
+def get(client, url, headers, count_queries, test_db):
+    # Start from an empty identity map so nothing is served from the session
+    test_db.expire_all()
+    with count_queries(engine) as queries:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response, queries
+
+
+def test_list_cars_loads_todos_in_one_query(client, auth_headers, count_queries, test_db):
+    response, queries = get(client, "/cars/", auth_headers, count_queries, test_db)
+    assert len(response.json()) == CARS
+    assert all(len(car["todos"]) == 3 for car in response.json())
+    # User, cars, todos for every car
+    assert queries.count <= 3
+
+
+def test_list_invitations_joins_usernames(client, auth_headers, count_queries, test_db):
+    response, queries = get(client, "/api/invitations?include_used=true", auth_headers, count_queries, test_db)
+    assert len(response.json()) == 10
+    assert {inv["used_by"] for inv in response.json()} >= {"invitee0", "invitee8"}
+    # User, invitations with both usernames
+    assert queries.count <= 2
+
+
+def test_car_todos_bounded(client, auth_headers, car_id, count_queries, test_db):
+    _, queries = get(client, f"/cars/{car_id}/todos/", auth_headers, count_queries, test_db)
+    assert queries.count <= 3
+
+
+def test_service_history_bounded(client, auth_headers, car_id, count_queries, test_db):
+    _, queries = get(client, f"/api/cars/{car_id}/service-history", auth_headers, count_queries, test_db)
+    assert queries.count <= 3
+
+
+def test_dashboard_bounded(client, auth_headers, count_queries, test_db):
+    response, queries = get(client, "/dashboard", auth_headers, count_queries, test_db)
+    assert len(response.json()["cars"]) == CARS
+    assert queries.count <= 3
@@ -0,0 +1,96 @@
+"""
+Query plan checks for the hot per-tenant queries.
+
+Every query here runs on nearly every request; if one of them stops using an
+index and falls back to a full table scan, this test fails.
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models
+from app.service_schedule import build_interval_schedule_query
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_query_plans.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+TENANT_TABLES = ("cars", "todos", "service_intervals", "service_history")
+
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def hot_queries(db):
+    """The query shapes used by the per-car and per-user endpoints."""
+    return {
+        "cars for user": db.query(models.Car).filter(models.Car.user_id == 1),
+        "car groups": db.query(models.Car.group_name).filter(
+            models.Car.user_id == 1, models.Car.group_name.isnot(None)
+        ).distinct(),
+        "todos for car": db.query(models.ToDo).filter(
+            models.ToDo.car_id == 1, models.ToDo.user_id == 1
+        ),
+        "intervals for car": db.query(models.ServiceInterval).filter(
+            models.ServiceInterval.car_id == 1,
+            models.ServiceInterval.user_id == 1,
+            models.ServiceInterval.is_active == True
+        ),
+        "history for car": db.query(models.ServiceHistory).filter(
+            models.ServiceHistory.car_id == 1,
+            models.ServiceHistory.user_id == 1
+        ).order_by(models.ServiceHistory.performed_date.desc()),
+        "history for user": db.query(models.ServiceHistory).filter(
+            models.ServiceHistory.user_id == 1
+        ),
+        "cars by make": db.query(models.Car).filter(
+            models.Car.user_id == 1, models.Car.make == "Porsche", models.Car.model == "911"
+        ),
+    }
+
+
+def full_scans(db, query):
+    """Return the plan lines that scan a tenant table without an index."""
+    sql = str(query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    details = [row[-1] for row in plan]
+    return [
+        detail for detail in details
+        if any(detail.startswith(f"SCAN {table}") for table in TENANT_TABLES)
+        and "INDEX" not in detail
+    ]
+
+
+def test_hot_queries_use_indexes(test_db):
+    for name, query in hot_queries(test_db).items():
+        assert full_scans(test_db, query) == [], f"{name} falls back to a full table scan"
+
+
+def test_history_page_avoids_sort(test_db):
+    query = hot_queries(test_db)["history for car"]
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    plan = " | ".join(row[-1] for row in test_db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert "ix_service_history_car_user_date" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_car_sorts_avoid_sort(test_db):
+    for column, index in ((models.Car.make, "ix_cars_user_make"), (models.Car.year, "ix_cars_user_year")):
+        query = test_db.query(models.Car).filter(models.Car.user_id == 1).order_by(column, models.Car.id)
+        sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+        plan = " | ".join(row[-1] for row in test_db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert index in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_schedule_query_uses_indexes(test_db):
+    query = build_interval_schedule_query(test_db, user_id=1)
+    assert full_scans(test_db, query) == []
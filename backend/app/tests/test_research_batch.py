@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models, service_api
+from app.auth import get_password_hash
+from app.service_research import research_service_intervals
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_research_batch.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_db):
+    test_db.add(models.User(
+        username="batchresearcher",
+        email="batchresearcher@example.com",
+        hashed_password=get_password_hash("testpass123")
+    ))
+    test_db.commit()
+    response = client.post("/auth/login", json={"username": "batchresearcher", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="module")
+def fleet(client, auth_headers):
+    """Six cars, but only three distinct vehicles"""
+    cars = [
+        ("Toyota", "Camry", 2018, "Daily Drivers"),
+        ("toyota", "camry", 2018, "Daily Drivers"),
+        ("Toyota", "Camry", 2019, "Daily Drivers"),
+        ("Porsche", "911", 1989, "Collector Cars"),
+        ("Porsche", "911", 1989, "Collector Cars"),
+        ("Porsche", "911 ", 1989, "Collector Cars"),
+    ]
+    ids = []
+    for make, model, year, group in cars:
+        response = client.post(
+            "/cars/",
+            json={"make": make, "model": model, "year": year, "group_name": group},
+            headers=auth_headers
+        )
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
+
+@pytest.fixture
+def research_calls(monkeypatch):
+    calls = []
+
+    async def counting_research(make, model, year, engine_type=None):
+        calls.append((make, model, year))
+        await asyncio.sleep(0)
+        if make == "Broken":
+            raise RuntimeError("source exploded")
+        return await research_service_intervals(make, model, year, engine_type)
+
+    monkeypatch.setattr(service_api, "research_service_intervals", counting_research)
+    return calls
+
+
+def test_batch_researches_each_unique_vehicle_once(client, auth_headers, fleet, research_calls, test_db):
+    response = client.post("/api/research-intervals/batch", json={"car_ids": fleet}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+
+    assert body["unique_vehicles"] == 3
+    assert body["researched"] == 3
+    assert len(research_calls) == 3
+    assert [r["car_id"] for r in body["results"]] == fleet
+    assert body["results"][0]["suggested_intervals"] == body["results"][1]["suggested_intervals"]
+    assert test_db.query(models.ServiceResearchLog).count() == 3
+
+
+def test_batch_by_group_uses_template_cache(client, auth_headers, fleet, research_calls):
+    response = client.post(
+        "/api/research-intervals/batch", json={"group_name": "Collector Cars"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["car_id"] for r in body["results"]] == fleet[3:]
+    assert body["unique_vehicles"] == 1
+    assert body["researched"] == 0
+    assert research_calls == []
+
+
+def test_batch_reports_failed_vehicles(client, auth_headers, research_calls):
+    response = client.post(
+        "/cars/", json={"make": "Broken", "model": "Thing", "year": 2001, "group_name": "Projects"},
+        headers=auth_headers
+    )
+    broken_id = response.json()["id"]
+
+    response = client.post("/api/research-intervals/batch", json={"group_name": "Projects"}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["results"] == []
+    assert body["failed"] == {str(broken_id): "Research failed: source exploded"}
+
+
+def test_batch_validates_selection(client, auth_headers, fleet):
+    response = client.post("/api/research-intervals/batch", json={}, headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.post(
+        "/api/research-intervals/batch", json={"car_ids": [fleet[0], 999999]}, headers=auth_headers
+    )
+    assert response.status_code == 404
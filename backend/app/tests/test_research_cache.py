@@ -0,0 +1,177 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models, research_cache, service_api
+from app.auth import get_password_hash
+from app.service_research import research_service_intervals
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_research_cache.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_db):
+    test_db.add(models.User(
+        username="cacheresearcher",
+        email="cacheresearcher@example.com",
+        hashed_password=get_password_hash("testpass123")
+    ))
+    test_db.commit()
+    response = client.post("/auth/login", json={"username": "cacheresearcher", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def research_calls(monkeypatch):
+    """Count how often the research pipeline actually runs"""
+    calls = []
+
+    async def counting_research(make, model, year, engine_type=None):
+        calls.append((make, model, year, engine_type))
+        return await research_service_intervals(make, model, year, engine_type)
+
+    monkeypatch.setattr(service_api, "research_service_intervals", counting_research)
+    monkeypatch.setattr(research_cache, "research_service_intervals", counting_research)
+    return calls
+
+
+def add_car(client, headers, **fields):
+    car = {"year": 2018, "make": "Honda", "model": "Civic", "mileage": 40000, **fields}
+    response = client.post("/cars/", json=car, headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_identical_cars_share_one_research(client, auth_headers, test_db, research_calls):
+    first = add_car(client, auth_headers)
+    second = add_car(client, auth_headers, make="honda", model="civic ")
+
+    response = client.post(f"/api/cars/{first}/research-intervals", headers=auth_headers)
+    assert response.status_code == 200
+    fresh = response.json()
+
+    response = client.post(f"/api/cars/{second}/research-intervals", headers=auth_headers)
+    assert response.status_code == 200
+    cached = response.json()
+
+    assert len(research_calls) == 1
+    assert [i["service_item"] for i in cached["suggested_intervals"]] == \
+        [i["service_item"] for i in fresh["suggested_intervals"]]
+    assert cached["total_intervals_found"] == fresh["total_intervals_found"]
+    # Only the real research is logged
+    assert test_db.query(models.ServiceResearchLog).count() == 1
+
+
+def test_engine_type_is_part_of_the_key(client, auth_headers, research_calls):
+    car_id = add_car(client, auth_headers, make="Ford", model="F-250", year=2020)
+
+    diesel = client.post(f"/api/cars/{car_id}/research-intervals?engine_type=diesel", headers=auth_headers)
+    gas = client.post(f"/api/cars/{car_id}/research-intervals", headers=auth_headers)
+    assert diesel.status_code == gas.status_code == 200
+    assert len(research_calls) == 2
+
+    diesel_items = {i["service_item"] for i in diesel.json()["suggested_intervals"]}
+    gas_items = {i["service_item"] for i in gas.json()["suggested_intervals"]}
+    assert "DEF (Diesel Exhaust Fluid)" in diesel_items
+    assert "DEF (Diesel Exhaust Fluid)" not in gas_items
+
+
+def test_stale_template_is_served_and_refreshed(client, auth_headers, test_db, research_calls):
+    car_id = add_car(client, auth_headers, make="Mazda", model="CX-5", year=2019)
+    assert client.post(f"/api/cars/{car_id}/research-intervals", headers=auth_headers).status_code == 200
+    assert len(research_calls) == 1
+
+    stale_date = datetime.now() - timedelta(days=365)
+    templates = test_db.query(models.ServiceIntervalTemplate).filter_by(make="mazda", model="cx-5")
+    for template in templates:
+        template.updated_at = stale_date
+    test_db.commit()
+
+    response = client.post(f"/api/cars/{car_id}/research-intervals", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["research_date"].startswith(stale_date.date().isoformat())
+
+    # The background task re-ran the research and replaced the template
+    assert len(research_calls) == 2
+    test_db.expire_all()
+    cached = research_cache.get_cached_research(test_db, "Mazda", "CX-5", 2019)
+    assert cached is not None and not cached.is_stale
+    assert len(cached.intervals) == response.json()["total_intervals_found"]
+
+
+def test_templates_match_year_ranges(test_db):
+    test_db.add(models.ServiceIntervalTemplate(
+        make="lotus", model="elise", year_start=2000, year_end=2011,
+        service_item="Clutch Inspection", interval_miles=15000, source="Owner Club"
+    ))
+    test_db.commit()
+
+    assert research_cache.get_cached_research(test_db, "Lotus", "Elise", 2005).intervals[0].service_item == \
+        "Clutch Inspection"
+    assert research_cache.get_cached_research(test_db, "Lotus", "Elise", 2012) is None
+    assert research_cache.get_cached_research(test_db, "Lotus", "Elise", 2005, "diesel") is None
+
+
+def test_exact_year_research_replaces_range_templates(test_db):
+    old = datetime.now() - timedelta(days=365)
+    test_db.add_all([
+        models.ServiceIntervalTemplate(make="saab", model="900", year_start=None, year_end=None,
+                                       service_item="Generic Check", source="Manual", updated_at=old),
+        models.ServiceIntervalTemplate(make="saab", model="900", year_start=1985, year_end=1993,
+                                       service_item="Turbo Inspection", source="Owner Club", updated_at=old),
+    ])
+    test_db.commit()
+
+    # The narrowest matching range is used on its own
+    cached = research_cache.get_cached_research(test_db, "Saab", "900", 1990)
+    assert [i.service_item for i in cached.intervals] == ["Turbo Inspection"]
+    assert cached.is_stale
+
+    research_cache.store_research(test_db, "Saab", "900", 1990, None, cached.intervals[:1])
+    cached = research_cache.get_cached_research(test_db, "Saab", "900", 1990)
+    assert [i.service_item for i in cached.intervals] == ["Turbo Inspection"]
+    assert not cached.is_stale
+
+    # Other years still get the hand-entered range
+    assert research_cache.get_cached_research(test_db, "Saab", "900", 1987).is_stale
+    assert [i.service_item for i in research_cache.get_cached_research(test_db, "Saab", "900", 2001).intervals] == \
+        ["Generic Check"]
+
+
+def test_hand_entered_templates_match_after_normalizing(test_db):
+    test_db.add(models.ServiceIntervalTemplate(
+        make="Toyota ", model="Camry", year_start=2012, year_end=2017, engine_type="",
+        service_item="Timing Belt", interval_miles=90000, source="Dealer"
+    ))
+    test_db.commit()
+    assert research_cache.get_cached_research(test_db, "Toyota", "Camry", 2014) is None
+
+    test_db.execute(text(research_cache.NORMALIZE_TEMPLATE_KEYS_SQL))
+    test_db.commit()
+    cached = research_cache.get_cached_research(test_db, "TOYOTA", "camry", 2014)
+    assert [i.service_item for i in cached.intervals] == ["Timing Belt"]
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import pytest
+from app import research_sources
+from app.research_sources import CircuitBreaker, query_sources, reset_breakers, source_errors
+from app.service_research import ServiceInterval, ServiceIntervalResearcher
+
+
+class FakeSource:
+    def __init__(self, name, delay=0.0, intervals=None, error=None, timeout=None):
+        self.name = name
+        self.delay = delay
+        self.intervals = intervals if intervals is not None else [ServiceInterval(service_item=f"{name} item")]
+        self.error = error
+        self.timeout = timeout
+        self.calls = 0
+
+    async def search_vehicle(self, make, model, year, engine_type=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.intervals
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    reset_breakers()
+    yield
+    reset_breakers()
+
+
+def search(source):
+    return source.search_vehicle("Honda", "Civic", 2018)
+
+
+def test_sources_are_queried_concurrently():
+    sources = [FakeSource(f"source {i}", delay=0.2) for i in range(4)]
+    started = time.perf_counter()
+    results = asyncio.run(query_sources(sources, search))
+    assert time.perf_counter() - started < 0.5
+    assert [r.status for r in results] == ["ok"] * 4
+
+
+def test_slow_and_failing_sources_return_partial_results():
+    sources = [
+        FakeSource("fast"),
+        FakeSource("slow", delay=5, timeout=0.1),
+        FakeSource("broken", error=RuntimeError("HTTP 500")),
+        FakeSource("nothing", intervals=[]),
+    ]
+    started = time.perf_counter()
+    results = asyncio.run(query_sources(sources, search))
+    # Bounded by the slow source's own budget, not its full latency
+    assert time.perf_counter() - started < 1
+    assert [r.status for r in results] == ["ok", "timeout", "error", "empty"]
+    assert results[0].intervals[0].service_item == "fast item"
+    assert source_errors(results) == {"slow": "timeout: timed out after 0.1s", "broken": "error: HTTP 500"}
+
+
+def test_circuit_breaker_skips_failing_source_until_reset(monkeypatch):
+    monkeypatch.setattr(research_sources.settings, "research_breaker_failure_threshold", 2)
+    monkeypatch.setattr(research_sources.settings, "research_breaker_reset_seconds", 60)
+    broken = FakeSource("broken", error=RuntimeError("down"))
+
+    for _ in range(2):
+        assert asyncio.run(query_sources([broken], search))[0].status == "error"
+    result = asyncio.run(query_sources([broken], search))[0]
+    assert result.status == "skipped"
+    assert broken.calls == 2
+
+    # Once the reset timeout passes, one trial call goes through and success closes it
+    breaker = research_sources.get_breaker("broken")
+    breaker.opened_at -= 61
+    broken.error = None
+    assert asyncio.run(query_sources([broken], search))[0].status == "ok"
+    assert not breaker.is_open and breaker.failures == 0
+
+
+def test_breaker_reopens_after_failed_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert not breaker.allow()
+    breaker.opened_at -= 61
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_researcher_reports_source_errors():
+    researcher = ServiceIntervalResearcher()
+    researcher.sources = [FakeSource("good"), FakeSource("bad", error=ValueError("parse failed"))]
+    intervals = asyncio.run(researcher.research_vehicle("Honda", "Civic", 2018))
+    assert [i.service_item for i in intervals] == ["good item"]
+    assert researcher.sources_used == ["good"]
+    assert researcher.source_errors == {"bad": "error: parse failed"}
+
+
+def test_source_outcomes_and_latency_are_recorded():
+    requests = research_sources.RESEARCH_SOURCE_REQUESTS
+    latency = research_sources.RESEARCH_SOURCE_LATENCY
+    ok_before = requests.value(source="metered", status="ok")
+    error_before = requests.value(source="metered broken", status="error")
+    timed_before = latency.count(source="metered")
+
+    asyncio.run(query_sources([FakeSource("metered"), FakeSource("metered broken", error=RuntimeError("boom"))],
+                              search))
+
+    assert requests.value(source="metered", status="ok") == ok_before + 1
+    assert requests.value(source="metered broken", status="error") == error_before + 1
+    assert latency.count(source="metered") == timed_before + 1
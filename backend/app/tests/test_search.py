@@ -0,0 +1,205 @@
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+from app.search import SEARCH_TABLE, create_sqlite_search_index, search, search_terms
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_search.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def test_user(test_db):
+    user = models.User(username="searchuser", email="search@example.com",
+                       hashed_password=get_password_hash("testpass123"))
+    other = models.User(username="otheruser", email="other@example.com",
+                        hashed_password=get_password_hash("testpass123"))
+    test_db.add_all([user, other])
+    test_db.commit()
+
+    porsche = models.Car(user_id=user.id, make="Porsche", model="911", year=1989, vin="WP0AB0911KS120001",
+                         group_name="Classics", notes="Rebuilt brake calipers in 2012")
+    bmw = models.Car(user_id=user.id, make="BMW", model="M3", year=2015, group_name="Daily Drivers")
+    bmw_e30 = models.Car(user_id=user.id, make="BMW", model="M3", year=1988, group_name="Classics")
+    mazda = models.Car(user_id=user.id, make="Mazda", model="MX-5", year=1995, group_name="Daily Drivers")
+    others = models.Car(user_id=other.id, make="Ford", model="Mustang", year=1967, notes="Front brake pads")
+    test_db.add_all([porsche, bmw, bmw_e30, mazda, others])
+    test_db.flush()
+
+    test_db.add_all([
+        models.ServiceHistory(user_id=user.id, car_id=bmw.id, service_item="Oil Change",
+                              performed_date=datetime(2010, 3, 1), shop="Autohaus", notes="Castrol 5W-30"),
+        models.ServiceHistory(user_id=user.id, car_id=bmw.id, service_item="Brake Pads",
+                              performed_date=datetime(2016, 7, 9), shop="Autohaus", invoice_number="INV-4471"),
+        models.ServiceHistory(user_id=user.id, car_id=bmw.id, service_item="Oil Change",
+                              performed_date=datetime(2023, 1, 15), shop="Quick Lube"),
+        models.ServiceHistory(user_id=other.id, car_id=others.id, service_item="Brake Fluid",
+                              performed_date=datetime(2020, 1, 1)),
+        models.ToDo(user_id=user.id, car_id=mazda.id, title="Soft top", description="Replace the rear window"),
+    ])
+    test_db.commit()
+    return user
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_user):
+    response = client.post("/auth/login", json={"username": "searchuser", "password": "testpass123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def cars(client, headers, **params):
+    response = client.get("/cars/", params=params, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_filter_cars_by_exact_fields(client, auth_headers):
+    assert [car["model"] for car in cars(client, auth_headers, make="BMW")] == ["M3", "M3"]
+    assert [car["year"] for car in cars(client, auth_headers, group_name="Classics", make="BMW")] == [1988]
+    assert [car["make"] for car in cars(client, auth_headers, vin="WP0AB0911KS120001")] == ["Porsche"]
+    assert [car["make"] for car in cars(client, auth_headers, year=1995)] == ["Mazda"]
+    assert cars(client, auth_headers, make="Ford") == []
+
+
+def test_sort_cars_across_pages(client, auth_headers):
+    years = []
+    params = {"sort": "year", "order": "desc", "limit": 3}
+    while True:
+        response = client.get("/cars/", params=params, headers=auth_headers)
+        years += [car["year"] for car in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert years == [2015, 1995, 1989, 1988]
+
+    assert [car["make"] for car in cars(client, auth_headers, sort="make")] == ["BMW", "BMW", "Mazda", "Porsche"]
+
+
+def test_cursor_only_continues_its_own_sort(client, auth_headers):
+    response = client.get("/cars/", params={"sort": "make", "limit": 1}, headers=auth_headers)
+    cursor = response.headers["X-Next-Cursor"]
+    for params in ({"sort": "year"}, {"sort": "make", "order": "desc"}, {}):
+        response = client.get("/cars/", params={**params, "cursor": cursor}, headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+    assert client.get("/cars/", params={"sort": "make", "cursor": cursor}, headers=auth_headers).status_code == 200
+
+
+def test_unknown_sort_rejected(client, auth_headers):
+    assert client.get("/cars/", params={"sort": "vin"}, headers=auth_headers).status_code == 422
+    assert client.get("/cars/", params={"order": "sideways"}, headers=auth_headers).status_code == 422
+
+
+def test_filter_service_history(client, auth_headers, test_db, test_user):
+    car_id = test_db.query(models.Car).filter_by(user_id=test_user.id, year=2015).one().id
+    url = f"/api/cars/{car_id}/service-history"
+
+    response = client.get(url, params={"service_item": "Oil Change"}, headers=auth_headers)
+    assert [row["performed_date"][:4] for row in response.json()] == ["2023", "2010"]
+    response = client.get(url, params={"shop": "Autohaus"}, headers=auth_headers)
+    assert [row["service_item"] for row in response.json()] == ["Brake Pads", "Oil Change"]
+    response = client.get(url, params={"performed_after": "2011-01-01T00:00:00", "performed_before": "2020-01-01T00:00:00"},
+                          headers=auth_headers)
+    assert [row["service_item"] for row in response.json()] == ["Brake Pads"]
+
+
+def test_search_across_tables(client, auth_headers):
+    response = client.get("/search", params={"q": "brake"}, headers=auth_headers)
+    assert response.status_code == 200
+    results = response.json()
+    assert {(result["type"], result["title"]) for result in results} == {
+        ("car", "1989 Porsche 911"), ("service_history", "Brake Pads")
+    }
+    service = next(result for result in results if result["type"] == "service_history")
+    assert service["date"].startswith("2016-07-09")
+    assert "[Brake]" in service["snippet"]
+
+
+def test_search_matches_prefixes_stems_and_all_terms(client, auth_headers):
+    def titles(q):
+        return [result["title"] for result in client.get("/search", params={"q": q}, headers=auth_headers).json()]
+
+    assert titles("inv-44") == ["Brake Pads"]
+    assert titles("castrol") == ["Oil Change"]
+    assert titles("windows") == ["Soft top"]
+    assert titles("brake autohaus") == ["Brake Pads"]
+    assert titles("brake quick") == []
+
+
+def test_search_ignores_query_syntax(client, auth_headers):
+    for q in ['"brake', "brake OR -NEAR(", "*", "notes:brake"]:
+        assert client.get("/search", params={"q": q}, headers=auth_headers).status_code == 200
+    assert client.get("/search", params={"q": ""}, headers=auth_headers).status_code == 422
+    assert search_terms("  ---  ") == []
+
+
+def test_search_is_scoped_to_user(client, auth_headers):
+    results = client.get("/search", params={"q": "brake"}, headers=auth_headers).json()
+    assert not any(result["title"] in ("Brake Fluid", "1967 Ford Mustang") for result in results)
+    assert client.get("/search", params={"q": "mustang"}, headers=auth_headers).json() == []
+
+
+def test_index_follows_updates_and_deletes(client, auth_headers, test_db, test_user):
+    response = client.post("/cars/", json={"make": "Lancia", "model": "Delta", "year": 1992,
+                                           "notes": "Turbo hose cracked"}, headers=auth_headers)
+    car_id = response.json()["id"]
+    client.post(f"/api/cars/{car_id}/service-history", json={
+        "car_id": car_id, "service_item": "Turbo Rebuild", "performed_date": "2021-04-01T00:00:00"
+    }, headers=auth_headers)
+    assert len(search(test_db, test_user.id, "turbo")) == 2
+
+    client.put(f"/cars/{car_id}", json={"notes": "Intercooler replaced"}, headers=auth_headers)
+    assert [result["type"] for result in search(test_db, test_user.id, "turbo")] == ["service_history"]
+    assert [result["id"] for result in search(test_db, test_user.id, "intercooler")] == [car_id]
+
+    assert client.delete(f"/cars/{car_id}", headers=auth_headers).status_code == 204
+    assert search(test_db, test_user.id, "turbo") == []
+    assert search(test_db, test_user.id, "intercooler") == []
+
+
+def test_search_uses_fts_index(test_db):
+    plan = " | ".join(row[-1] for row in test_db.execute(text(
+        f"EXPLAIN QUERY PLAN SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH 'brake'"
+    )))
+    assert "VIRTUAL TABLE INDEX" in plan
+
+
+def test_scan_fallback_and_backfill(test_db, test_user):
+    # Without the FTS table (SQLite built without FTS5) searches scan instead
+    test_db.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+    results = search(test_db, test_user.id, "brake")
+    assert {result["title"] for result in results} == {"1989 Porsche 911", "Brake Pads"}
+    assert all(result["snippet"] is None for result in results)
+
+    # Recreating the table indexes the records that are already there
+    assert create_sqlite_search_index(test_db.connection())
+    test_db.commit()
+    results = search(test_db, test_user.id, "brake")
+    assert {result["title"] for result in results} == {"1989 Porsche 911", "Brake Pads"}
+    assert all(result["snippet"] for result in results)
@@ -0,0 +1,117 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app, get_db
+from app.database import Base
+from app import models
+from app.auth import get_password_hash
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_service_intervals.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def client(test_db):
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def test_user(test_db):
+    """Create a test user"""
+    user = models.User(
+        username="intervaluser",
+        email="intervals@example.com",
+        hashed_password=get_password_hash("testpass123"),
+        is_active=True,
+        is_admin=False
+    )
+    test_db.add(user)
+    test_db.commit()
+    test_db.refresh(user)
+    return user
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_user):
+    """Get authentication headers"""
+    response = client.post(
+        "/auth/login",
+        json={"username": "intervaluser", "password": "testpass123"}
+    )
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_due_intervals_only_returns_due_and_overdue(client, auth_headers):
+    car_data = {"year": 2015, "make": "Toyota", "model": "Camry", "mileage": 60000}
+    car_id = client.post("/cars/", json=car_data, headers=auth_headers).json()["id"]
+
+    intervals = [
+        {"car_id": car_id, "service_item": "Oil Change", "interval_miles": 5000, "interval_months": 6, "priority": "high"},
+        {"car_id": car_id, "service_item": "Tire Rotation", "interval_miles": 5000, "interval_months": 6},
+        {"car_id": car_id, "service_item": "Coolant", "interval_miles": 100000, "interval_months": 120},
+    ]
+    response = client.post(f"/api/cars/{car_id}/service-intervals/bulk", json=intervals, headers=auth_headers)
+    assert response.status_code == 200
+
+    recent = (datetime.now() - timedelta(days=30)).isoformat()
+    services = [
+        # Oil was changed 4,800 miles ago: due soon by mileage
+        {"car_id": car_id, "service_item": "oil change", "performed_date": recent, "mileage": 55200},
+        # Tires were rotated recently and at the current mileage: not due
+        {"car_id": car_id, "service_item": "Tire Rotation", "performed_date": recent, "mileage": 60000},
+        {"car_id": car_id, "service_item": "Tire Rotation", "performed_date": "2015-01-01T00:00:00", "mileage": 100},
+    ]
+    for service in services:
+        response = client.post(f"/api/cars/{car_id}/service-history", json=service, headers=auth_headers)
+        assert response.status_code == 201
+
+    response = client.get("/api/service-intervals/due", headers=auth_headers)
+    assert response.status_code == 200
+    due = response.json()
+
+    # Coolant has never been done and the car is past its 10 year interval
+    assert [d["service_item"] for d in due] == ["Coolant", "Oil Change"]
+    assert due[0]["status"] == "overdue"
+    assert due[0]["last_performed_date"] is None
+
+    oil = due[1]
+    assert oil["status"] == "due_soon"
+    assert oil["last_performed_mileage"] == 55200
+    assert oil["next_due_mileage"] == 60200
+    assert oil["miles_remaining"] == 200
+
+
+def test_due_intervals_respects_threshold_and_car_filter(client, auth_headers):
+    cars = client.get("/cars/", headers=auth_headers).json()
+    car_id = cars[0]["id"]
+
+    response = client.get(
+        "/api/service-intervals/due",
+        params={"car_id": car_id, "due_soon_percent": 100},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert [d["service_item"] for d in response.json()] == ["Coolant"]
+
+    response = client.get("/api/service-intervals/due", params={"car_id": car_id + 1000}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == []
@@ -0,0 +1,44 @@
+"""
+Checks that the compiled maintenance catalog returns exactly what the
+manufacturer rules produce for the original vehicle description.
+"""
+
+import asyncio
+import dataclasses
+import itertools
+import pytest
+from app.service_research import (
+    CarMaintenanceDatabase, MAKE_GROUPS, GENERIC_MAKE_GROUP, catalog_key
+)
+
+MAKES = ["Toyota", "lexus", "Honda", "Ford", "Chevrolet", "BMW", "Mercedes-Benz",
+         "Audi", "Nissan", "Mazda", "Subaru", "Tesla"]
+MODELS = ["Camry", "Prius", "RAV4 Hybrid", "F-150", "F-250 Super Duty", "F350",
+          "Super Duty", "Mustang", "Civic", "3 Series"]
+YEARS = [1995, 2007, 2008, 2009, 2010, 2017, 2018, 2024]
+ENGINES = [None, "gas", "diesel", "hybrid"]
+
+
+def test_catalog_matches_manufacturer_rules():
+    database = CarMaintenanceDatabase()
+    for make, model, year, engine in itertools.product(MAKES, MODELS, YEARS, ENGINES):
+        make_group = MAKE_GROUPS.get(make.lower(), GENERIC_MAKE_GROUP)
+        expected = database.build_intervals(make_group, model, year, engine)
+        assert list(database.lookup(make, model, year, engine)) == expected, (make, model, year, engine)
+
+
+def test_search_vehicle_returns_fresh_list_of_shared_intervals():
+    database = CarMaintenanceDatabase()
+    first = asyncio.run(database.search_vehicle("Toyota", "Camry", 2015))
+    second = asyncio.run(database.search_vehicle("toyota ", "Corolla", 2016))
+    assert first == second
+    assert first is not second
+    assert first[0] is second[0]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first[0].interval_miles = 1
+
+
+def test_catalog_key_normalizes_irrelevant_details():
+    assert catalog_key("Ford", "F-250", 2020, "Diesel") == catalog_key("ford", "f350 lariat", 2024, "diesel")
+    assert catalog_key("Honda", "Civic", 2015) == catalog_key("Acura", "TLX", 2012, "hybrid")
+    assert catalog_key("Tesla", "Model 3", 2020)[0] == GENERIC_MAKE_GROUP
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Measure how much a slow export stalls unrelated requests on the same worker.
+
+Seeds a temporary SQLite database with one large collection, then drives the
+real ASGI app in-process (one event loop, like a single uvicorn worker). It
+times /api/cars/{id}/service-intervals while idle and while a full XML export
+is running, and records how long the event loop was blocked. Run from the backend directory:
+
+    python benchmarks/event_loop_latency.py --history 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "requests": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+    }
+
+
+def seed(cars: int, history: int):
+    from sqlalchemy import insert
+    from app import models
+    from app.auth import create_access_token, get_password_hash
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = models.User(username="bench", email="bench@example.com",
+                       hashed_password=get_password_hash("benchpass"))
+    db.add(user)
+    db.commit()
+
+    car_rows = [
+        {"user_id": user.id, "year": 2000 + i % 25, "make": "Porsche", "model": "911", "mileage": 50000}
+        for i in range(cars)
+    ]
+    db.execute(insert(models.Car), car_rows)
+    car_ids = [car_id for (car_id,) in db.query(models.Car.id).all()]
+
+    db.execute(insert(models.ServiceInterval), [
+        {"user_id": user.id, "car_id": car_id, "service_item": f"Item {n}", "interval_miles": 5000}
+        for car_id in car_ids for n in range(10)
+    ])
+    start = datetime(2005, 1, 1)
+    db.execute(insert(models.ServiceHistory), [
+        {"user_id": user.id, "car_id": car_ids[i % len(car_ids)], "service_item": "Oil Change",
+         "performed_date": start + timedelta(days=i % 7000), "mileage": i, "cost": 89.5,
+         "shop": "Benchmark Motors", "notes": "Synthetic 0W-40"}
+        for i in range(history)
+    ])
+    db.commit()
+    token = create_access_token({"sub": user.username})
+    db.close()
+    return car_ids[0], {"Authorization": f"Bearer {token}"}
+
+
+async def measure(app, car_id, headers, requests):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def probe(samples, stop=None):
+            # Keep issuing requests until told to stop (or the quota is reached)
+            while (stop is None and len(samples) < requests) or (stop is not None and not stop.is_set()):
+                started = time.perf_counter()
+                response = await client.get(f"/api/cars/{car_id}/service-intervals", headers=headers)
+                response.raise_for_status()
+                samples.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+
+        idle = []
+        await probe(idle)
+
+        async def export():
+            started = time.perf_counter()
+            response = await client.post("/data/export", headers=headers)
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        async def heartbeat(lags, stop):
+            # How late the loop wakes us up is how long it was blocked
+            while not stop.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started - 0.01)
+
+        during_export = []
+        loop_lags = []
+        export_done = asyncio.Event()
+        probe_task = asyncio.create_task(probe(during_export, export_done))
+        heartbeat_task = asyncio.create_task(heartbeat(loop_lags, export_done))
+        await asyncio.sleep(0.05)
+        export_seconds = await export()
+        export_done.set()
+        await probe_task
+        await heartbeat_task
+
+    return {
+        "idle": summarize(idle),
+        "during_export": summarize(during_export),
+        "export_seconds": round(export_seconds, 3),
+        "max_event_loop_lag_ms": round(max(loop_lags) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cars", type=int, default=50)
+    parser.add_argument("--history", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before the app (and its engine) is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        car_id, headers = seed(args.cars, args.history)
+
+        from app.main import app
+        report = asyncio.run(measure(app, car_id, headers, args.requests))
+
+        from app.database import engine
+        engine.dispose()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Load-test the API end to end and report latency percentiles and throughput.
+
+Seeds a temporary SQLite database with synthetic tenants (users x cars, each
+car with intervals, service history and todos) from a fixed random seed, then
+drives the real ASGI app in-process - no server, no network - through login,
+car list, service history, due intervals, research, export and import. Every
+scenario issues its requests from a fixed number of concurrent clients
+spread over the tenants and reports p50/p95/p99 latency and requests per
+second as JSON, so a change can be compared against a baseline run with the
+same arguments. Run from the backend directory:
+
+    python benchmarks/load_test.py --users 20 --cars 10 --history 200 > baseline.json
+
+Research is served by the built-in maintenance catalog and template cache;
+imports go to a separate account so they don't grow the tenants being read.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SCENARIOS = ("login", "car_list", "service_history", "due_intervals", "research", "export", "import")
+# Scenarios that move whole collections get their own, smaller request count
+HEAVY_SCENARIOS = ("export", "import")
+
+VEHICLES = (
+    ("Toyota", "Camry"), ("Honda", "Civic"), ("Ford", "F-150"), ("Chevrolet", "Corvette"),
+    ("BMW", "M3"), ("Mercedes-Benz", "E-Class"), ("Porsche", "911"), ("Subaru", "Outback"),
+)
+SERVICE_ITEMS = ("Oil Change", "Brake Fluid", "Coolant", "Spark Plugs", "Air Filter", "Tire Rotation")
+PASSWORD = "benchpass"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples, errors, elapsed):
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+    }
+
+
+def seed(users: int, cars: int, intervals: int, history: int, todos: int, rng: random.Random):
+    """Create the tenants and return ``(username, auth headers, car ids)`` for each, plus the import account."""
+    from sqlalchemy import insert
+    from app import models
+    from app.auth import create_access_token, get_password_hash
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    # One bcrypt hash shared by every account keeps seeding fast
+    hashed_password = get_password_hash(PASSWORD)
+    usernames = [f"bench{n}" for n in range(users)] + ["bench-import"]
+    db.execute(insert(models.User), [
+        {"username": username, "email": f"{username}@example.com", "hashed_password": hashed_password}
+        for username in usernames
+    ])
+    user_ids = dict(db.query(models.User.username, models.User.id).all())
+
+    start = datetime(2010, 1, 1)
+    tenants = []
+    for username in usernames[:-1]:
+        user_id = user_ids[username]
+        car_ids = db.scalars(insert(models.Car).returning(models.Car.id, sort_by_parameter_order=True), [
+            {"user_id": user_id, "make": make, "model": model, "year": rng.randint(1995, 2024),
+             "mileage": rng.randint(1000, 200000), "notes": "Synthetic benchmark car"}
+            for make, model in (rng.choice(VEHICLES) for _ in range(cars))
+        ]).all()
+        if intervals:
+            db.execute(insert(models.ServiceInterval), [
+                {"user_id": user_id, "car_id": car_id, "service_item": f"{SERVICE_ITEMS[n % len(SERVICE_ITEMS)]} {n}",
+                 "interval_miles": rng.choice((3000, 5000, 7500, 15000, 30000)),
+                 "interval_months": rng.choice((6, 12, 24, 48)), "priority": "medium"}
+                for car_id in car_ids for n in range(intervals)
+            ])
+        if history:
+            db.execute(insert(models.ServiceHistory), [
+                {"user_id": user_id, "car_id": car_id, "service_item": rng.choice(SERVICE_ITEMS),
+                 "performed_date": start + timedelta(days=rng.randint(0, 5400)),
+                 "mileage": rng.randint(1000, 200000), "cost": round(rng.uniform(20, 900), 2),
+                 "shop": "Benchmark Motors", "notes": "Synthetic service record"}
+                for car_id in car_ids for _ in range(history)
+            ])
+        if todos:
+            db.execute(insert(models.ToDo), [
+                {"user_id": user_id, "car_id": car_id, "title": f"Task {n}",
+                 "priority": rng.choice(("low", "medium", "high")), "status": "open"}
+                for car_id in car_ids for n in range(todos)
+            ])
+        token = create_access_token({"sub": username})
+        tenants.append((username, {"Authorization": f"Bearer {token}"}, car_ids))
+    db.commit()
+    db.close()
+
+    import_headers = {"Authorization": f"Bearer {create_access_token({'sub': usernames[-1]})}"}
+    return tenants, import_headers
+
+
+async def run_scenario(call, tenants, requests, concurrency):
+    """Issue ``requests`` calls from ``concurrency`` clients; return latencies, errors and wall time."""
+    samples = []
+    errors = 0
+    issued = 0
+
+    async def worker():
+        nonlocal errors, issued
+        while issued < requests:
+            tenant = tenants[issued % len(tenants)]
+            issued += 1
+            started = time.perf_counter()
+            response = await call(tenant)
+            samples.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, errors, time.perf_counter() - started
+
+
+async def measure(app, tenants, import_headers, args, rng):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Imports replay one tenant's export
+        response = await client.post("/data/export", headers=tenants[0][1])
+        response.raise_for_status()
+        backup = response.content
+
+        def car(tenant):
+            return rng.choice(tenant[2])
+
+        calls = {
+            "login": lambda tenant: client.post(
+                "/auth/login", json={"username": tenant[0], "password": PASSWORD}),
+            "car_list": lambda tenant: client.get("/cars/", headers=tenant[1]),
+            "service_history": lambda tenant: client.get(
+                f"/api/cars/{car(tenant)}/service-history", headers=tenant[1]),
+            "due_intervals": lambda tenant: client.get("/api/service-intervals/due", headers=tenant[1]),
+            "research": lambda tenant: client.post(
+                f"/api/cars/{car(tenant)}/research-intervals", headers=tenant[1]),
+            "export": lambda tenant: client.post("/data/export", headers=tenant[1]),
+            "import": lambda tenant: client.post(
+                "/data/import", headers=import_headers,
+                files={"file": ("backup.xml", backup, "application/xml")}),
+        }
+
+        report = {}
+        for name in args.scenarios:
+            requests = args.heavy_requests if name in HEAVY_SCENARIOS else args.requests
+            # A few untimed calls first so one-off setup doesn't land in the percentiles
+            for tenant in tenants[:args.warmup]:
+                await calls[name](tenant)
+            report[name] = summarize(*await run_scenario(calls[name], tenants, requests, args.concurrency))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--cars", type=int, default=10, help="cars per user")
+    parser.add_argument("--intervals", type=int, default=10, help="service intervals per car")
+    parser.add_argument("--history", type=int, default=100, help="service history entries per car")
+    parser.add_argument("--todos", type=int, default=5, help="todos per car")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--heavy-requests", type=int, default=20, help="requests per export/import scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests before each scenario")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="match production to measure login")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before the app (and its engine) is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+        os.environ.setdefault("SLOW_QUERY_LOG_MS", "0")
+        tenants, import_headers = seed(args.users, args.cars, args.intervals, args.history, args.todos, rng)
+
+        from app.main import app
+        report = asyncio.run(measure(app, tenants, import_headers, args, rng))
+
+        from app.database import engine
+        engine.dispose()
+
+    config = {key: value for key, value in vars(args).items() if key != "scenarios"}
+    print(json.dumps({"config": config, "scenarios": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark manufacturer catalog lookups against building the schedule from the
+rules on every call (the previous search_vehicle behaviour).
+
+Run from the backend directory:
+
+    python benchmarks/research_catalog.py --iterations 20000
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.service_research import (  # noqa: E402
+    CarMaintenanceDatabase, MAKE_GROUPS, GENERIC_MAKE_GROUP
+)
+
+VEHICLES = list(itertools.product(
+    ["Toyota", "Honda", "Ford", "Chevrolet", "BMW", "Subaru", "Tesla"],
+    ["Camry", "Prius", "F-150", "F-250", "Civic"],
+    [2005, 2012, 2020],
+    [None, "diesel"],
+))
+
+
+def per_call_microseconds(fn, iterations: int) -> float:
+    vehicles = itertools.islice(itertools.cycle(VEHICLES), iterations)
+    started = time.perf_counter()
+    for make, model, year, engine in vehicles:
+        fn(make, model, year, engine)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    database = CarMaintenanceDatabase()
+
+    def rebuild(make, model, year, engine):
+        make_group = MAKE_GROUPS.get(make.lower(), GENERIC_MAKE_GROUP)
+        return database.build_intervals(make_group, model, year, engine)
+
+    started = time.perf_counter()
+    CarMaintenanceDatabase.compile_catalog()
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    results = {
+        "iterations": args.iterations,
+        "catalog_entries": len(CarMaintenanceDatabase.catalog),
+        "compile_ms": round(compile_ms, 2),
+        "rebuild_us_per_lookup": round(per_call_microseconds(rebuild, args.iterations), 2),
+        "catalog_us_per_lookup": round(per_call_microseconds(database.lookup, args.iterations), 2),
+    }
+    results["speedup"] = round(results["rebuild_us_per_lookup"] / results["catalog_us_per_lookup"], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent SQLite reads and writes with default and tuned pragmas.
+
+Simulates several gunicorn workers sharing one database file: writer
+processes insert service history rows while reader processes run the
+per-car history query. Run from the backend directory:
+
+    python benchmarks/sqlite_concurrency.py --writers 4 --readers 4 --seconds 5
+"""
+
+import argparse
+import json
+import multiprocessing
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import apply_sqlite_pragmas  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE service_history (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    car_id INTEGER NOT NULL,
+    service_item VARCHAR NOT NULL,
+    performed_date DATETIME NOT NULL,
+    mileage INTEGER,
+    notes TEXT
+);
+CREATE INDEX ix_service_history_car_user_date
+    ON service_history (car_id, user_id, performed_date DESC);
+"""
+
+
+def connect(db_path: str, tuned: bool) -> sqlite3.Connection:
+    # Matches the default pysqlite timeout used by SQLAlchemy without pragmas
+    conn = sqlite3.connect(db_path, timeout=5.0)
+    if tuned:
+        apply_sqlite_pragmas(conn)
+    return conn
+
+
+def writer(db_path: str, tuned: bool, seconds: float, worker_id: int, results):
+    conn = connect(db_path, tuned)
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            conn.execute(
+                "INSERT INTO service_history (user_id, car_id, service_item, performed_date, mileage, notes) "
+                "VALUES (?, ?, 'Oil Change', datetime('now'), ?, 'benchmark')",
+                (1, worker_id % 10, done)
+            )
+            conn.commit()
+            done += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            errors += 1
+    conn.close()
+    results.put(("write", done, errors))
+
+
+def reader(db_path: str, tuned: bool, seconds: float, worker_id: int, results):
+    conn = connect(db_path, tuned)
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            conn.execute(
+                "SELECT * FROM service_history WHERE car_id = ? AND user_id = 1 "
+                "ORDER BY performed_date DESC LIMIT 50",
+                (worker_id % 10,)
+            ).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    conn.close()
+    results.put(("read", done, errors))
+
+
+def run(tuned: bool, writers: int, readers: int, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        setup = connect(db_path, tuned)
+        setup.executescript(SCHEMA)
+        setup.commit()
+        setup.close()
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=writer, args=(db_path, tuned, seconds, i, results))
+            for i in range(writers)
+        ] + [
+            multiprocessing.Process(target=reader, args=(db_path, tuned, seconds, i, results))
+            for i in range(readers)
+        ]
+        for process in processes:
+            process.start()
+        totals = {"write": [0, 0], "read": [0, 0]}
+        for _ in processes:
+            kind, done, errors = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+        for process in processes:
+            process.join()
+
+    return {
+        "pragmas": "tuned" if tuned else "default",
+        "writes_per_second": round(totals["write"][0] / seconds, 1),
+        "reads_per_second": round(totals["read"][0] / seconds, 1),
+        "write_errors": totals["write"][1],
+        "read_errors": totals["read"][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    report = [
+        run(tuned, args.writers, args.readers, args.seconds)
+        for tuned in (False, True)
+    ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
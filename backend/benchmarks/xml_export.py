@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming XML export as the collection grows.
+
+Seeds a temporary SQLite database with one user's cars, service intervals and
+service history, then times a full export at a quarter, half and all of the
+requested size. A linear export roughly doubles in time from each size to the
+next. For comparison it also times the old per-car regrouping
+(``[row for row in rows if row.car_id == car.id]`` for every car) on the
+same rows. Run from the backend directory:
+
+    python benchmarks/xml_export.py --cars 500 --history 50000
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import models  # noqa: E402
+from app.data_export import stream_xml_export  # noqa: E402
+from app.database import Base  # noqa: E402
+
+
+def seed(session_factory, cars: int, history: int, intervals_per_car: int) -> int:
+    db = session_factory()
+    user = models.User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.execute(insert(models.Car), [
+        {"user_id": user.id, "year": 1960 + n % 60, "make": "Porsche", "model": f"911 #{n}",
+         "mileage": n * 100, "group_name": "Collector Cars"}
+        for n in range(cars)
+    ])
+    car_ids = [row[0] for row in db.query(models.Car.id).order_by(models.Car.id)]
+    db.execute(insert(models.ServiceInterval), [
+        {"user_id": user.id, "car_id": car_id, "service_item": f"Item {n}", "interval_miles": 5000,
+         "priority": "medium", "is_active": True}
+        for car_id in car_ids for n in range(intervals_per_car)
+    ])
+    start = datetime(2000, 1, 1)
+    db.execute(insert(models.ServiceHistory), [
+        # Interleave cars so each car's rows are spread across the table
+        {"user_id": user.id, "car_id": car_ids[n % len(car_ids)], "service_item": "Oil Change",
+         "performed_date": start + timedelta(days=n % 9000), "mileage": n, "cost": 59.99,
+         "shop": "Benchmark Garage"}
+        for n in range(history)
+    ])
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def time_export(session_factory, user_id: int):
+    db = session_factory()
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in stream_xml_export(db, user_id, "bench"))
+    elapsed = time.perf_counter() - started
+    db.close()
+
+    # Separate pass: tracemalloc slows everything down too much to time with it on
+    db = session_factory()
+    tracemalloc.start()
+    for _ in stream_xml_export(db, user_id, "bench"):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.close()
+    return elapsed, size, peak
+
+
+def time_nested_regrouping(session_factory, user_id: int) -> float:
+    """The grouping step the export used to do before writing any XML"""
+    db = session_factory()
+    cars = db.query(models.Car).filter(models.Car.user_id == user_id).all()
+    intervals = db.query(models.ServiceInterval).filter(models.ServiceInterval.user_id == user_id).all()
+    history = db.query(models.ServiceHistory).filter(models.ServiceHistory.user_id == user_id).all()
+    started = time.perf_counter()
+    for car in cars:
+        [si for si in intervals if si.car_id == car.id]
+        [sh for sh in history if sh.car_id == car.id]
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def run(cars: int, history: int, intervals_per_car: int, compare: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/export.db")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        user_id = seed(session_factory, cars, history, intervals_per_car)
+        elapsed, size, peak = time_export(session_factory, user_id)
+        result = {
+            "cars": cars,
+            "history_rows": history,
+            "interval_rows": cars * intervals_per_car,
+            "export_seconds": round(elapsed, 3),
+            "export_mb": round(size / 1e6, 2),
+            "peak_traced_mb": round(peak / 1e6, 2),
+        }
+        if compare:
+            result["old_regrouping_seconds"] = round(time_nested_regrouping(session_factory, user_id), 3)
+        engine.dispose()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cars", type=int, default=500)
+    parser.add_argument("--history", type=int, default=50000)
+    parser.add_argument("--intervals-per-car", type=int, default=10)
+    parser.add_argument("--skip-old", action="store_true", help="don't time the old per-car regrouping")
+    args = parser.parse_args()
+
+    results = [
+        run(max(1, args.cars * factor // 4), args.history * factor // 4, args.intervals_per_car, not args.skip_old)
+        for factor in (1, 2, 4)
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark importing an XML backup with batched inserts in one transaction
+against writing each record through the crud helpers (commit and refresh per
+row, as the importer used to).
+
+Builds a backup with the export code, then imports it into fresh temporary
+SQLite databases (with the production pragmas). Run from the backend directory:
+
+    python benchmarks/xml_import.py --cars 200 --history 10000
+"""
+
+import argparse
+import io
+import json
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud, models, schemas  # noqa: E402
+from app.data_export import stream_xml_export  # noqa: E402
+from app.data_import import import_backup_stream, parse_car, parse_interval, parse_service, parse_todo  # noqa: E402
+from app.database import Base, create_db_engine  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from xml_export import seed  # noqa: E402
+
+
+def fresh_database(tmp: str, name: str):
+    engine = create_db_engine(f"sqlite:///{tmp}/{name}.db")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    user = models.User(username="importer", email="importer@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return engine, db, user.id
+
+
+def import_per_row(root: ET.Element, user_id: int, db) -> None:
+    car_ids = {}
+    for car_elem in root.findall("Cars/Car"):
+        old_id, car = parse_car(car_elem)
+        new_car = crud.create_car(db, schemas.CarCreate(**car), user_id)
+        car_ids[old_id] = new_car.id
+        for elem in car_elem.findall("ServiceIntervals/Interval"):
+            crud.create_service_interval(
+                db, schemas.ServiceIntervalCreate(**parse_interval(elem), car_id=new_car.id), user_id)
+        for elem in car_elem.findall("ServiceHistory/Service"):
+            crud.create_service_history(
+                db, schemas.ServiceHistoryCreate(**parse_service(elem), car_id=new_car.id), user_id)
+    for elem in root.findall("Todos/Todo"):
+        old_id, todo = parse_todo(elem)
+        if old_id in car_ids:
+            crud.create_todo(db, schemas.ToDoCreate(**todo, car_id=car_ids[old_id]), user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cars", type=int, default=200)
+    parser.add_argument("--history", type=int, default=10000)
+    parser.add_argument("--intervals-per-car", type=int, default=10)
+    parser.add_argument("--skip-per-row", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db, user_id = fresh_database(tmp, "source")
+        db.close()
+        source_user = seed(sessionmaker(bind=engine), args.cars, args.history, args.intervals_per_car)
+        db = sessionmaker(bind=engine)()
+        document = b"".join(stream_xml_export(db, source_user, "bench"))
+        db.close()
+        engine.dispose()
+
+        results = {"cars": args.cars, "history_rows": args.history,
+                   "interval_rows": args.cars * args.intervals_per_car,
+                   "backup_mb": round(len(document) / 1e6, 2)}
+
+        runs = [("batched", lambda document, uid, db: import_backup_stream(io.BytesIO(document), uid, db))]
+        if not args.skip_per_row:
+            runs.append(("per_row", lambda document, uid, db: import_per_row(ET.fromstring(document), uid, db)))
+        for name, run in runs:
+            engine, db, user_id = fresh_database(tmp, name)
+            started = time.perf_counter()
+            run(document, user_id, db)
+            results[f"{name}_seconds"] = round(time.perf_counter() - started, 2)
+            assert db.query(models.ServiceHistory).count() == args.history
+            db.close()
+            engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()